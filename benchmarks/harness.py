@@ -0,0 +1,135 @@
+"""
+Utilidades de medida de la suite de benchmarks: registro de casos, cronometraje,
+guardado de resultados en JSON y comparación con una ejecución anterior.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Casos registrados con @benchmark, en orden de definición
+BENCHMARKS = []
+
+
+def benchmark(name, ops=1, quick=True):
+    """
+    Registra un caso de benchmark. La función decorada prepara el caso (fuera del
+    cronómetro) y devuelve la función sin argumentos que se mide, o una tupla
+    (función, limpieza) si hay recursos que liberar al terminar.
+    :param name: Nombre único del caso
+    :param ops: Operaciones por llamada (p. ej. evaluaciones), para calcular ops/s
+    :param quick: Si es False el caso solo se ejecuta en modo completo
+    """
+    def register(setup):
+        BENCHMARKS.append({'name': name, 'setup': setup, 'ops': ops, 'quick': quick})
+        return setup
+    return register
+
+
+def measure(func, min_time=0.5, min_rounds=3, max_rounds=50, warmup=1):
+    """
+    Cronometra func repitiéndola hasta acumular min_time segundos (con al menos
+    min_rounds y como mucho max_rounds repeticiones), tras warmup llamadas de calentamiento.
+    :return: Diccionario con rounds, min, median, mean y stdev (s por llamada)
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    while len(times) < max_rounds and (len(times) < min_rounds or sum(times) < min_time):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        'rounds': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def run(quick=False, keyword=None, min_time=0.5, log=print):
+    """
+    Ejecuta los casos registrados.
+    :param quick: Si es True se omiten los casos marcados como lentos
+    :param keyword: Si se da, solo se ejecutan los casos cuyo nombre lo contiene
+    :return: Diccionario nombre -> estadísticas
+    """
+    results = {}
+    for case in BENCHMARKS:
+        if (quick and not case['quick']) or (keyword and keyword not in case['name']):
+            continue
+        func = case['setup']()
+        teardown = None
+        if isinstance(func, tuple):
+            func, teardown = func
+        try:
+            stats = measure(func, min_time=min_time)
+        finally:
+            if teardown is not None:
+                teardown()
+        stats['ops'] = case['ops']
+        stats['ops_per_second'] = case['ops'] / stats['min']
+        results[case['name']] = stats
+        log(f"{case['name']:<45} {stats['min'] * 1e3:10.3f} ms  "
+            f"{stats['ops_per_second']:12.1f} ops/s  ({stats['rounds']} rondas)")
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    """
+    Datos del entorno que acompañan a los resultados (commit, versiones, máquina).
+    """
+    return {
+        'commit': _git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system(),
+    }
+
+
+def save(results, path):
+    """
+    Guarda los resultados junto con los metadatos del entorno en un archivo JSON.
+    """
+    with open(path, 'w') as f:
+        json.dump({'meta': metadata(), 'benchmarks': results}, f, indent=2)
+
+
+def load(path):
+    with open(path, 'r') as f:
+        return json.load(f)['benchmarks']
+
+
+def compare(results, baseline, threshold=0.2, stat='min'):
+    """
+    Compara los resultados con los de una ejecución anterior.
+    Un caso empeora si su tiempo supera al de referencia en más de threshold (relativo).
+    :param results: Resultados actuales (nombre -> estadísticas)
+    :param baseline: Resultados de referencia (nombre -> estadísticas)
+    :param threshold: Empeoramiento relativo admitido (0.2 = 20 %)
+    :param stat: Estadístico comparado ("min", "median" o "mean")
+    :return: Lista de tuplas (nombre, tiempo de referencia, tiempo actual, cociente, empeora)
+    """
+    rows = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        ratio = stats[stat] / baseline[name][stat]
+        rows.append((name, baseline[name][stat], stats[stat], ratio, ratio > 1 + threshold))
+    return rows
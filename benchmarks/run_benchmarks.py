@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks del simulador y de los optimizadores.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run_benchmarks                      # todos los casos
+    python -m benchmarks.run_benchmarks --quick -k simulate  # casos rápidos que contienen "simulate"
+    python -m benchmarks.run_benchmarks --output antes.json
+    python -m benchmarks.run_benchmarks --compare antes.json --threshold 0.1
+
+Los resultados se guardan en JSON (por defecto en benchmarks/results/) para poder
+compararlos entre commits. Con --compare el proceso termina con código 1 si algún
+caso es más lento que la referencia en más de --threshold.
+
+Casos:
+- simulate_lap con cada motor y varios delta_s sobre track.json (y con el perfilador activado);
+- simulate_lap con el backend "jit" (numba), tras comprobar que coincide bit a bit con
+  el backend "python"; sin numba los casos se omiten;
+- simulate_lap sobre circuitos sintéticos (Track.synthetic) de 1 a 100 km;
+- Car.max_deceleration (llamadas escalares);
+- evaluaciones por segundo de la función de fitness de optheuristica.py y de una
+  generación completa con simulate_batch / ParallelEvaluator;
+- coste de un paso de gradiente de gradopt (exacto y diferencias centrales);
+- re-simulación incremental (LapSimulator.simulate_incremental) tras cambiar un parámetro;
+- una generación en un calendario de varios circuitos (SeasonEvaluator) frente a
+  simulate_batch circuito a circuito;
+- una generación de CMA-ES y de evolución diferencial (src/optimization/population.py)
+  con simulate_batch, para comparar con generation[batch-100].
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.harness import benchmark, run, save, load, compare
+from src.models.car import SETUP_BOUNDS
+from src.models.track import Track
+from src.simulator.lap_simulator import LapSimulator
+from src.optimization.parallel import ParallelEvaluator
+from src.optimization.season import SeasonEvaluator
+from src.optimization.population import CMAES, DifferentialEvolution
+from src.utils.cache import load_car, load_track
+from src.simulator import jit
+from src.utils.profiling import Profiler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAR_PATH = os.path.join(ROOT, "car.json")
+TRACK_PATH = os.path.join(ROOT, "track.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+AOA = 4  # car.json no define el ángulo de ataque
+POPULATION = 100  # Tamaño de población de optheuristica.py
+
+
+def _car():
+    return load_car(CAR_PATH).build(aoa_front=AOA, aoa_rear=AOA)
+
+
+def _population(size, seed=0):
+    bounds = np.array(SETUP_BOUNDS, dtype=float)
+    rng = np.random.default_rng(seed)
+    return bounds[:, 0] + rng.random((size, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
+
+
+def _simulate_case(engine, delta_s, track=None, profiler=None):
+    def setup():
+        simulator = LapSimulator(_car(), track or load_track(TRACK_PATH), delta_s=delta_s, engine=engine,
+                                 profiler=profiler)
+        return simulator.simulate_lap
+    return setup
+
+
+# simulate_lap sobre track.json con distintos delta_s
+for _ds in (0.5, 1.0, 2.0, 5.0):
+    benchmark(f"simulate_lap[numpy-ds{_ds}]")(_simulate_case("numpy", _ds))
+    benchmark(f"simulate_lap[python-ds{_ds}]", quick=_ds >= 1.0)(_simulate_case("python", _ds))
+benchmark("simulate_lap[segment]")(_simulate_case("segment", 1.0))
+# Coste de la instrumentación activada (comparar con simulate_lap[python-ds1.0])
+benchmark("simulate_lap[python-ds1.0-profiled]")(_simulate_case("python", 1.0, profiler=Profiler()))
+
+
+def _jit_case(engine, delta_s, track=None):
+    def setup():
+        car, lap_track = _car(), track or load_track(TRACK_PATH)
+        simulator = LapSimulator(car, lap_track, delta_s=delta_s, engine=engine, backend="jit")
+        # Equivalencia con las pasadas de referencia antes de medir (la compilación queda fuera)
+        lap_time, v = simulator.simulate_lap()
+        ref_time, ref_v = LapSimulator(car, lap_track, delta_s=delta_s, engine=engine).simulate_lap()
+        if lap_time != ref_time or not np.array_equal(v, ref_v):
+            raise AssertionError(f"backend jit distinto de python: {lap_time!r} != {ref_time!r}")
+        return simulator.simulate_lap
+    return setup
+
+
+# Backend compilado de las pasadas (solo si numba está instalado)
+if jit.HAVE_NUMBA:
+    for _engine in ("python", "numpy"):
+        benchmark(f"simulate_lap[{_engine}-jit-ds1.0]")(_jit_case(_engine, 1.0))
+    benchmark("simulate_lap[numpy-jit-synthetic-100km]", quick=False)(
+        _jit_case("numpy", 1.0, Track.synthetic(100000.0, seed=100)))
+
+# simulate_lap sobre circuitos sintéticos de 1 a 100 km
+for _km in (1, 10, 100):
+    _track = Track.synthetic(_km * 1000.0, seed=_km)
+    benchmark(f"simulate_lap[numpy-synthetic-{_km}km]", quick=_km < 100)(_simulate_case("numpy", 1.0, _track))
+    benchmark(f"simulate_lap[python-synthetic-{_km}km]", quick=_km < 10)(_simulate_case("python", 1.0, _track))
+    benchmark(f"simulate_lap[segment-synthetic-{_km}km]")(_simulate_case("segment", 1.0, _track))
+
+
+@benchmark("car.max_deceleration", ops=1000)
+def _max_deceleration():
+    car = _car()
+    speeds = np.linspace(0.0, 100.0, 1000).tolist()
+    return lambda: [car.max_deceleration(v) for v in speeds]
+
+
+@benchmark("fitness[optheuristica]", ops=20)
+def _fitness():
+    # Mismo camino que optheuristica.fitness_function, con el ángulo de ataque definido
+    population = _population(20)
+    template = load_car(CAR_PATH).build(aoa_front=AOA, aoa_rear=AOA)
+
+    def evaluate():
+        for x in population:
+            track = load_track(TRACK_PATH)
+            LapSimulator(template.with_params(x), track, engine="numpy").simulate_lap()
+    return evaluate
+
+
+@benchmark(f"generation[batch-{POPULATION}]", ops=POPULATION)
+def _generation_batch():
+    population = _population(POPULATION)
+    simulator = LapSimulator(_car(), load_track(TRACK_PATH), engine="numpy")
+    return lambda: simulator.simulate_batch(population)
+
+
+@benchmark(f"generation[parallel-{POPULATION}]", ops=POPULATION, quick=False)
+def _generation_parallel():
+    # El arranque de los procesos queda fuera de la medida
+    population = _population(POPULATION)
+    evaluator = ParallelEvaluator(_car(), load_track(TRACK_PATH))
+    evaluator.evaluate(population[:1])
+    return (lambda: evaluator.evaluate(population)), evaluator.close
+
+
+@benchmark("gradient_step[exact]")
+def _gradient_exact():
+    # compute_gradient(method="exact") de gradopt
+    car, track = _car(), load_track(TRACK_PATH)
+    return lambda: LapSimulator(car, track, engine="numpy").simulate_lap_with_gradient()
+
+
+@benchmark("gradient_step[central]")
+def _gradient_central():
+    # compute_gradient(method="central") de gradopt: 2 * n perturbaciones en un solo lote
+    car, track = _car(), load_track(TRACK_PATH)
+    theta = car.setup_params()
+    n = len(theta)
+    epsilon = 1e-4
+    perturbations = np.tile(theta, (2 * n, 1))
+    perturbations[np.arange(n), np.arange(n)] += epsilon
+    perturbations[n + np.arange(n), np.arange(n)] -= epsilon
+    simulator = LapSimulator(car, track, engine="numpy")
+    return lambda: simulator.simulate_batch(perturbations)
+
+
+@benchmark("simulate_incremental[brake_force]", ops=2)
+def _incremental_brake_force():
+    # Búsqueda coordenada: se alterna brake_force entre dos valores y solo se recalculan las frenadas
+    simulator = LapSimulator(_car(), load_track(TRACK_PATH), engine="numpy")
+    simulator.simulate_incremental()
+    values = simulator.car.brake_force * np.array([1.01, 0.99])
+
+    def step():
+        for value in values:
+            simulator.simulate_incremental([value], names=["brake_force"])
+    return step
+
+
+def _season_tracks():
+    return [load_track(TRACK_PATH)] + [Track.synthetic(km * 1000.0, seed=km) for km in (3, 5)]
+
+
+@benchmark(f"season[stacked-3tracks-{POPULATION}]", ops=POPULATION)
+def _season_stacked():
+    population = _population(POPULATION)
+    season = SeasonEvaluator(_car(), _season_tracks(), workers=1)
+    return lambda: season.evaluate(population)
+
+
+@benchmark(f"season[per-track-3tracks-{POPULATION}]", ops=POPULATION)
+def _season_per_track():
+    # Referencia: un simulate_batch por circuito
+    population = _population(POPULATION)
+    simulators = [LapSimulator(_car(), track, engine="numpy") for track in _season_tracks()]
+    return lambda: sum(simulator.simulate_batch(population) for simulator in simulators)
+
+
+def _optimizer_case(optimizer_class, population_size):
+    def setup():
+        # Una generación: ask, una llamada a simulate_batch y tell (sin criterios de parada)
+        simulator = LapSimulator(_car(), load_track(TRACK_PATH), engine="numpy")
+        optimizer = optimizer_class(simulator.simulate_batch, SETUP_BOUNDS, population_size=population_size,
+                                    seed=0, log=None)
+        optimizer.step()  # La primera generación de DE solo evalúa la población inicial
+        return optimizer.step
+    return setup
+
+
+benchmark(f"optimizer[cmaes-{POPULATION}]", ops=POPULATION)(_optimizer_case(CMAES, POPULATION))
+benchmark(f"optimizer[de-{POPULATION}]", ops=POPULATION)(_optimizer_case(DifferentialEvolution, POPULATION))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de LapSimulator y los optimizadores")
+    parser.add_argument("--quick", action="store_true", help="omite los casos lentos")
+    parser.add_argument("-k", "--keyword", help="solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--output", help="archivo JSON de resultados (por defecto en benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="empeoramiento relativo admitido antes de fallar (por defecto 0.2)")
+    parser.add_argument("--stat", choices=("min", "median", "mean"), default="min",
+                        help="estadístico usado en la comparación")
+    parser.add_argument("--min-time", type=float, default=0.5, help="tiempo mínimo medido por caso (s)")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, keyword=args.keyword, min_time=args.min_time)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save(results, output)
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare is None:
+        return 0
+    rows = compare(results, load(args.compare), threshold=args.threshold, stat=args.stat)
+    print(f"\nComparación con {args.compare} ({args.stat}, umbral {args.threshold:.0%}):")
+    for name, before, after, ratio, regressed in rows:
+        flag = "  EMPEORA" if regressed else ""
+        print(f"{name:<45} {before * 1e3:10.3f} -> {after * 1e3:10.3f} ms  x{ratio:5.2f}{flag}")
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} caso(s) por encima del umbral")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
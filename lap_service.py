@@ -0,0 +1,47 @@
+"""
+Arranca el servicio local de simulación de vueltas (ver src/service/server.py).
+
+Uso:
+    python lap_service.py                                   # TCP 127.0.0.1:8765, todos los núcleos
+    python lap_service.py --workers 4 --preload car.json track.json --aoa 4
+    python lap_service.py --unix /tmp/lap_service.sock
+Desde un notebook o un script (ver src/service/client.py):
+    from src.service.client import RemoteLapSimulator
+    lap_time, v = RemoteLapSimulator("car.json", "track.json", aoa=4).simulate_lap()
+"""
+import argparse
+import asyncio
+import sys
+
+from src.service.client import DEFAULT_HOST, DEFAULT_PORT
+from src.service.server import LapService
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local de simulación de vueltas")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"dirección TCP (por defecto {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"puerto TCP (por defecto {DEFAULT_PORT})")
+    parser.add_argument("--unix", help="ruta de un socket Unix (en lugar de TCP)")
+    parser.add_argument("--workers", type=int, help="procesos trabajadores (por defecto todos los núcleos)")
+    parser.add_argument("--max-batch", type=int, default=256, help="máximo de setups por lote")
+    parser.add_argument("--max-wait", type=float, default=2.0, help="espera máxima para completar un lote (ms)")
+    parser.add_argument("--preload", nargs=2, action="append", default=[], metavar=("CAR", "TRACK"),
+                        help="coche y circuito que se cargan al arrancar (se puede repetir)")
+    parser.add_argument("--aoa", type=float, help="ángulo de ataque de los coches de --preload")
+    parser.add_argument("--delta-s", type=float, default=1.0, help="resolución de los circuitos de --preload (m)")
+    args = parser.parse_args(argv)
+
+    preload = [(car, args.aoa, track, args.delta_s) for car, track in args.preload]
+    service = LapService(workers=args.workers, max_batch=args.max_batch, max_wait=args.max_wait / 1000.0,
+                         preload=preload)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Servicio de simulación en {where} con {service.workers} proceso(s). Ctrl+C para detenerlo")
+    try:
+        asyncio.run(service.serve(args.host, args.port, path=args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,44 @@
 #### IMPORTAR LIBRERIAS ####
 import os
+import json
 import numpy as np
 import matplotlib.pyplot as plt
 from geneticalgorithm import geneticalgorithm as ga
 
-from src.models.car import Car
-from src.models.track import Track
 from src.simulator.lap_simulator import LapSimulator
+from src.utils.cache import load_car, load_track
+from src.optimization.parallel import ParallelEvaluator
+from src.optimization.fitness_cache import FitnessCache, context_hash
+from src.optimization.surrogate import SurrogateScreen
+from src.optimization.multifidelity import MultiFidelity
+from src.optimization.population import CMAES, DifferentialEvolution
 
 #### CARGAR COCHE Y CIRCUITO ####
 car_path = os.path.join(os.path.dirname(__file__), "car.json")
 track_path = os.path.join(os.path.dirname(__file__), "track.json")
 
+# Coche plantilla con el ángulo de ataque definido (car.json no lo incluye): se construye una sola vez
+aoa = json.load(open(car_path)).get("aoa", -4)
+car_template = load_car(car_path).build(aoa_front=aoa, aoa_rear=aoa)
+track = load_track(track_path)  # El circuito también se carga una sola vez
+LAP = "standing"  # Tiempo que se optimiza: "standing" (vuelta desde parado) o "flying" (vuelta lanzada)
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "fitness_cache.sqlite")  # None para no guardar la caché en disco
+SURROGATE = False  # Si es True, solo se simulan los candidatos prometedores o inciertos; el resto recibe el tiempo predicho por un modelo sustituto
+MULTI_FIDELITY = False  # Si es True, se simula primero en mallas gruesas y solo los mejores suben a delta_s = 1 m; el resto recibe su tiempo grueso corregido
+OPTIMIZER = "ga"  # "ga" (geneticalgorithm, individuo a individuo), "cmaes" o "de" (generaciones enteras por lotes)
+SEED = 0  # Semilla de los optimizadores "cmaes" y "de"
 
 
 #### DEFINIR FUNCIÓN DE FITNESS MULTIVARIABLE ####
 def fitness_function(X):
-    car = Car.from_json(car_path) # Este es el coche inicial, y luego la optimización lo cambia
-    track = Track.from_json(track_path)
-
-    track = Track.from_json(track_path)
-
-    power = X[0]
-    brake_force = X[1]
-    mass=X[2]
-    tire_grip = X[3]
-    cl_alpha_front = X[4]
-    cl_alpha_rear = X[5]
-    cd_alpha_front = X[6]
-    cd_alpha_rear = X[7]
-    fw_area = X[8]
-    rw_area = X[9]
-
-
-    car = Car.from_json(car_path)
-    car.power = power
-    car.brake_force = brake_force
-    car.mass = mass
-    car.tire_grip = tire_grip
-    car.aero.cl_alpha_front = cl_alpha_front   
-    car.aero.cl_alpha_rear = cl_alpha_rear
-    car.aero.cd_alpha_front = cd_alpha_front
-    car.aero.cd_alpha_rear = cd_alpha_rear
-    car.aero.fw_area = fw_area
-    car.aero.rw_area = rw_area
-
-
-    # car.aero.set_aoa(-4)  # Ignorad esto de momento
-    
-    simulator = LapSimulator(car, track) 
+    # X va en el orden de SETUP_PARAMS: power, brake_force, mass, tire_grip, cl_alpha_front,
+    # cl_alpha_rear, cd_alpha_front, cd_alpha_rear, fw_area, rw_area
+    car = car_template.with_params(X) # Copia del coche inicial con los parámetros de la optimización
+
+    simulator = LapSimulator(car, track, engine="numpy", lap=LAP) # El motor numpy reutiliza la discretización en caché
     lap_time, v = simulator.simulate_lap()
 
-    # print(f"[EVAL] power={power:.0f}, brake_force={brake_force:.0f}, mass={mass:.0f} --> lap_time={lap_time:.3f}")
+    # print(f"[EVAL] power={X[0]:.0f}, brake_force={X[1]:.0f}, mass={X[2]:.0f} --> lap_time={lap_time:.3f}")
 
     return lap_time
 
@@ -94,46 +81,102 @@ algorithm_param = {
     'max_iteration_without_improv': 10
 }
 
-model = ga(
-    function=fitness_function,
-    dimension=10,  # Ahora optimizamos 3 variables
-    variable_type='real',
-    variable_boundaries=varbound,
-    algorithm_parameters=algorithm_param
-)
-
-#### EJECUTAR OPTIMIZACIÓN ####
-model.run()
-
-#### SACAR EL MEJOR SETUP ####
-best_setup = model.output_dict['variable']
-best_time = model.output_dict['function']
-
-print("\nMejor configuración encontrada:")
-print(f"Power óptimo: {best_setup[0]:.2f} W")
-print(f"Brake force óptimo: {best_setup[1]:.2f} N")
-print(f"Mass óptimo: {best_setup[2]:.2f} N")
-print(f"Tire grip óptimo: {best_setup[3]:.2f} N")
-print(f"Cl_alpha_front óptimo: {best_setup[4]:.2f} m^2/rad")
-print(f"Cl_alpha_rear óptimo: {best_setup[5]:.2f} m^2/rad")
-print(f"Cd_alpha_front óptimo: {best_setup[6]:.2f} m^2/rad")
-print(f"Cd_alpha_rear óptimo: {best_setup[7]:.2f} m^2/rad")
-print(f"Fw_area óptimo: {best_setup[8]:.2f} m^2")
-print(f"Rw_area óptimo: {best_setup[9]:.2f} m^2")
-
-print(f"Tiempo de vuelta correspondiente: {best_time:.2f} segundos")
-
-#### VISUALIZAR EVOLUCIÓN ####
-convergence = model.report
-
-plt.plot(convergence)
-plt.xlabel("Iteraciones")
-plt.ylabel("Tiempo de vuelta (s)")
-plt.title("Optimización multivariable")
-plt.grid()
-# plt.ylim(31,34)  # Limita el eje y de 99 a 101
-plt.show()
-
-print(f"Iteraciones realizadas: {len(model.report)}")
-print(f"Iteraciones máximas: {algorithm_param['max_num_iteration']}")
-print(f"Iteraciones sin mejora permitidas: {algorithm_param['max_iteration_without_improv']}")
\ No newline at end of file
+if __name__ == "__main__":
+    # Con "cmaes" o "de" cada generación se reparte entre procesos (geneticalgorithm evalúa los
+    # individuos de uno en uno, así que con "ga" se simula en este proceso)
+    evaluator = ParallelEvaluator(car_template, track, lap=LAP) if OPTIMIZER != "ga" else None
+
+    # Los candidatos que no llegan a la resolución completa reciben su tiempo de malla gruesa corregido
+    fidelity = None
+    if MULTI_FIDELITY:
+        fidelity = MultiFidelity(car_template, track, lap=LAP,
+                                 full_resolution=evaluator.evaluate if evaluator is not None else None)
+
+    # Las élites y los descendientes repetidos no se vuelven a simular, tampoco al relanzar la optimización
+    context = {'delta_s': 1.0, 'engine': "numpy", 'lap': LAP}
+    if fidelity is not None:
+        # Las estimaciones multi-fidelidad no se mezclan en la caché con los tiempos exactos
+        context.update(fidelities=fidelity.fidelities, eta=fidelity.eta)
+        function = fidelity.evaluate  # MultiFidelity evalúa y criba cada generación de una vez
+    elif evaluator is not None:
+        function = evaluator.evaluate
+    else:
+        function = fitness_function
+    fitness_cache = FitnessCache(
+        function,
+        context_hash(car_template, track, **context),
+        path=CACHE_PATH,
+        batched=function is not fitness_function,
+    )
+
+    # Los candidatos claramente peores reciben el tiempo predicho por el surrogate en lugar de simularse
+    screen = SurrogateScreen(fitness_cache.evaluate, bounds=varbound, batched=True) if SURROGATE else None
+
+    if OPTIMIZER == "ga":
+        model = ga(
+            function=screen or fitness_cache,
+            dimension=len(varbound),  # Los diez parámetros de SETUP_PARAMS
+            variable_type='real',
+            variable_boundaries=varbound,
+            algorithm_parameters=algorithm_param
+        )
+    else:
+        # Misma interfaz que ga (run, output_dict, report); cada generación es una sola llamada a evaluate
+        optimizer_class = {"cmaes": CMAES, "de": DifferentialEvolution}[OPTIMIZER]
+        model = optimizer_class(
+            (screen or fitness_cache).evaluate,
+            varbound,
+            seed=SEED,
+            max_generations=algorithm_param['max_num_iteration'],
+            patience=algorithm_param['max_iteration_without_improv'],
+        )
+
+    #### EJECUTAR OPTIMIZACIÓN ####
+    try:
+        model.run()
+
+        #### SACAR EL MEJOR SETUP ####
+        best_setup = model.output_dict['variable']
+        best_time = model.output_dict['function']
+        if fidelity is not None:
+            # Los mejores candidatos se vuelven a simular a resolución completa
+            winners, winner_times = fidelity.winners(5)
+            best_setup, best_time = winners[0], winner_times[0]
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+
+    print("\nMejor configuración encontrada:")
+    print(f"Power óptimo: {best_setup[0]:.2f} W")
+    print(f"Brake force óptimo: {best_setup[1]:.2f} N")
+    print(f"Mass óptimo: {best_setup[2]:.2f} N")
+    print(f"Tire grip óptimo: {best_setup[3]:.2f} N")
+    print(f"Cl_alpha_front óptimo: {best_setup[4]:.2f} m^2/rad")
+    print(f"Cl_alpha_rear óptimo: {best_setup[5]:.2f} m^2/rad")
+    print(f"Cd_alpha_front óptimo: {best_setup[6]:.2f} m^2/rad")
+    print(f"Cd_alpha_rear óptimo: {best_setup[7]:.2f} m^2/rad")
+    print(f"Fw_area óptimo: {best_setup[8]:.2f} m^2")
+    print(f"Rw_area óptimo: {best_setup[9]:.2f} m^2")
+
+    print(f"Tiempo de vuelta correspondiente: {best_time:.2f} segundos")
+    print(f"Caché de evaluaciones: {fitness_cache.stats()}")
+    if screen is not None:
+        print(f"Surrogate: {screen.stats()}")
+    if fidelity is not None:
+        print(f"Multi-fidelidad: {fidelity.stats()}")
+        print("Mejores tiempos a resolución completa: " + ", ".join(f"{t:.3f} s" for t in winner_times))
+
+    #### VISUALIZAR EVOLUCIÓN ####
+    convergence = model.report
+
+    plt.plot(convergence)
+    plt.xlabel("Iteraciones")
+    plt.ylabel("Tiempo de vuelta (s)")
+    plt.title("Optimización multivariable")
+    plt.grid()
+    # plt.ylim(31,34)  # Limita el eje y de 99 a 101
+    plt.show()
+
+    print(f"Iteraciones realizadas: {len(model.report)}")
+    print(f"Iteraciones máximas: {algorithm_param['max_num_iteration']}")
+    print(f"Iteraciones sin mejora permitidas: {algorithm_param['max_iteration_without_improv']}")
\ No newline at end of file
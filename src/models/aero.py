@@ -1,16 +1,69 @@
 
 """
-POR HACER
-- Hay que ver de meter las curvas de cl vs angle y cd vs angle en el json del coche"""
+Las curvas de cl y cd frente al ángulo de ataque de cada alerón se pueden dar en el json
+del coche ("polars", ver Polar). Si no se dan se usa el modelo analítico de Aero
+(pendiente lineal con entrada en pérdida a partir de 15 y arrastre cuadrático).
+"""
 
 """
 Se asume que no hay cambios en el angulo del coche a pesar de las fuerzas, y tambien que la carga en las ruedas es igual
 Aun asi, estaba bien modelar esto mejor con el modelo de bicicleta
 """
+import numpy as np
+
+
+class Polar:
+    """
+    Curvas tabuladas de cl y cd frente al ángulo de ataque de un alerón.
+    Los valores se multiplican por la pendiente del alerón (cl_alpha_* / cd_alpha_*), que
+    sigue siendo el parámetro de setup: con pendiente 1 la tabla es directamente el cl/cd.
+    Entre puntos se interpola linealmente; fuera de la tabla se usa el valor del extremo.
+    Las tablas se validan y se congelan al crearse, y se evalúan con np.interp (admiten arrays).
+    """
+    __slots__ = ("aoa", "cl", "cd")
+
+    def __init__(self, aoa, cl, cd):
+        """
+        :param aoa: Ángulos de ataque tabulados, estrictamente crecientes (mismas unidades que aoa_front)
+        :param cl: Coeficiente de sustentación en cada ángulo (por unidad de pendiente)
+        :param cd: Coeficiente de arrastre en cada ángulo (por unidad de pendiente)
+        """
+        tables = [np.array(values, dtype=float) for values in (aoa, cl, cd)]
+        if any(table.ndim != 1 or len(table) != len(tables[0]) for table in tables) or len(tables[0]) < 2:
+            raise ValueError("La polar necesita aoa, cl y cd con la misma longitud (al menos dos puntos)")
+        if np.any(np.diff(tables[0]) <= 0):
+            raise ValueError("Los ángulos de la polar deben ser estrictamente crecientes")
+        for table in tables:
+            table.flags.writeable = False
+        self.aoa, self.cl, self.cd = tables
+
+    def lift(self, aoa):
+        """
+        cl interpolado en aoa (escalar o array).
+        """
+        return np.interp(aoa, self.aoa, self.cl)
+
+    def drag(self, aoa):
+        """
+        cd interpolado en aoa (escalar o array).
+        """
+        return np.interp(aoa, self.aoa, self.cd)
+
+    def to_dict(self):
+        return {'aoa': self.aoa.tolist(), 'cl': self.cl.tolist(), 'cd': self.cd.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crea la polar a partir del formato del json: {"aoa": [...], "cl": [...], "cd": [...]}.
+        """
+        return cls(data['aoa'], data['cl'], data['cd'])
+
 
 class Aero:
 
-    def __init__(self, cl_alpha_front, cl_alpha_rear, cd_alpha_front, cd_alpha_rear, fw_area, rw_area):
+    def __init__(self, cl_alpha_front, cl_alpha_rear, cd_alpha_front, cd_alpha_rear, fw_area, rw_area,
+                 polar_front=None, polar_rear=None):
         """
         Inicializa el modelo aerodinámico del coche.
         :param cl_alpha_front: Coeficiente de sustentación frontal (m^2/rad)
@@ -19,6 +72,8 @@ class Aero:
         :param cd_alpha_rear: Coeficiente de arrastre trasera (m^2/rad)
         :param fw_area: Área frontal del coche (m^2)
         :param rw_area: Área trasera del coche (m^2)
+        :param polar_front: Polar tabulada del alerón delantero (None: modelo analítico)
+        :param polar_rear: Polar tabulada del alerón trasero (None: modelo analítico)
         """
         self.cl_alpha_front = cl_alpha_front
         self.cl_alpha_rear = cl_alpha_rear
@@ -26,6 +81,8 @@ class Aero:
         self.cd_alpha_rear = cd_alpha_rear
         self.fw_area = fw_area
         self.rw_area = rw_area
+        self.polar_front = polar_front
+        self.polar_rear = polar_rear
 
         self._aoa_front = None
         self._aoa_rear = None
@@ -37,6 +94,84 @@ class Aero:
 
         self.rho = 1.225  # Densidad del aire (kg/m^3) a nivel del mar y 15°C
 
+    def __setattr__(self, name, value):
+        # Cualquier cambio incrementa la versión, para invalidar tablas precalculadas (Car.envelope)
+        super().__setattr__(name, value)
+        self.__dict__['_version'] = self.__dict__.get('_version', 0) + 1
+
+
+    @staticmethod
+    def lift_coefficient(cl_alpha, aoa, polar=None):
+        """
+        Calcula el coeficiente de sustentación de un alerón. Admite arrays.
+        :param cl_alpha: Pendiente de sustentación del alerón
+        :param aoa: Ángulo de ataque del alerón
+        :param polar: Polar tabulada del alerón (None: modelo analítico)
+        :return: Coeficiente de sustentación
+        """
+        if np.ndim(aoa) == 0 and np.ndim(cl_alpha) == 0:
+            # Escalares: floats de Python, la aritmética escalar de numpy es varias veces más lenta
+            cl_alpha, aoa = float(cl_alpha), float(aoa)
+            if polar is not None:
+                return cl_alpha * float(polar.lift(aoa))
+            return cl_alpha * (15 - 0.3 * (aoa - 15) if aoa > 15 else aoa)  # Entrada en perdida
+        if polar is not None:
+            return cl_alpha * polar.lift(aoa)
+        aoa = np.asarray(aoa, dtype=float)
+        aoa_eff = np.where(aoa > 15, 15 - 0.3 * (aoa - 15), aoa)  # Entrada en perdida
+        return cl_alpha * aoa_eff
+
+    @staticmethod
+    def drag_coefficient(cd_alpha, aoa, polar=None):
+        """
+        Calcula el coeficiente de arrastre de un alerón. Admite arrays.
+        :param cd_alpha: Pendiente de arrastre del alerón
+        :param aoa: Ángulo de ataque del alerón
+        :param polar: Polar tabulada del alerón (None: modelo analítico)
+        :return: Coeficiente de arrastre
+        """
+        if np.ndim(aoa) == 0 and np.ndim(cd_alpha) == 0:
+            cd_alpha, aoa = float(cd_alpha), float(aoa)
+            if polar is not None:
+                return cd_alpha * float(polar.drag(aoa))
+            return cd_alpha * aoa + (cd_alpha * 0.3) * aoa**2
+        if polar is not None:
+            return cd_alpha * polar.drag(aoa)
+        aoa = np.asarray(aoa, dtype=float)
+        return cd_alpha * aoa + (cd_alpha * 0.3) * aoa**2
+
+    def set_aoa(self, aoa_front, aoa_rear=None):
+        """
+        Establece el ángulo de ataque de los dos alerones.
+        :param aoa_front: Ángulo de ataque delantero
+        :param aoa_rear: Ángulo de ataque trasero (None: el mismo que el delantero)
+        """
+        self.aoa_front = aoa_front
+        self.aoa_rear = aoa_front if aoa_rear is None else aoa_rear
+
+    def coefficients(self, aoa_front=None, aoa_rear=None):
+        """
+        Factores k de downforce y drag (F = k * v^2) para unos ángulos de ataque dados,
+        sin modificar los del coche. Admite arrays (se combinan con broadcasting), de forma
+        que un barrido de miles de reglajes de alerón se evalúa de una sola vez.
+        :param aoa_front: Ángulo(s) de ataque delantero (None: el actual)
+        :param aoa_rear: Ángulo(s) de ataque trasero (None: el actual)
+        :return: Tupla (k_downforce, k_drag)
+        """
+        half_rho = 0.5 * self.rho
+        if aoa_front is None:
+            cl_front, cd_front = self.cl_front, self.cd_front
+        else:
+            cl_front = self.lift_coefficient(self.cl_alpha_front, aoa_front, self.polar_front)
+            cd_front = self.drag_coefficient(self.cd_alpha_front, aoa_front, self.polar_front)
+        if aoa_rear is None:
+            cl_rear, cd_rear = self.cl_rear, self.cd_rear
+        else:
+            cl_rear = self.lift_coefficient(self.cl_alpha_rear, aoa_rear, self.polar_rear)
+            cd_rear = self.drag_coefficient(self.cd_alpha_rear, aoa_rear, self.polar_rear)
+        k_downforce = half_rho * (cl_front * self.fw_area + cl_rear * self.rw_area)
+        k_drag = half_rho * (cd_front * self.fw_area + cd_rear * self.rw_area)
+        return k_downforce, k_drag
 
     @property
     def aoa_front(self):
@@ -54,11 +189,8 @@ class Aero:
         """
         self._aoa_front = aoa
 
-        if aoa > 15:
-            self.cl_front = self.cl_alpha_front * (15 - 0.3 * (aoa - 15)) # Entrada en perdida
-        else:
-            self.cl_front = self.cl_alpha_front * aoa
-        self.cd_front = self.cd_alpha_front * aoa + (self.cd_alpha_front*0.3) * aoa**2
+        self.cl_front = self.lift_coefficient(self.cl_alpha_front, aoa, self.polar_front)
+        self.cd_front = self.drag_coefficient(self.cd_alpha_front, aoa, self.polar_front)
 
     @property
     def aoa_rear(self):
@@ -76,26 +208,42 @@ class Aero:
         """
         self._aoa_rear = aoa
 
-        if aoa > 15:
-            self.cl_rear = self.cl_alpha_rear * (15 - 0.3 * (aoa - 15)) # Entrada en perdida
-        else:
-            self.cl_rear = self.cl_alpha_rear * aoa
-        self.cd_rear = self.cd_alpha_rear * aoa + (self.cd_alpha_rear*0.3) * aoa**2
+        self.cl_rear = self.lift_coefficient(self.cl_alpha_rear, aoa, self.polar_rear)
+        self.cd_rear = self.drag_coefficient(self.cd_alpha_rear, aoa, self.polar_rear)
 
         
-    def downforce(self, v):
+    def downforce(self, v, aoa_front=None, aoa_rear=None):
         """
         Calcula la fuerza de sustentación (downforce) del coche.
+        Con ángulos de ataque se evalúa para esos reglajes (arrays de v y aoa, con broadcasting).
         :param v: Velocidad del coche (m/s)
+        :param aoa_front: Ángulo(s) de ataque delantero (None: el actual)
+        :param aoa_rear: Ángulo(s) de ataque trasero (None: el actual)
         :return: Fuerza de sustentación (N)
         """
-        return 0.5 * self.rho * v**2 * (self.cl_front * self.fw_area + self.cl_rear * self.rw_area)
+        if aoa_front is None and aoa_rear is None:
+            return 0.5 * self.rho * v**2 * (self.cl_front * self.fw_area + self.cl_rear * self.rw_area)
+        return self.coefficients(aoa_front, aoa_rear)[0] * np.asarray(v, dtype=float)**2
     
 
-    def drag(self, v):
+    def drag(self, v, aoa_front=None, aoa_rear=None):
         """
         Calcula la fuerza de arrastre del coche.
+        Con ángulos de ataque se evalúa para esos reglajes (arrays de v y aoa, con broadcasting).
         :param v: Velocidad del coche (m/s)
+        :param aoa_front: Ángulo(s) de ataque delantero (None: el actual)
+        :param aoa_rear: Ángulo(s) de ataque trasero (None: el actual)
         :return: Fuerza de arrastre (N)
         """
-        return 0.5 * self.rho * v**2 * (self.cd_front * self.fw_area + self.cd_rear * self.rw_area)
\ No newline at end of file
+        if aoa_front is None and aoa_rear is None:
+            return 0.5 * self.rho * v**2 * (self.cd_front * self.fw_area + self.cd_rear * self.rw_area)
+        return self.coefficients(aoa_front, aoa_rear)[1] * np.asarray(v, dtype=float)**2
+
+
+    def downforce_coefficient(self):
+        """
+        Devuelve el factor k tal que downforce(v) = k * v**2.
+        Permite resolver en forma cerrada problemas que dependen del downforce.
+        :return: Factor de downforce (N s^2/m^2)
+        """
+        return 0.5 * self.rho * (self.cl_front * self.fw_area + self.cl_rear * self.rw_area)
@@ -1,12 +1,37 @@
+import copy
 import json
-from .aero import Aero
+import numpy as np
+from .aero import Aero, Polar
+from .envelope import PerformanceEnvelope
 
+# Orden de los parámetros de setup que usan los optimizadores (varbound / params)
+SETUP_PARAMS = (
+    "power", "brake_force", "mass", "tire_grip",
+    "cl_alpha_front", "cl_alpha_rear", "cd_alpha_front",
+    "cd_alpha_rear", "fw_area", "rw_area",
+)
+
+# Límites de cada parámetro de setup en los optimizadores, en el orden de SETUP_PARAMS
+SETUP_BOUNDS = (
+    (300000, 650000),  # power (W)
+    (3000, 10000),     # brake_force (N)
+    (600, 900),        # mass (kg)
+    (0.1, 2),          # tire_grip
+    (0.1, 1),          # cl_alpha_front
+    (0.1, 1),          # cl_alpha_rear
+    (0.1, 1),          # cd_alpha_front
+    (0.1, 1),          # cd_alpha_rear
+    (0.1, 2),          # fw_area (m^2)
+    (0.1, 2),          # rw_area (m^2)
+)
 
 class Car:
     """
     Clase que representa un coche para la simulación de vueltas.
     Permite cargar sus parámetros desde un archivo JSON.
     """
+    profiler = None  # Profiler opcional (src/utils/profiling.py): cuenta las llamadas al modelo
+
     def __init__(self, mass, tire_grip, power, brake_force, aero, brake_bias, wheelbase, h_cg):
         """
         Inicializa el coche con los parámetros principales.
@@ -27,6 +52,12 @@ class Car:
         self.wheelbase = wheelbase
         self.h_cg = h_cg
 
+    def __setattr__(self, name, value):
+        # Cualquier cambio en el coche invalida la envolvente precalculada
+        super().__setattr__(name, value)
+        if name != 'profiler':
+            self.__dict__['_envelope'] = None
+
     def max_acceleration(self, v):
         """
         Calcula la aceleración máxima del coche (m/s^2) a una velocidad dada v (m/s).
@@ -45,6 +76,8 @@ class Car:
         net_force = F_available - drag_force
         # Acceleration = net force / mass
         acc = net_force / self.mass
+        if self.profiler is not None:
+            self.profiler.add("calls.max_acceleration")
         # Do not allow negative acceleration
         return max(acc, 0.0)
 
@@ -66,7 +99,8 @@ class Car:
         a = a_system
 
         # Iterar para ajustar transferencia de carga y distribución de frenada
-        for _ in range(10):
+        converged = False
+        for iteration in range(10):
             # Transferencia de peso durante la frenada
             delta_w = self.mass * a * self.h_cg / self.wheelbase
             w_front = total_weight * 0.5 + delta_w
@@ -89,9 +123,12 @@ class Car:
             # Comprobar convergencia
             if abs(a_allowed - a) < 1e-3:
                 a = a_allowed
+                converged = True
                 break
             a = a_allowed
 
+        if self.profiler is not None:
+            self.profiler.iterations("max_deceleration", iteration + 1, converged)
         # Retornar desaceleración negativa
         return -a
 
@@ -108,8 +145,127 @@ class Car:
         grip_force = self.tire_grip * (self.mass * 9.81 + downforce)
         # v^2 = F * r / m
         vmax = (grip_force * radius / self.mass) ** 0.5
+        if self.profiler is not None:
+            self.profiler.add("calls.max_velocity")
         return vmax
 
+    def envelope(self, v_grid=None, resolution=0.5, v_top=200.0):
+        """
+        Devuelve la envolvente de prestaciones (PerformanceEnvelope) del setup actual.
+        Se guarda en el coche y se recalcula automáticamente si cambia algún atributo
+        del coche o de su modelo aerodinámico, como hacen los optimizadores.
+        :param v_grid: Rejilla de velocidades (m/s); por defecto de 0 a v_top cada resolution
+        :param resolution: Paso de la rejilla por defecto (m/s)
+        :param v_top: Velocidad máxima de la rejilla por defecto (m/s)
+        :return: Instancia de PerformanceEnvelope
+        """
+        if v_grid is None:
+            v_grid = np.arange(0.0, v_top + resolution, resolution)
+        v_grid = np.asarray(v_grid, dtype=float)
+        key = (id(self.aero), self.aero.__dict__.get('_version'), v_grid.tobytes())
+
+        cached = self.__dict__.get('_envelope')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        envelope = PerformanceEnvelope(self, v_grid)
+        self.__dict__['_envelope'] = (key, envelope)
+        return envelope
+
+    def max_velocity_array(self, radii, v_limit=np.inf):
+        """
+        Calcula la velocidad máxima en curva para un array de radios de una sola vez.
+        Resuelve en forma cerrada la ecuación de agarre con downforce:
+        v^2 = mu * (m * g + k * v^2) * r / m  ->  v^2 = mu * g * r / (1 - mu * k * r / m)
+        Donde el denominador no es positivo (el downforce crece más rápido que la
+        demanda lateral) o el radio es infinito no hay límite por agarre y se usa v_limit.
+        :param radii: Array de radios de curva (m)
+        :param v_limit: Velocidad usada donde no existe límite por agarre (m/s)
+        :return: Array de velocidades máximas (m/s)
+        """
+        radii = np.asarray(radii, dtype=float)
+        k = self.aero.downforce_coefficient()
+        g = 9.81
+
+        v_max = np.full(radii.shape, float(v_limit))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            denom = 1.0 - self.tire_grip * k * radii / self.mass
+            v_sq = self.tire_grip * g * radii / denom
+            solvable = np.isfinite(radii) & (denom > 0) & np.isfinite(v_sq) & (v_sq >= 0)
+        v_max[solvable] = np.sqrt(v_sq[solvable])
+        return v_max
+
+    def copy(self):
+        """
+        Devuelve una copia independiente del coche (incluido su modelo aerodinámico).
+        Todos los atributos son escalares, así que basta con copias superficiales.
+        :return: Nueva instancia de Car
+        """
+        car = copy.copy(self)
+        car.aero = copy.copy(self.aero)
+        return car
+
+    def with_params(self, values, names=SETUP_PARAMS):
+        """
+        Devuelve una copia del coche con los parámetros de setup sustituidos.
+        Los parámetros que no son del coche se asignan a car.aero, y los coeficientes
+        aerodinámicos se recalculan con las nuevas pendientes (igual que en CarBatch).
+        :param values: Valores de los parámetros
+        :param names: Nombres de los parámetros, por defecto SETUP_PARAMS
+        :return: Nueva instancia de Car
+        """
+        car = self.copy()
+        for name, value in zip(names, values):
+            if hasattr(car, name):
+                setattr(car, name, value)
+            else:
+                setattr(car.aero, name, value)
+        # Reasignar los ángulos de ataque recalcula cl/cd con las pendientes nuevas
+        if car.aero.aoa_front is not None:
+            car.aero.aoa_front = car.aero.aoa_front
+        if car.aero.aoa_rear is not None:
+            car.aero.aoa_rear = car.aero.aoa_rear
+        return car
+
+    def setup_params(self, names=SETUP_PARAMS):
+        """
+        Devuelve los valores actuales de los parámetros de setup (inverso de with_params).
+        :param names: Nombres de los parámetros, por defecto SETUP_PARAMS
+        :return: Array con los valores en el orden de names
+        """
+        return np.array([
+            getattr(self, name) if hasattr(self, name) else getattr(self.aero, name)
+            for name in names
+        ], dtype=float)
+
+    def to_dict(self):
+        """
+        Parámetros del coche en el formato del JSON (inverso de from_dict), más los
+        ángulos de ataque definidos. Sirve también para identificar el coche (hashes).
+        :return: Diccionario con los parámetros del coche
+        """
+        data = {
+            'mass': self.mass,
+            'tire_grip': self.tire_grip,
+            'power': self.power,
+            'brake_force': self.brake_force,
+            'cl_alpha_front': self.aero.cl_alpha_front,
+            'cl_alpha_rear': self.aero.cl_alpha_rear,
+            'cd_alpha_front': self.aero.cd_alpha_front,
+            'cd_alpha_rear': self.aero.cd_alpha_rear,
+            'fw_area': self.aero.fw_area,
+            'rw_area': self.aero.rw_area,
+            'brake_bias': self.brake_bias,
+            'wheelbase': self.wheelbase,
+            'h_cg': self.h_cg,
+            'aoa_front': self.aero.aoa_front,
+            'aoa_rear': self.aero.aoa_rear,
+        }
+        polars = {wing: polar.to_dict() for wing, polar in (('front', self.aero.polar_front),
+                                                            ('rear', self.aero.polar_rear)) if polar is not None}
+        if polars:
+            data['polars'] = polars
+        return data
+
     @classmethod
     def from_json(cls, file_path):
         """
@@ -119,7 +275,18 @@ class Car:
         """
         with open(file_path, 'r') as f:
             data = json.load(f)
+        return cls.from_dict(data)
 
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crea una instancia de Car a partir de un diccionario con el formato del JSON.
+        Las curvas de cada alerón son opcionales y se tabulan al cargar:
+            "polars": {"front": {"aoa": [...], "cl": [...], "cd": [...]}, "rear": {...}}
+        :param data: Diccionario con los parámetros del coche
+        :return: Instancia de Car
+        """
+        polars = data.get('polars', {})
         # Instanciar objeto Aero con parámetros del JSON
         aero = Aero(
             cl_alpha_front=data['cl_alpha_front'],
@@ -127,8 +294,14 @@ class Car:
             cd_alpha_front=data['cd_alpha_front'],
             cd_alpha_rear=data['cd_alpha_rear'],
             fw_area=data['fw_area'],
-            rw_area=data['rw_area']
+            rw_area=data['rw_area'],
+            polar_front=Polar.from_dict(polars['front']) if 'front' in polars else None,
+            polar_rear=Polar.from_dict(polars['rear']) if 'rear' in polars else None,
         )
+        if data.get('aoa_front') is not None:
+            aero.aoa_front = data['aoa_front']
+        if data.get('aoa_rear') is not None:
+            aero.aoa_rear = data['aoa_rear']
         return cls(
             mass=data['mass'],
             tire_grip=data['tire_grip'],
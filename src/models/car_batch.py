@@ -0,0 +1,108 @@
+import numpy as np
+from .aero import Aero
+from .car import SETUP_PARAMS
+
+
+class CarBatch:
+    """
+    Contrapartida "struct-of-arrays" de Car/Aero: representa N coches a la vez.
+    Cada parámetro de setup (SETUP_PARAMS) es un array de longitud N y el resto
+    de parámetros se toman de un coche plantilla. Los métodos reciben arrays de
+    velocidades (una por coche) y devuelven arrays, de forma que un paso de la
+    simulación se calcula para todos los coches con operaciones vectorizadas.
+    """
+    def __init__(self, template, params_matrix):
+        """
+        Inicializa el lote de coches.
+        :param template: Instancia de Car de la que se toman los parámetros fijos (ángulos de ataque, reparto de frenada...)
+        :param params_matrix: Array (N, len(SETUP_PARAMS)) con los parámetros de cada coche, en el orden de SETUP_PARAMS
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        if params_matrix.shape[1] != len(SETUP_PARAMS):
+            raise ValueError(
+                f"params_matrix debe tener {len(SETUP_PARAMS)} columnas {SETUP_PARAMS}, "
+                f"no {params_matrix.shape[1]}"
+            )
+        self.size = params_matrix.shape[0]
+        for j, name in enumerate(SETUP_PARAMS):
+            setattr(self, name, params_matrix[:, j])
+
+        aero = template.aero
+        if aero.aoa_front is None or aero.aoa_rear is None:
+            raise ValueError("El coche plantilla necesita aoa_front y aoa_rear definidos")
+        self.rho = aero.rho
+        self.brake_bias = template.brake_bias
+        self.wheelbase = template.wheelbase
+        self.h_cg = template.h_cg
+
+        # Los coeficientes se recalculan con las pendientes de cada coche
+        cl_front = Aero.lift_coefficient(self.cl_alpha_front, aero.aoa_front, aero.polar_front)
+        cl_rear = Aero.lift_coefficient(self.cl_alpha_rear, aero.aoa_rear, aero.polar_rear)
+        cd_front = Aero.drag_coefficient(self.cd_alpha_front, aero.aoa_front, aero.polar_front)
+        cd_rear = Aero.drag_coefficient(self.cd_alpha_rear, aero.aoa_rear, aero.polar_rear)
+        # Factores k tales que F = k * v^2
+        self.k_downforce = 0.5 * self.rho * (cl_front * self.fw_area + cl_rear * self.rw_area)
+        self.k_drag = 0.5 * self.rho * (cd_front * self.fw_area + cd_rear * self.rw_area)
+
+    def max_acceleration(self, v):
+        """
+        Versión vectorizada de Car.max_acceleration.
+        :param v: Array (N,) de velocidades actuales (m/s)
+        :return: Array (N,) de aceleraciones máximas (m/s^2)
+        """
+        drag_force = self.k_drag * v**2
+        grip_force = self.tire_grip * self.mass * 9.81
+        with np.errstate(divide='ignore'):
+            power_force = np.where(v > 0, self.power / v, np.inf)
+        F_available = np.minimum(grip_force, power_force)
+        acc = (F_available - drag_force) / self.mass
+        return np.maximum(acc, 0.0)
+
+    def max_deceleration(self, v):
+        """
+        Versión vectorizada de Car.max_deceleration (valor negativo).
+        Cada coche deja de iterar la transferencia de carga cuando converge, igual que en Car.
+        :param v: Array (N,) de velocidades actuales (m/s)
+        :return: Array (N,) de desaceleraciones máximas (m/s^2, valores negativos)
+        """
+        g = 9.81
+        total_weight = self.mass * g + self.k_downforce * v**2
+        a_system = self.brake_force / self.mass
+        a = a_system.copy()
+
+        bias_f = self.brake_bias if self.brake_bias > 0 else 1e-3
+        bias_r = (1 - self.brake_bias) if (1 - self.brake_bias) > 0 else 1e-3
+
+        active = np.ones(self.size, dtype=bool)
+        for _ in range(10):
+            delta_w = self.mass * a * self.h_cg / self.wheelbase
+            grip_front = self.tire_grip * (total_weight * 0.5 + delta_w)
+            grip_rear = self.tire_grip * (total_weight * 0.5 - delta_w)
+            a_front_limit = grip_front / (self.mass * bias_f)
+            a_rear_limit = grip_rear / (self.mass * bias_r)
+            a_allowed = np.minimum(a_system, np.minimum(a_front_limit, a_rear_limit))
+
+            converged = np.abs(a_allowed - a) < 1e-3
+            a = np.where(active, a_allowed, a)
+            active &= ~converged
+            if not active.any():
+                break
+        return -a
+
+    def max_velocity_array(self, radii, v_limit=np.inf):
+        """
+        Versión vectorizada de Car.max_velocity_array para todos los coches.
+        :param radii: Array (P,) de radios de curva (m)
+        :param v_limit: Velocidad usada donde no existe límite por agarre (m/s)
+        :return: Array (P, N) de velocidades máximas (m/s)
+        """
+        radii = np.asarray(radii, dtype=float)[:, None]
+        g = 9.81
+
+        v_max = np.full((radii.shape[0], self.size), float(v_limit))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            denom = 1.0 - self.tire_grip * self.k_downforce * radii / self.mass
+            v_sq = self.tire_grip * g * radii / denom
+            solvable = np.isfinite(radii) & (denom > 0) & np.isfinite(v_sq) & (v_sq >= 0)
+        v_max[solvable] = np.sqrt(v_sq[solvable])
+        return v_max
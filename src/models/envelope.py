@@ -0,0 +1,104 @@
+from bisect import bisect_right
+
+import numpy as np
+
+
+class PerformanceEnvelope:
+    """
+    Envolvente de prestaciones (GGV simplificado) de un coche para un setup fijo.
+    Tabula sobre una rejilla de velocidades la aceleración máxima, la deceleración
+    máxima y el agarre total con downforce, y las consulta por interpolación lineal.
+    Por encima de la rejilla se usa el último valor tabulado.
+
+    Las consultas escalares (acceleration_at, deceleration_at, max_velocity) están
+    pensadas para los bucles de LapSimulator; las vectorizadas (acceleration,
+    deceleration, grip) aceptan arrays de velocidades con np.interp.
+
+    Las pasadas hacia delante y hacia atrás son recurrencias: la velocidad en la que se
+    consulta cada punto depende del anterior, así que no se pueden agrupar en una sola
+    llamada vectorizada. Para un único valor, bisect sobre listas de Python es varias
+    veces más rápido que np.searchsorted / np.interp (cada llamada a numpy cuesta ~1 µs).
+    """
+    def __init__(self, car, v_grid):
+        """
+        Calcula las tablas evaluando el modelo del coche en cada punto de la rejilla.
+        :param car: Instancia de Car
+        :param v_grid: Array creciente de velocidades (m/s)
+        """
+        self.v_grid = np.asarray(v_grid, dtype=float)
+        if self.v_grid.ndim != 1 or len(self.v_grid) < 2 or np.any(np.diff(self.v_grid) <= 0):
+            raise ValueError("v_grid debe ser un array creciente con al menos dos velocidades")
+        self.mass = car.mass
+
+        self.acc = self._tabulate(car.max_acceleration, self.v_grid)
+        self.dec = self._tabulate(car.max_deceleration, self.v_grid)
+        self.grip_force = self._tabulate(lambda v: self._total_grip(car, v), self.v_grid)
+
+        # Listas para las consultas escalares (más rápidas que np.interp con un solo valor)
+        self._v = self.v_grid.tolist()
+        self._acc = self.acc.tolist()
+        self._dec = self.dec.tolist()
+        self._grip = self.grip_force.tolist()
+
+        # Error máximo de interpolación, medido en los puntos medios de la rejilla
+        v_mid = 0.5 * (self.v_grid[:-1] + self.v_grid[1:])
+        self.max_error = {
+            'acceleration': float(np.max(np.abs(self.acceleration(v_mid) - self._tabulate(car.max_acceleration, v_mid)))),
+            'deceleration': float(np.max(np.abs(self.deceleration(v_mid) - self._tabulate(car.max_deceleration, v_mid)))),
+            'grip': float(np.max(np.abs(self.grip(v_mid) - self._tabulate(lambda v: self._total_grip(car, v), v_mid)))),
+        }
+
+    @staticmethod
+    def _total_grip(car, v):
+        # Fuerza de agarre total, incluido el downforce (igual que Car.max_velocity)
+        return car.tire_grip * (car.mass * 9.81 + car.aero.downforce(v))
+
+    @staticmethod
+    def _tabulate(func, v_values):
+        return np.array([func(v) for v in v_values.tolist()], dtype=float)
+
+    def _lookup(self, table, v):
+        # Interpolación lineal escalar por búsqueda binaria en la rejilla
+        i = bisect_right(self._v, v) - 1
+        if i < 0:
+            return table[0]
+        if i >= len(self._v) - 1:
+            return table[-1]
+        v0, v1 = self._v[i], self._v[i+1]
+        return table[i] + (table[i+1] - table[i]) * (v - v0) / (v1 - v0)
+
+    def acceleration_at(self, v):
+        """
+        Aceleración máxima interpolada (m/s^2) a la velocidad v (m/s).
+        """
+        return self._lookup(self._acc, v)
+
+    def deceleration_at(self, v):
+        """
+        Deceleración máxima interpolada (m/s^2, valor negativo) a la velocidad v (m/s).
+        """
+        return self._lookup(self._dec, v)
+
+    def max_velocity(self, radius, v):
+        """
+        Velocidad máxima en curva (m/s) con el agarre interpolado a la velocidad v (m/s).
+        """
+        return (self._lookup(self._grip, v) * radius / self.mass) ** 0.5
+
+    def acceleration(self, v):
+        """
+        Aceleración máxima interpolada para un array de velocidades.
+        """
+        return np.interp(v, self.v_grid, self.acc)
+
+    def deceleration(self, v):
+        """
+        Deceleración máxima interpolada (valores negativos) para un array de velocidades.
+        """
+        return np.interp(v, self.v_grid, self.dec)
+
+    def grip(self, v):
+        """
+        Fuerza de agarre total interpolada (N) para un array de velocidades.
+        """
+        return np.interp(v, self.v_grid, self.grip_force)
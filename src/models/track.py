@@ -1,17 +1,77 @@
 import numpy as np
 import json
 
+HEADING_NOISE_RATIO = 5  # El ruido de la orientación debe quedar en tolerance / HEADING_NOISE_RATIO
+MAX_SMOOTHING = 50.0  # Ventana máxima del ajuste elegida según el ruido (m)
+
+
+class TrackGeometry:
+    """
+    Geometría del trazado de un circuito en los puntos de la discretización del simulador
+    (LapSimulator con el mismo delta_s), más un punto final que cierra el trazado.
+    Todos los atributos son arrays de n_puntos + 1 elementos.
+    """
+    __slots__ = ("x", "y", "heading", "distance", "curvature", "segment")
+
+    def __init__(self, x, y, heading, distance, curvature, segment):
+        """
+        :param x: Coordenada x de cada punto (m)
+        :param y: Coordenada y de cada punto (m)
+        :param heading: Orientación de la tangente (rad, acumulada sin saltos de 2 pi)
+        :param distance: Distancia recorrida desde la salida (m)
+        :param curvature: Curvatura con signo (1/m, positiva hacia la izquierda)
+        :param segment: Índice del segmento de cada punto
+        """
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.distance = distance
+        self.curvature = curvature
+        self.segment = segment
+
+
+class Segments(tuple):
+    """
+    Tupla inmutable de segmentos (longitud, radio) con el hash calculado una sola vez.
+    Es la clave de las cachés por circuito (discretización, geometría): buscarla no
+    reconstruye ni recorre los segmentos en cada vuelta.
+    """
+    def __new__(cls, segments):
+        self = super().__new__(cls, (tuple(segment) for segment in segments))
+        self._hash = tuple.__hash__(self)
+        return self
+
+    def __hash__(self):
+        return self._hash
+
+
 class Track:
     """
     Clase que representa un circuito compuesto por segmentos.
-    Permite cargar los segmentos desde un archivo JSON.
+    Permite cargar los segmentos desde un archivo JSON o desde la línea central (CSV).
     """
-    def __init__(self, segments):
+    def __init__(self, segments, directions=None):
         """
         Inicializa el circuito con una lista de segmentos.
-        :param segments: Lista de tuplas (longitud, radio)
+        :param segments: Lista (o cualquier secuencia) de tuplas (longitud, radio)
+        :param directions: Sentido de giro de cada segmento, 1 (izquierda) o -1 (derecha).
+            Solo afecta al trazado (geometry); por defecto todas las curvas giran a la izquierda
         """
-        self.segments = segments  # Lista de tuplas (longitud, radio)
+        self.segments = segments
+        self.directions = directions
+        self._geometry = {}  # (segmentos, sentidos, delta_s) -> TrackGeometry
+
+    @property
+    def segments(self):
+        """
+        Segmentos (longitud, radio) del circuito, como Segments (inmutable). Para cambiarlos
+        se asigna una lista nueva.
+        """
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments):
+        self._segments = Segments(segments)
 
     @classmethod
     def from_json(cls, file_path):
@@ -22,8 +82,18 @@ class Track:
         """
         with open(file_path, 'r') as f:
             data = json.load(f)
-        # Cada segmento es un dict con 'length' y 'radius'
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crea una instancia de Track a partir de un diccionario con el formato del JSON.
+        :param data: Diccionario con la lista 'segments'
+        :return: Instancia de Track
+        """
+        # Cada segmento es un dict con 'length', 'radius' y, opcionalmente, 'direction'
         segments = []
+        directions = []
         for seg in data['segments']:
             length = seg['length']
             radius = seg['radius']
@@ -31,7 +101,245 @@ class Track:
             if radius >= 1e12:
                 radius = np.inf
             segments.append((length, radius))
-        return cls(segments)
+            directions.append(seg.get('direction', 1))
+        return cls(segments, directions if any(d != 1 for d in directions) else None)
+
+    def to_dict(self):
+        """
+        Segmentos del circuito en el formato del JSON (inverso de from_dict).
+        Las rectas se guardan con radio 1e12, como en track.json.
+        """
+        directions = self.directions or [1] * len(self.segments)
+        segments = []
+        for (length, radius), direction in zip(self.segments, directions):
+            segment = {'length': float(length), 'radius': 1e12 if np.isinf(radius) else float(radius)}
+            if direction != 1:
+                segment['direction'] = int(direction)
+            segments.append(segment)
+        return {'segments': segments}
+
+    def to_json(self, file_path):
+        """
+        Guarda el circuito en un archivo JSON (p. ej. tras importarlo con from_csv).
+        """
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def geometry(self, delta_s=1.0):
+        """
+        Calcula el trazado del circuito (x, y, orientación, distancia y curvatura) en los
+        puntos de la discretización con paso delta_s, de forma vectorizada para todos los
+        segmentos. Se guarda en el circuito y se reutiliza mientras no cambien los segmentos.
+        :param delta_s: Resolución espacial (m), la misma que en LapSimulator
+        :return: Instancia de TrackGeometry
+        """
+        key = (self.segments, None if self.directions is None else tuple(self.directions), float(delta_s))
+        geometry = self._geometry.get(key)
+        if geometry is None:
+            if self._geometry and next(iter(self._geometry))[:2] != key[:2]:
+                self._geometry.clear()  # Han cambiado los segmentos: las geometrías guardadas no sirven
+            geometry = self._geometry[key] = self._compute_geometry(delta_s)
+        return geometry
+
+    def _compute_geometry(self, delta_s):
+        lengths, radii = np.array(self.segments, dtype=float).reshape(-1, 2).T
+        directions = np.ones(len(lengths)) if self.directions is None else np.asarray(self.directions, dtype=float)
+        curvature = np.where(np.isinf(radii), 0.0, directions / radii)
+
+        # Orientación y posición al inicio de cada segmento
+        turn = curvature * lengths
+        heading0 = np.concatenate(([0.0], np.cumsum(turn)))
+        dx, dy = self._advance(heading0[:-1], curvature, lengths)
+        x0 = np.concatenate(([0.0], np.cumsum(dx)))
+        y0 = np.concatenate(([0.0], np.cumsum(dy)))
+        s0 = np.concatenate(([0.0], np.cumsum(lengths)))
+
+        # Puntos de la discretización: ceil(longitud / delta_s) por segmento, como LapSimulator
+        steps = np.ceil(lengths / delta_s).astype(int)
+        segment = np.repeat(np.arange(len(lengths)), steps)
+        first = np.repeat(np.cumsum(steps) - steps, steps)
+        local = np.minimum((np.arange(len(segment)) - first) * delta_s, lengths[segment])
+        dx, dy = self._advance(heading0[segment], curvature[segment], local)
+
+        # Punto final que cierra el trazado
+        end = len(lengths)
+        return TrackGeometry(
+            x=np.append(x0[segment] + dx, x0[end]),
+            y=np.append(y0[segment] + dy, y0[end]),
+            heading=np.append(heading0[segment] + curvature[segment] * local, heading0[end]),
+            distance=np.append(s0[segment] + local, s0[end]),
+            curvature=np.append(curvature[segment], curvature[-1] if end else 0.0),
+            segment=np.append(segment, end - 1),
+        )
+
+    @staticmethod
+    def _advance(heading, curvature, length):
+        # Desplazamiento (dx, dy) al recorrer length metros con curvatura constante
+        turn = curvature * length
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = np.where(curvature != 0, (np.sin(heading + turn) - np.sin(heading)) / curvature, length * np.cos(heading))
+            dy = np.where(curvature != 0, (np.cos(heading) - np.cos(heading + turn)) / curvature, length * np.sin(heading))
+        return dx, dy
+
+    @classmethod
+    def from_csv(cls, file_path, **kwargs):
+        """
+        Importa un circuito a partir de su línea central en un CSV con columnas x, y (m).
+        La primera fila puede ser una cabecera. Ver from_centerline para las opciones.
+        :param file_path: Ruta al archivo CSV
+        :return: Instancia de Track
+        """
+        with open(file_path, 'r') as f:
+            first = f.readline()
+        try:
+            float(first.split(',')[0])
+            header = 0
+        except ValueError:
+            header = 1
+        # np.loadtxt lee las columnas en C, sin convertir fila a fila en Python
+        points = np.loadtxt(file_path, delimiter=',', skiprows=header, usecols=(0, 1), ndmin=2)
+        return cls.from_centerline(points[:, 0], points[:, 1], **kwargs)
+
+    @classmethod
+    def from_centerline(cls, x, y, tolerance=0.02, smoothing=None, step=None, min_length=None,
+                        straight_radius=2000.0, closed=None):
+        """
+        Convierte una línea central (x, y) en segmentos de curvatura constante.
+        1. Se remuestrea la línea a paso uniforme step por distancia recorrida.
+        2. La orientación en cada punto es la de la pendiente de un ajuste por mínimos cuadrados
+           de las posiciones en una ventana de smoothing metros (circular si el circuito es
+           cerrado), sin el ruido de medida. Sin smoothing, la ventana se elige según el ruido:
+           la más pequeña (duplicándola desde tres puntos) en la que el ruido de la orientación
+           es menor que tolerance / HEADING_NOISE_RATIO, hasta MAX_SMOOTHING metros.
+        3. La orientación frente a la distancia se aproxima por tramos rectos (Ramer-Douglas-
+           Peucker) con un error máximo de tolerance radianes y tramos de al menos min_length
+           metros: cada tramo es un segmento de curvatura constante y sus extremos conservan
+           la orientación, así que el error no se acumula a lo largo del circuito.
+        4. Los tramos con radio mayor que straight_radius se convierten en rectas.
+        :param x: Coordenadas x de la línea central (m)
+        :param y: Coordenadas y de la línea central (m)
+        :param tolerance: Error máximo de orientación admitido (rad)
+        :param smoothing: Longitud de la ventana de ajuste (m); None para elegirla según el ruido
+            de los datos y 0 para la mínima (tres puntos). Una ventana mayor filtra más ruido,
+            pero también abre las curvas más cortas que ella
+        :param step: Paso del remuestreo (m); por defecto la mediana de la separación entre puntos
+        :param min_length: Longitud mínima de un segmento (m); por defecto la de la ventana, ya
+            que no se pueden resolver detalles más cortos
+        :param straight_radius: Radio a partir del cual un tramo se trata como recta (m)
+        :param closed: Si el circuito es cerrado; por defecto si el último punto está a menos
+            de dos pasos del primero
+        :return: Instancia de Track (con directions, el sentido de giro de cada segmento)
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        gaps = np.hypot(np.diff(x), np.diff(y))
+        keep = np.concatenate(([True], gaps > 0))  # Puntos repetidos
+        x, y = x[keep], y[keep]
+        gaps = gaps[gaps > 0]
+        if len(x) < 3:
+            raise ValueError("La línea central necesita al menos tres puntos distintos")
+        if step is None:
+            step = float(np.median(gaps))
+        if closed is None:
+            closed = np.hypot(x[-1] - x[0], y[-1] - y[0]) < 2 * step
+        if closed and np.hypot(x[-1] - x[0], y[-1] - y[0]) > 0:
+            x, y = np.append(x, x[0]), np.append(y, y[0])
+            gaps = np.append(gaps, np.hypot(x[-1] - x[-2], y[-1] - y[-2]))
+
+        # 1. Remuestreo a paso uniforme
+        distance = np.concatenate(([0.0], np.cumsum(gaps)))
+        n = max(int(round(distance[-1] / step)), 2)
+        s = np.linspace(0.0, distance[-1], n + 1)
+        xs, ys = np.interp(s, distance, x), np.interp(s, distance, y)
+        step = s[1] - s[0]
+
+        # 2. Ventana del ajuste (half puntos a cada lado) y orientación en cada punto
+        if smoothing is None:
+            half = 1
+            while (4 * half + 1) * step <= MAX_SMOOTHING and 3 * (4 * half + 1) <= n:
+                # El ruido se mide solo en un punto por ventana: puntos con ruido independiente
+                stride = 2 * half + 1
+                if cls._heading_noise(xs, ys, half, closed, stride) <= tolerance / HEADING_NOISE_RATIO:
+                    break
+                half *= 2
+        else:
+            half = min(max(int(round(smoothing / step / 2)), 1), max((n - 1) // 2, 1))
+        window = (2 * half + 1) * step
+        if min_length is None:
+            min_length = window
+        dx, dy = (cls._local_slope(values, half, closed) for values in (xs, ys))
+        heading = np.unwrap(np.arctan2(dy, dx))
+        # Distancia recorrida por la línea ajustada (sin el zigzag del ruido)
+        speed = np.hypot(dx, dy)
+        s = np.concatenate(([0.0], np.cumsum(0.5 * (speed[:-1] + speed[1:]))))
+
+        # 3. Aproximación por tramos de orientación lineal (curvatura constante)
+        breaks = cls._simplify(s, heading, tolerance, max(int(min_length / step), 1))
+        lengths = np.diff(s[breaks])
+        curvature = np.diff(heading[breaks]) / lengths
+
+        # 4. Segmentos (longitud, radio) y sentido de giro
+        with np.errstate(divide='ignore'):
+            radii = np.abs(1.0 / curvature)
+        radii[radii > straight_radius] = np.inf
+        directions = np.where(curvature < 0, -1, 1)
+        segments = [(float(length), float(radius)) for length, radius in zip(lengths, radii)]
+        return cls(segments, [int(d) for d in directions])
+
+    @staticmethod
+    def _local_slope(values, half, closed, stride=1):
+        """
+        Pendiente (por punto de remuestreo) de la recta de mínimos cuadrados en una ventana de
+        2 * half + 1 puntos centrada en cada punto, o en uno de cada stride puntos. Coincide
+        con la del ajuste cuadrático. En un circuito cerrado el primer y el último punto
+        coinciden; en uno abierto los extremos se prolongan por simetría respecto al extremo.
+        """
+        offsets = np.arange(-half, half + 1, dtype=float)
+        kernel = offsets / np.sum(offsets ** 2)
+        if closed:
+            loop = values[:-1]
+            padded = np.concatenate((loop[len(loop) - half:], loop, loop[:half + 1]))
+        else:
+            padded = np.concatenate((2 * values[0] - values[half:0:-1], values,
+                                     2 * values[-1] - values[-2:-half - 2:-1]))
+        if stride == 1:
+            return np.convolve(padded, kernel[::-1], mode='valid')
+        return np.lib.stride_tricks.sliding_window_view(padded, len(kernel))[::stride] @ kernel
+
+    @classmethod
+    def _heading_noise(cls, xs, ys, half, closed, stride):
+        # Desviación típica robusta del ruido de la orientación: segundas diferencias de la
+        # orientación en puntos separados stride (cero en tramos de curvatura constante)
+        heading = np.unwrap(np.arctan2(*(cls._local_slope(values, half, closed, stride) for values in (ys, xs))))
+        d2 = np.diff(heading, 2)
+        if len(d2) == 0:
+            return 0.0
+        return 1.4826 * float(np.median(np.abs(d2 - np.median(d2)))) / np.sqrt(6)
+
+    @staticmethod
+    def _simplify(s, heading, tolerance, min_points=1):
+        """
+        Ramer-Douglas-Peucker sobre la curva (s, heading): índices de los extremos de los
+        tramos lineales con error máximo tolerance y al menos min_points puntos por tramo.
+        Cada división se evalúa vectorizada.
+        """
+        keep = np.zeros(len(s), dtype=bool)
+        keep[[0, -1]] = True
+        stack = [(0, len(s) - 1)]
+        while stack:
+            a, b = stack.pop()
+            lo, hi = a + min_points, b - min_points  # Puntos donde se puede dividir
+            if hi < lo:
+                continue
+            slope = (heading[b] - heading[a]) / (s[b] - s[a])
+            error = np.abs(heading[lo:hi + 1] - (heading[a] + slope * (s[lo:hi + 1] - s[a])))
+            i = int(np.argmax(error))
+            if error[i] > tolerance:
+                m = lo + i
+                keep[m] = True
+                stack.append((a, m))
+                stack.append((m, b))
+        return np.flatnonzero(keep)
 
     @classmethod
     def example_track(cls):
@@ -45,3 +353,49 @@ class Track:
             (200, np.inf),   # recta de 200 m
             (150, 30),       # curva de 150 m, radio 30 m
         ])
+
+    @classmethod
+    def oval(cls, length, radius=100.0):
+        """
+        Genera un óvalo: dos rectas iguales unidas por dos curvas de 180 grados.
+        :param length: Longitud total del circuito (m)
+        :param radius: Radio de las curvas (m)
+        :return: Instancia de Track
+        """
+        straight = (length - 2 * np.pi * radius) / 2
+        if straight < 0:
+            raise ValueError(f"Un óvalo de {length} m no admite curvas de radio {radius} m")
+        return cls([
+            (straight, np.inf),
+            (np.pi * radius, radius),
+            (straight, np.inf),
+            (np.pi * radius, radius),
+        ])
+
+    @classmethod
+    def synthetic(cls, length, seed=0, min_radius=15.0, max_radius=600.0):
+        """
+        Genera un circuito aleatorio reproducible alternando rectas y curvas.
+        Las rectas miden entre 50 y 800 m; las curvas tienen un radio log-uniforme entre
+        min_radius y max_radius y giran entre 20 y 180 grados. El último segmento se
+        recorta para que la longitud total sea exactamente length.
+        :param length: Longitud total del circuito (m)
+        :param seed: Semilla del generador aleatorio
+        :param min_radius: Radio mínimo de las curvas (m)
+        :param max_radius: Radio máximo de las curvas (m)
+        :return: Instancia de Track
+        """
+        rng = np.random.default_rng(seed)
+        segments = []
+        total = 0.0
+        while total < length:
+            if len(segments) % 2 == 0:
+                segment = (float(rng.uniform(50, 800)), np.inf)
+            else:
+                radius = float(np.exp(rng.uniform(np.log(min_radius), np.log(max_radius))))
+                angle = np.radians(rng.uniform(20, 180))
+                segment = (float(radius * angle), radius)
+            segment = (min(segment[0], length - total), segment[1])
+            segments.append(segment)
+            total += segment[0]
+        return cls(segments)
@@ -0,0 +1,272 @@
+"""
+Memoización persistente de evaluaciones de tiempo de vuelta para los optimizadores.
+
+Cada evaluación se indexa por el vector de parámetros cuantizado (resolución
+configurable por parámetro) y por un hash de contexto que identifica el coche base,
+el circuito, la configuración del simulador y la versión del modelo (ver context_hash).
+Con cuantización, todos los vectores de una celda reciben el resultado del primero que
+se evaluó en ella. Hay dos niveles:
+- memoria: LRU acotada, local a cada proceso;
+- disco (opcional): base de datos SQLite en modo WAL que sobrevive a reinicios y que
+  pueden leer y escribir a la vez varios procesos (cada uno abre su propia conexión).
+Dentro de un proceso la caché se puede usar desde varios hilos (geneticalgorithm evalúa
+cada individuo en un hilo de func_timeout): la conexión se comparte entre hilos y todas
+las lecturas y escrituras se serializan con un cerrojo.
+
+Uso:
+    context = context_hash(car, track, delta_s=1.0, engine="numpy")
+    with FitnessCache(evaluator.evaluate, context, path="fitness.sqlite", batched=True) as cache:
+        lap_times = cache.evaluate(population)
+        print(cache.stats())
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SQLITE_TIMEOUT = 30.0  # Espera máxima (s) si otro proceso tiene bloqueada la base de datos
+SQLITE_CHUNK = 500  # Claves por consulta (límite de parámetros de SQLite)
+# Versión de la física del coche y del simulador. Forma parte de context_hash: hay que
+# subirla con cualquier cambio que altere los tiempos de vuelta para que las cachés
+# guardadas en disco (y los barridos a medias) no devuelvan resultados del modelo anterior
+MODEL_VERSION = 1
+
+
+def context_hash(car, track, **config):
+    """
+    Hash que identifica el contexto de una evaluación: todos los parámetros del coche
+    base, los segmentos del circuito, la configuración del simulador y MODEL_VERSION.
+    :param car: Instancia de Car o CarTemplate
+    :param track: Instancia de Track
+    :param config: Configuración del simulador (delta_s, engine, lap...)
+    :return: Hash hexadecimal
+    """
+    data = {
+        'car': car.to_dict(),
+        'track': [[float(length), float(radius)] for length, radius in track.segments],
+        'config': config,
+        'model_version': MODEL_VERSION,
+    }
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=float).encode()).hexdigest()
+
+
+class FitnessCache:
+    """
+    Caché de dos niveles (memoria LRU + SQLite) alrededor de una función de fitness.
+    """
+    def __init__(self, function, context, resolution=None, path=None, max_memory=100000, batched=False):
+        """
+        :param function: Función de fitness. Recibe un vector de parámetros, o una matriz
+            (N, n_params) si batched es True (p. ej. ParallelEvaluator.evaluate)
+        :param context: Hash de contexto (ver context_hash)
+        :param resolution: Resolución de cuantización, escalar o una por parámetro. Los vectores
+            que caen en la misma celda comparten resultado: el del primer vector de la celda
+            que se evaluó. None: solo coincidencias exactas
+        :param path: Archivo SQLite del nivel en disco (None: solo memoria)
+        :param max_memory: Número máximo de resultados en memoria
+        :param batched: Si la función evalúa matrices de parámetros
+        """
+        self.function = function
+        self.batched = batched
+        self.resolution = None if resolution is None else np.asarray(resolution, dtype=float)
+        # La resolución forma parte del contexto: con otra cuantización las claves no son comparables
+        key_data = json.dumps({'context': context, 'resolution': None if resolution is None else self.resolution.tolist()})
+        self.context = hashlib.sha1(key_data.encode()).hexdigest()
+        self.path = path
+        self.max_memory = max_memory
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()  # Protege la LRU y la conexión SQLite entre hilos
+        self._conn = None
+        self._pid = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, x):
+        """
+        Clave de un vector de parámetros: sus valores exactos o las celdas de cuantización.
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        if self.resolution is None:
+            return x.tobytes()
+        return np.round(x / self.resolution).astype(np.int64).tobytes()
+
+    def evaluate(self, params_matrix):
+        """
+        Evalúa un conjunto de vectores de parámetros, calculando solo los que no están en caché.
+        Los que faltan se evalúan juntos (una sola llamada si batched) y sin repetir celdas.
+        :param params_matrix: Array (N, n_params)
+        :return: Array (N,) de resultados
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        keys = [self.key(x) for x in params_matrix]
+        values = np.empty(len(keys))
+
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._memory.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._memory.move_to_end(key)
+                    values[i] = value
+                    self.memory_hits += 1
+
+        if missing and self.path is not None:
+            found = self._disk_get({keys[i] for i in missing})
+            still_missing = []
+            for i in missing:
+                if keys[i] in found:
+                    values[i] = found[keys[i]]
+                    self._remember(keys[i], values[i])
+                    self.disk_hits += 1
+                else:
+                    still_missing.append(i)
+            missing = still_missing
+
+        if missing:
+            # Una evaluación por celda; las repeticiones dentro del lote son aciertos
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            rows = list(first.values())
+            if self.batched:
+                results = np.asarray(self.function(params_matrix[rows]), dtype=float)
+            else:
+                results = np.array([self.function(params_matrix[i]) for i in rows], dtype=float)
+            computed = dict(zip(first, results.tolist()))
+            self._save(computed)
+            for i in missing:
+                values[i] = computed[keys[i]]
+            self.misses += len(rows)
+            self.memory_hits += len(missing) - len(rows)
+        return values
+
+    def store(self, params_matrix, values):
+        """
+        Guarda resultados ya calculados por otra vía (p. ej. el tiempo de vuelta que
+        devuelve el cálculo del gradiente exacto).
+        :param params_matrix: Array (N, n_params) o un único vector
+        :param values: Array (N,) de resultados o un único valor
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        self._save({self.key(x): value for x, value in zip(params_matrix, values.tolist())})
+
+    def __call__(self, x):
+        """
+        Evalúa un único vector de parámetros (interfaz de función de fitness).
+        """
+        return float(self.evaluate(x)[0])
+
+    def _save(self, computed):
+        for key, value in computed.items():
+            self._remember(key, value)
+        if self.path is not None:
+            self._disk_put(computed)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _connection(self):
+        # One connection per process: SQLite connections must not cross a fork.
+        # Threads share it (check_same_thread=False); callers hold self._lock
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fitness ("
+                "context TEXT NOT NULL, params BLOB NOT NULL, value REAL, "
+                "PRIMARY KEY (context, params)) WITHOUT ROWID"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _disk_get(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), SQLITE_CHUNK):
+                chunk = keys[start:start + SQLITE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT params, value FROM fitness WHERE context = ? AND params IN ({placeholders})",
+                    [self.context, *chunk],
+                )
+                # SQLite guarda NaN como NULL
+                found.update((params, np.nan if value is None else value) for params, value in rows)
+        return found
+
+    def _disk_put(self, computed):
+        with self._lock:
+            conn = self._connection()
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait (busy timeout)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO fitness (context, params, value) VALUES (?, ?, ?)",
+                    [(self.context, key, None if np.isnan(value) else value) for key, value in computed.items()],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self):
+        """
+        Estadísticas de aciertos y fallos.
+        :return: Diccionario con memory_hits, disk_hits, misses, hit_rate y memory_size
+        """
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / total if total else 0.0,
+            'memory_size': len(self._memory),
+        }
+
+    def clear(self):
+        """
+        Vacía el nivel en memoria (el nivel en disco se conserva).
+        """
+        self._memory.clear()
+
+    def close(self):
+        """
+        Cierra la conexión con la base de datos de este proceso.
+        """
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # The SQLite connection stays in its process; a copy reconnects lazily
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ..simulator.lap_simulator import LapSimulator
+from ..utils.profiling import Profiler
+
+# Estado de cada proceso trabajador, inicializado una sola vez por _init_worker
+_worker_state = {}
+
+
+def _init_worker(car, shm_name, n_points, delta_s, engine, lap, profile):
+    """
+    Inicializa un proceso trabajador: se conecta a la memoria compartida con los
+    radios discretizados y crea un simulador que los reutiliza en cada tarea.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    radii = np.ndarray((n_points,), dtype=float, buffer=shm.buf)
+    radii.flags.writeable = False
+    _worker_state['shm'] = shm  # Mantener la referencia viva mientras viva el proceso
+    _worker_state['car'] = car
+    profiler = Profiler() if profile else None
+    _worker_state['simulator'] = LapSimulator(car, None, delta_s=delta_s, engine=engine, radii=radii, lap=lap,
+                                              profiler=profiler)
+
+
+def _evaluate_chunk(params_chunk, return_speeds=False):
+    """
+    Evalúa un bloque de setups en el proceso trabajador.
+    Con el motor "numpy" el bloque entero se simula con simulate_batch.
+    Si return_speeds es True devuelve también los perfiles de velocidad, (tiempos, v).
+    Si se perfila, devuelve además los datos del perfilador del bloque (to_dict).
+    """
+    simulator = _worker_state['simulator']
+    if simulator.engine == "numpy":
+        result = simulator.simulate_batch(params_chunk, return_speeds=return_speeds)
+    else:
+        template = _worker_state['car']
+        lap_times = np.empty(len(params_chunk))
+        speeds = []
+        for j, x in enumerate(params_chunk):
+            simulator.car = template.with_params(x)
+            lap_times[j], v = simulator.simulate_lap()
+            speeds.append(v)
+        simulator.car = template
+        result = (lap_times, np.array(speeds)) if return_speeds else lap_times
+
+    if simulator.profiler is None:
+        return result
+    profile = simulator.profiler.to_dict()
+    simulator.profiler.reset()
+    return result, profile
+
+
+class ParallelEvaluator:
+    """
+    Evaluador de tiempos de vuelta que reparte una población de setups entre
+    varios procesos. Cada proceso se inicializa una sola vez con el coche plantilla
+    y los radios discretizados del circuito, que se comparten mediante memoria
+    compartida en lugar de enviarse con cada tarea. Por tarea solo viaja un bloque
+    de la matriz de parámetros (en el orden de SETUP_PARAMS).
+
+    Uso:
+        with ParallelEvaluator(car, track) as evaluator:
+            lap_times = evaluator.evaluate(params_matrix)
+    """
+    def __init__(self, car, track, delta_s=1.0, engine="numpy", workers=None, lap="standing", profile=False):
+        """
+        Inicializa el evaluador y arranca el pool de procesos.
+        :param car: Coche plantilla (Instancia de Car con los ángulos de ataque definidos)
+        :param track: Instancia de Track
+        :param delta_s: Resolución espacial (m)
+        :param engine: Motor de LapSimulator usado en los trabajadores ("python" o "numpy")
+        :param workers: Número de procesos, por defecto os.cpu_count()
+        :param lap: Vuelta que se usa como tiempo: "standing" (desde parado) o "flying" (lanzada)
+        :param profile: Si es True los trabajadores perfilan las simulaciones y los datos de
+            todos ellos se acumulan en self.profiler (ver src/utils/profiling.py)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.delta_s = delta_s
+        self.engine = engine
+        self.lap = lap
+        self.profiler = Profiler() if profile else None
+
+        radii = LapSimulator(car, track, delta_s=delta_s, engine="numpy")._discretize_numpy()
+        self.n_points = len(radii)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(radii.nbytes, 1))
+        np.ndarray(radii.shape, dtype=float, buffer=self._shm.buf)[:] = radii
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(car, self._shm.name, len(radii), delta_s, engine, lap, profile),
+        )
+
+    def evaluate(self, params_matrix, return_speeds=False):
+        """
+        Evalúa un conjunto de setups en paralelo.
+        :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS
+        :param return_speeds: Si es True devuelve también los perfiles de velocidad
+        :return: Array (N,) de tiempos de vuelta, en el mismo orden que las filas, o tupla
+            (tiempos, v) con v de forma (N, puntos)
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        n_chunks = min(len(params_matrix), self.workers)
+        if n_chunks == 0:
+            return (np.zeros(0), np.zeros((0, self.n_points))) if return_speeds else np.zeros(0)
+        chunks = np.array_split(params_matrix, n_chunks)
+        results = list(self._executor.map(_evaluate_chunk, chunks, [return_speeds] * n_chunks))
+        if self.profiler is not None:
+            for _, profile in results:
+                self.profiler.merge(profile)
+            results = [result for result, _ in results]
+        if return_speeds:
+            return np.concatenate([lap_times for lap_times, _ in results]), np.concatenate([v for _, v in results])
+        return np.concatenate(results)
+
+    def __call__(self, x):
+        """
+        Evalúa un único setup (interfaz de función de fitness).
+        :param x: Vector de parámetros en el orden de SETUP_PARAMS
+        :return: Tiempo de vuelta (s)
+        """
+        return float(self.evaluate(x)[0])
+
+    def close(self):
+        """
+        Detiene los procesos y libera la memoria compartida.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._shm.close()
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
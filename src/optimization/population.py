@@ -0,0 +1,361 @@
+"""
+Optimizadores de población por lotes: CMA-ES y evolución diferencial.
+
+A diferencia de geneticalgorithm, que llama a la función de fitness individuo a
+individuo, aquí cada generación se propone entera como una matriz de parámetros y se
+evalúa con una sola llamada a la función por lotes (ParallelEvaluator.evaluate,
+SeasonEvaluator.evaluate, MultiFidelity.evaluate, FitnessCache.evaluate con batched...).
+El tiempo de cada generación es el de una evaluación por lotes más unas operaciones
+de numpy sobre matrices de n_params columnas.
+
+Los dos algoritmos trabajan en el espacio normalizado [0, 1]^n_params de los límites
+(varbound / SETUP_BOUNDS): todos los parámetros tienen la misma escala, aunque la
+potencia se mida en cientos de miles de vatios y el agarre en décimas.
+
+Uso:
+    optimizer = CMAES(evaluator.evaluate, SETUP_BOUNDS, seed=0)
+    output = optimizer.run()                  # {'variable': mejor setup, 'function': mejor tiempo, ...}
+    plt.plot(optimizer.report)                # mejor valor de cada generación
+También se pueden llevar las generaciones a mano (interfaz ask / tell):
+    params = optimizer.ask()
+    optimizer.tell(evaluate(params))
+
+Con la misma semilla y una función determinista la optimización se repite exactamente.
+"""
+import time
+
+import numpy as np
+
+
+class PopulationOptimizer:
+    """
+    Base de los optimizadores: normalización de los límites, evaluación por lotes,
+    mejor solución, criterios de parada e historial de convergencia.
+    Las subclases implementan ask, tell y spread.
+    """
+    default_population = 20
+
+    def __init__(self, function, bounds, population_size=None, seed=None, batched=True, max_generations=100,
+                 patience=10, tol=1e-6, tol_x=1e-9, target=None, log=print):
+        """
+        :param function: Función que se minimiza. Recibe una matriz (N, n_params) y devuelve
+            (N,) valores, o un único vector si batched es False
+        :param bounds: Límites de cada parámetro, array (n_params, 2) (p. ej. varbound)
+        :param population_size: Candidatos por generación (None: el valor por defecto del algoritmo)
+        :param seed: Semilla de np.random.default_rng
+        :param batched: Si la función evalúa matrices de parámetros
+        :param max_generations: Número máximo de generaciones
+        :param patience: Generaciones seguidas sin mejorar el mejor valor en más de tol
+            antes de parar (como max_iteration_without_improv de geneticalgorithm)
+        :param tol: Mejora mínima del mejor valor que cuenta como mejora
+        :param tol_x: Se para si la dispersión de la población en el espacio normalizado
+            baja de este valor
+        :param target: Se para al alcanzar un valor menor o igual que este (None: sin objetivo)
+        :param log: Función que recibe una línea de texto por generación (None: sin registro)
+        """
+        self.function = function
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.lower = self.bounds[:, 0]
+        self.span = self.bounds[:, 1] - self.bounds[:, 0]
+        self.n_params = len(self.bounds)
+        self.population_size = population_size or self.default_population
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.batched = batched
+        self.max_generations = max_generations
+        self.patience = patience
+        self.tol = tol
+        self.tol_x = tol_x
+        self.target = target
+        self.log = log
+
+        self.generation = 0
+        self.evaluations = 0
+        self.best_x = None
+        self.best_value = np.inf
+        self.history = []  # Una entrada por generación (ver step)
+        self.report = []  # Mejor valor tras cada generación, como model.report de geneticalgorithm
+        self.output_dict = None
+        self._stale = 0  # Generaciones seguidas sin mejora
+
+    def to_params(self, unit):
+        """
+        Pasa puntos del espacio normalizado [0, 1]^n_params a los límites reales.
+        """
+        return self.lower + np.asarray(unit) * self.span
+
+    def to_unit(self, params):
+        """
+        Pasa parámetros reales al espacio normalizado.
+        """
+        return (np.asarray(params, dtype=float) - self.lower) / self.span
+
+    def evaluate(self, params_matrix):
+        """
+        Evalúa una generación con una sola llamada a la función (o un bucle si no es por lotes).
+        Los valores NaN se tratan como infinitos: el candidato queda el último.
+        :param params_matrix: Array (N, n_params) en unidades reales
+        :return: Array (N,) de valores
+        """
+        if self.batched:
+            values = np.asarray(self.function(params_matrix), dtype=float).ravel()
+        else:
+            values = np.array([self.function(x) for x in params_matrix], dtype=float)
+        self.evaluations += len(params_matrix)
+        return np.where(np.isnan(values), np.inf, values)
+
+    def ask(self):
+        """
+        Propone la siguiente generación.
+        :return: Array (population_size, n_params) en unidades reales, dentro de los límites
+        """
+        raise NotImplementedError
+
+    def tell(self, values):
+        """
+        Actualiza el algoritmo con los valores de la última generación propuesta por ask.
+        :param values: Array (population_size,) de valores, en el orden de ask
+        """
+        raise NotImplementedError
+
+    def spread(self):
+        """
+        Dispersión de la búsqueda en el espacio normalizado (para el criterio tol_x).
+        """
+        raise NotImplementedError
+
+    def step(self):
+        """
+        Ejecuta una generación completa: ask, una evaluación por lotes y tell.
+        :return: Diccionario de la generación (el último de self.history)
+        """
+        start = time.perf_counter()
+        params = self.ask()
+        values = self.evaluate(params)
+        self.tell(values)
+
+        best = int(np.argmin(values))
+        if values[best] < self.best_value - self.tol:
+            self._stale = 0
+        else:
+            self._stale += 1
+        if values[best] < self.best_value:
+            self.best_value = float(values[best])
+            self.best_x = params[best].copy()
+        self.generation += 1
+
+        finite = values[np.isfinite(values)]
+        record = {
+            'generation': self.generation,
+            'evaluations': self.evaluations,
+            'best': self.best_value,
+            'generation_best': float(values[best]),
+            'mean': float(finite.mean()) if finite.size else np.inf,
+            'spread': float(self.spread()),
+            'time': time.perf_counter() - start,
+        }
+        self.history.append(record)
+        self.report.append(self.best_value)
+        if self.log is not None:
+            self.log(f"Generación {record['generation']:4d}  evaluaciones {record['evaluations']:6d}  "
+                     f"mejor {record['best']:.4f}  media {record['mean']:.4f}  "
+                     f"dispersión {record['spread']:.2e}  ({record['time']:.2f} s)")
+        return record
+
+    def stop_reason(self):
+        """
+        Motivo de parada, o None si la optimización debe continuar.
+        """
+        if self.target is not None and self.best_value <= self.target:
+            return "target"
+        if self.generation >= self.max_generations:
+            return "max_generations"
+        if self.generation and self._stale >= self.patience:
+            return "patience"
+        if self.generation and self.spread() < self.tol_x:
+            return "tol_x"
+        return None
+
+    def run(self):
+        """
+        Itera generaciones hasta que se cumple un criterio de parada.
+        :return: Diccionario output_dict con variable (mejor setup), function (mejor valor),
+            generations, evaluations y stop (motivo de parada)
+        """
+        reason = self.stop_reason()
+        while reason is None:
+            self.step()
+            reason = self.stop_reason()
+        self.output_dict = {
+            'variable': self.best_x,
+            'function': self.best_value,
+            'generations': self.generation,
+            'evaluations': self.evaluations,
+            'stop': reason,
+        }
+        if self.log is not None:
+            self.log(f"Parada ({reason}) tras {self.generation} generaciones y {self.evaluations} evaluaciones: "
+                     f"mejor {self.best_value:.4f}")
+        return self.output_dict
+
+
+class CMAES(PopulationOptimizer):
+    """
+    CMA-ES (mu/mu_w, lambda) con adaptación de la matriz de covarianza y del tamaño
+    de paso (parámetros por defecto de Hansen, "The CMA Evolution Strategy: A Tutorial").
+
+    Las muestras que salen de [0, 1]^n se evalúan en su proyección sobre los límites y
+    se ordenan con una penalización proporcional a la distancia al cuadrado hasta ellos,
+    así la distribución no se queda pegada a un límite sin motivo.
+    """
+    def __init__(self, function, bounds, x0=None, sigma0=0.3, population_size=None, **kwargs):
+        """
+        :param function: Función que se minimiza (ver PopulationOptimizer)
+        :param bounds: Límites de cada parámetro, array (n_params, 2)
+        :param x0: Media inicial en unidades reales (None: el centro de los límites)
+        :param sigma0: Tamaño de paso inicial en el espacio normalizado
+        :param population_size: lambda (None: 4 + 3 ln(n_params))
+        :param kwargs: Resto de parámetros de PopulationOptimizer (seed, max_generations...)
+        """
+        n = len(bounds)
+        super().__init__(function, bounds, population_size=population_size or 4 + int(3 * np.log(n)), **kwargs)
+        self.mean = np.full(n, 0.5) if x0 is None else np.clip(self.to_unit(x0), 0.0, 1.0)
+        self.sigma = float(sigma0)
+
+        # Pesos de recombinación y constantes de adaptación
+        lam = self.population_size
+        self.mu = lam // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.C = np.eye(n)
+        self._samples = None
+
+    def ask(self):
+        z = self.rng.standard_normal((self.population_size, self.n_params))
+        self._samples = self.mean + self.sigma * (z * self.D) @ self.B.T
+        return self.to_params(np.clip(self._samples, 0.0, 1.0))
+
+    def tell(self, values):
+        n = self.n_params
+        values = np.asarray(values, dtype=float)
+        samples = self._samples
+        # Penalización de las muestras fuera de los límites, en la escala de los valores de la generación
+        distance = np.sum((samples - np.clip(samples, 0.0, 1.0)) ** 2, axis=1)
+        finite = values[np.isfinite(values)]
+        scale = np.ptp(finite) if finite.size > 1 and np.ptp(finite) > 0 else 1.0
+        order = np.argsort(values + scale * distance, kind='stable')[:self.mu]
+
+        old_mean = self.mean
+        y = (samples[order] - old_mean) / self.sigma
+        y_w = self.weights @ y
+        self.mean = old_mean + self.sigma * y_w
+
+        # Caminos de evolución
+        inv_sqrt_c = (self.B / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * (inv_sqrt_c @ y_w)
+        ps_norm = np.linalg.norm(self.ps)
+        h_sigma = ps_norm / np.sqrt(1 - (1 - self.cs) ** (2 * (self.generation + 1))) / self.chi_n < 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + h_sigma * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        # Covarianza: actualización de rango 1 (pc) y de rango mu (los mejores pasos)
+        rank_mu = (y.T * self.weights) @ y
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - h_sigma) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * rank_mu)
+        self.sigma *= np.exp((self.cs / self.damps) * (ps_norm / self.chi_n - 1))
+
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+    def spread(self):
+        return self.sigma * self.D.max()
+
+
+class DifferentialEvolution(PopulationOptimizer):
+    """
+    Evolución diferencial (DE/rand/1/bin o DE/best/1/bin) con selección uno a uno.
+
+    Toda la población de pruebas se genera a la vez con operaciones de arrays. Los
+    componentes que salen de [0, 1] se llevan al punto medio entre el padre y el límite.
+    """
+    STRATEGIES = ("rand1bin", "best1bin")
+    default_population = 100  # El tamaño de población de optheuristica.py
+
+    def __init__(self, function, bounds, population_size=None, mutation=0.7, crossover=0.9, strategy="rand1bin",
+                 **kwargs):
+        """
+        :param function: Función que se minimiza (ver PopulationOptimizer)
+        :param bounds: Límites de cada parámetro, array (n_params, 2)
+        :param population_size: Tamaño de la población (None: 100)
+        :param mutation: Factor F de la mutación diferencial
+        :param crossover: Probabilidad CR del cruce binomial
+        :param strategy: "rand1bin" (vector base aleatorio) o "best1bin" (el mejor)
+        :param kwargs: Resto de parámetros de PopulationOptimizer (seed, max_generations...)
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy debe ser uno de {self.STRATEGIES}")
+        super().__init__(function, bounds, population_size=population_size, **kwargs)
+        if self.population_size < 4:
+            raise ValueError("La evolución diferencial necesita al menos 4 individuos")
+        self.mutation = mutation
+        self.crossover = crossover
+        self.strategy = strategy
+        self.population = None  # Población actual en el espacio normalizado
+        self.values = None
+        self._trials = None
+
+    def _initial_population(self):
+        # Hipercubo latino: cada parámetro cubre sus population_size estratos una vez
+        size = self.population_size
+        strata = np.argsort(self.rng.random((self.n_params, size)), axis=1).T
+        return (strata + self.rng.random((size, self.n_params))) / size
+
+    def ask(self):
+        if self.population is None:
+            self._trials = self._initial_population()
+            return self.to_params(self._trials)
+
+        size, n = self.population.shape
+        # Tres índices distintos entre sí y del individuo objetivo, para toda la población a la vez
+        keys = self.rng.random((size, size))
+        keys[np.arange(size), np.arange(size)] = np.inf
+        r1, r2, r3 = np.argsort(keys, axis=1)[:, :3].T
+        if self.strategy == "best1bin":
+            base = self.population[np.argmin(self.values)]
+        else:
+            base = self.population[r1]
+        mutant = base + self.mutation * (self.population[r2] - self.population[r3])
+
+        # Cruce binomial: al menos un componente sale del mutante
+        take = self.rng.random((size, n)) < self.crossover
+        take[np.arange(size), self.rng.integers(n, size=size)] = True
+        trials = np.where(take, mutant, self.population)
+        trials = np.where(trials < 0.0, self.population / 2, trials)
+        trials = np.where(trials > 1.0, (self.population + 1.0) / 2, trials)
+        self._trials = trials
+        return self.to_params(trials)
+
+    def tell(self, values):
+        values = np.asarray(values, dtype=float)
+        if self.population is None:
+            self.population, self.values = self._trials, values
+            return
+        better = values <= self.values
+        self.population = np.where(better[:, None], self._trials, self.population)
+        self.values = np.where(better, values, self.values)
+
+    def spread(self):
+        return float(np.ptp(self.population, axis=0).max())
@@ -0,0 +1,145 @@
+"""
+Evaluación de setups en un calendario de varios circuitos con pesos.
+
+Los circuitos se cargan y se discretizan una sola vez al crear el evaluador; cada
+lote de setups se simula en todos ellos a la vez (ver src/simulator/multi_track.py),
+así que el trabajo del coche se hace una vez por lote y no una por circuito. Con
+varios procesos el lote se reparte por coches: cada trabajador recibe al arrancar el
+coche plantilla y los radios de todos los circuitos (en memoria compartida, como
+ParallelEvaluator) y por tarea solo viaja un bloque de la matriz de parámetros.
+
+Uso:
+    with SeasonEvaluator(car, ["track.json", "monza.json"], weights=[1.0, 0.5]) as season:
+        totals, per_track = season.evaluate(params_matrix, per_track=True)
+        model = ga(function=season, ...)  # Tiempo total ponderado como fitness
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ..simulator.lap_simulator import LapSimulator
+from ..simulator.multi_track import simulate_tracks
+from ..utils.cache import load_track, discretize
+
+# Estado de cada proceso trabajador, inicializado una sola vez por _init_worker
+_worker_state = {}
+
+
+def _init_worker(car, shm_name, lengths, delta_s, lap):
+    """
+    Inicializa un proceso trabajador: se conecta a la memoria compartida con los radios
+    de todos los circuitos, concatenados.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    radii = np.ndarray((int(np.sum(lengths)),), dtype=float, buffer=shm.buf)
+    radii.flags.writeable = False
+    _worker_state['shm'] = shm  # Mantener la referencia viva mientras viva el proceso
+    _worker_state['car'] = car
+    _worker_state['radii'] = np.split(radii, np.cumsum(lengths)[:-1])
+    _worker_state['delta_s'] = delta_s
+    _worker_state['lap'] = lap
+
+
+def _evaluate_chunk(params_chunk):
+    """
+    Evalúa un bloque de setups en todos los circuitos en el proceso trabajador.
+    """
+    state = _worker_state
+    return simulate_tracks(state['car'], state['radii'], params_chunk, delta_s=state['delta_s'], lap=state['lap'],
+                           v_limit=LapSimulator.VEL_MAX_LIMIT)
+
+
+class SeasonEvaluator:
+    """
+    Tiempo de vuelta de un lote de setups en varios circuitos, por circuito y total
+    ponderado (el objetivo de los optimizadores). Los resultados coinciden exactamente
+    con los de simulate_batch (motor "numpy") en cada circuito.
+    """
+    def __init__(self, car, tracks, weights=None, delta_s=1.0, lap="standing", workers=None):
+        """
+        Inicializa el evaluador. Con más de un proceso arranca el pool.
+        :param car: Coche plantilla (Instancia de Car con los ángulos de ataque definidos)
+        :param tracks: Lista de circuitos (Instancias de Track o rutas a su JSON)
+        :param weights: Peso de cada circuito en el total, por defecto 1 para todos
+        :param delta_s: Resolución espacial (m)
+        :param lap: Vuelta que se usa como tiempo: "standing" (desde parado) o "flying" (lanzada)
+        :param workers: Número de procesos (None: os.cpu_count()). Con 1 se evalúa en este proceso
+        """
+        if lap not in LapSimulator.LAPS:
+            raise ValueError(f"lap debe ser uno de {LapSimulator.LAPS}, no {lap!r}")
+        self.names = [os.path.splitext(os.path.basename(track))[0] if isinstance(track, str) else f"track_{k}"
+                      for k, track in enumerate(tracks)]
+        self.tracks = [load_track(track) if isinstance(track, str) else track for track in tracks]
+        if not self.tracks:
+            raise ValueError("El calendario necesita al menos un circuito")
+        self.weights = np.ones(len(self.tracks)) if weights is None else np.asarray(weights, dtype=float)
+        if self.weights.shape != (len(self.tracks),):
+            raise ValueError(f"Se esperaban {len(self.tracks)} pesos, no {self.weights.shape}")
+        self.car = car
+        self.delta_s = delta_s
+        self.lap = lap
+        self.workers = workers or os.cpu_count() or 1
+
+        self.radii = [discretize(track, delta_s) for track in self.tracks]
+        self._shm = None
+        self._executor = None
+        if self.workers > 1:
+            lengths = [len(radii) for radii in self.radii]
+            concatenated = np.concatenate(self.radii)
+            self._shm = shared_memory.SharedMemory(create=True, size=max(concatenated.nbytes, 1))
+            np.ndarray(concatenated.shape, dtype=float, buffer=self._shm.buf)[:] = concatenated
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(car, self._shm.name, lengths, delta_s, lap),
+            )
+
+    def evaluate_tracks(self, params_matrix):
+        """
+        Tiempos de vuelta de cada setup en cada circuito.
+        :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS
+        :return: Array (N, n_circuitos), columnas en el orden de self.tracks
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        if self._executor is None or len(params_matrix) < 2:
+            return simulate_tracks(self.car, self.radii, params_matrix, delta_s=self.delta_s, lap=self.lap,
+                                   v_limit=LapSimulator.VEL_MAX_LIMIT)
+        chunks = np.array_split(params_matrix, min(len(params_matrix), self.workers))
+        return np.concatenate(list(self._executor.map(_evaluate_chunk, chunks)))
+
+    def evaluate(self, params_matrix, per_track=False):
+        """
+        Tiempo total ponderado de cada setup en el calendario.
+        :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS
+        :param per_track: Si es True devuelve también los tiempos de cada circuito
+        :return: Array (N,) de tiempos totales, o tupla (totales, tiempos (N, n_circuitos))
+        """
+        lap_times = self.evaluate_tracks(params_matrix)
+        totals = (lap_times * self.weights).sum(axis=1)  # Sin BLAS: el total no depende del tamaño del lote
+        return (totals, lap_times) if per_track else totals
+
+    def __call__(self, x):
+        """
+        Evalúa un único setup (interfaz de función de fitness).
+        :param x: Vector de parámetros en el orden de SETUP_PARAMS
+        :return: Tiempo total ponderado (s)
+        """
+        return float(self.evaluate(x)[0])
+
+    def close(self):
+        """
+        Detiene los procesos y libera la memoria compartida.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._shm.close()
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,294 @@
+"""
+Cribado de candidatos con un modelo sustituto (surrogate) del tiempo de vuelta.
+
+Un proceso gaussiano (kernel RBF con una longitud de escala por parámetro) se entrena
+sobre la marcha con las evaluaciones ya terminadas, en el espacio normalizado de
+SETUP_BOUNDS (los mismos límites que varbound en optheuristica.py). Antes de simular un
+candidato se predice su tiempo con incertidumbre y solo llega al simulador si es
+prometedor o incierto: si su cota inferior mu - kappa * sigma mejora el cuantil quantile
+de los tiempos ya vistos. Al resto se le asigna la predicción, que para ordenar una
+población basta. Una fracción explore de candidatos se simula siempre, al azar, para
+que el error de validación (que se mide sobre las simulaciones, antes de añadirlas al
+modelo) no esté sesgado hacia los candidatos buenos.
+
+Uso (algoritmo genético, una evaluación por llamada):
+    screen = SurrogateScreen(fitness_function)
+    model = ga(function=screen, ...)
+    print(screen.stats())
+Uso (lotes, p. ej. ParallelEvaluator.evaluate):
+    screen = SurrogateScreen(evaluator.evaluate, batched=True)
+    values, simulated = screen.evaluate(candidates, return_mask=True)
+"""
+import numpy as np
+
+from ..models.car import SETUP_BOUNDS
+
+
+class GaussianProcess:
+    """
+    Regresión con proceso gaussiano y kernel RBF anisótropo sobre entradas en [0, 1]^d.
+    Las longitudes de escala se ajustan maximizando la verosimilitud marginal con una
+    búsqueda por coordenadas (sin dependencias externas).
+    """
+    def __init__(self, noise=1e-6):
+        """
+        :param noise: Varianza del ruido sobre la salida estandarizada (el simulador es determinista)
+        """
+        self.noise = noise
+        self.length_scales = None
+        self._x = None
+
+    def _kernel(self, a, b):
+        d = (a[:, None, :] - b[None, :, :]) / self.length_scales
+        return np.exp(-0.5 * np.einsum('ijk,ijk->ij', d, d))
+
+    def _log_likelihood(self, x, y):
+        k = self._kernel(x, x) + self.noise * np.eye(len(x))
+        try:
+            chol = np.linalg.cholesky(k)
+        except np.linalg.LinAlgError:
+            return -np.inf
+        alpha = np.linalg.solve(chol, y)
+        return -0.5 * alpha @ alpha - np.log(np.diag(chol)).sum()
+
+    def fit(self, x, y, optimize=True):
+        """
+        Entrena el modelo.
+        :param x: Array (N, d) de entradas normalizadas
+        :param y: Array (N,) de salidas
+        :param optimize: Si es True se reajustan las longitudes de escala
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self._mean, self._std = y.mean(), y.std() or 1.0
+        ys = (y - self._mean) / self._std
+        if self.length_scales is None:
+            self.length_scales = np.full(x.shape[1], 0.5)
+        if optimize:
+            best = self._log_likelihood(x, ys)
+            for _ in range(2):
+                for j in range(x.shape[1]):
+                    for factor in (0.5, 2.0):
+                        trial = self.length_scales.copy()
+                        self.length_scales[j] = np.clip(trial[j] * factor, 0.02, 20.0)
+                        value = self._log_likelihood(x, ys)
+                        if value > best:
+                            best = value
+                        else:
+                            self.length_scales = trial
+
+        k = self._kernel(x, x)
+        jitter = self.noise
+        while True:
+            try:
+                np.linalg.cholesky(k + jitter * np.eye(len(x)))
+                break
+            except np.linalg.LinAlgError:
+                jitter *= 10
+        self._jitter = jitter
+        self._k_inv = np.linalg.inv(k + jitter * np.eye(len(x)))
+        self._x, self._ys = x, ys
+        self._alpha = self._k_inv @ ys
+
+    def add(self, x, y):
+        """
+        Añade puntos sin reajustar el modelo: la inversa de la matriz del kernel se
+        actualiza por bloques en O(N^2) en lugar de recalcularse en O(N^3).
+        :param x: Array (M, d) de entradas normalizadas
+        :param y: Array (M,) de salidas
+        """
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        ys = (np.asarray(y, dtype=float) - self._mean) / self._std
+        b = self._kernel(self._x, x)
+        c = self._kernel(x, x) + self._jitter * np.eye(len(x))
+        k_inv_b = self._k_inv @ b
+        schur = c - b.T @ k_inv_b
+        # Con varios puntos el redondeo deja el complemento de Schur algo asimétrico y la
+        # inversa por bloques deja de ser simétrica y de invertir la matriz del kernel
+        schur = 0.5 * (schur + schur.T)
+        try:
+            np.linalg.cholesky(schur)
+        except np.linalg.LinAlgError:
+            # Puntos casi repetidos: la actualización perdería precisión, se rehace la inversa
+            self.fit(np.vstack([self._x, x]), np.concatenate([self._ys, ys]) * self._std + self._mean, optimize=False)
+            return
+        schur_inv = np.linalg.inv(schur)
+        top_right = -k_inv_b @ schur_inv
+        self._k_inv = np.block([
+            [self._k_inv - top_right @ k_inv_b.T, top_right],
+            [top_right.T, schur_inv],
+        ])
+        self._x = np.vstack([self._x, x])
+        self._ys = np.concatenate([self._ys, ys])
+        self._alpha = self._k_inv @ self._ys
+
+    def predict(self, x):
+        """
+        Predicción con incertidumbre.
+        :param x: Array (M, d) de entradas normalizadas
+        :return: Tupla (media, desviación típica), arrays (M,)
+        """
+        k = self._kernel(np.atleast_2d(x), self._x)
+        mean = k @ self._alpha
+        var = np.maximum(1.0 - np.einsum('ij,ij->i', k @ self._k_inv, k), 0.0)
+        return self._mean + self._std * mean, self._std * np.sqrt(var)
+
+
+class SurrogateScreen:
+    """
+    Función de fitness con cribado por surrogate: solo simula los candidatos prometedores
+    o inciertos y cuenta las simulaciones ahorradas y el error de validación del modelo.
+    """
+    def __init__(self, function, bounds=SETUP_BOUNDS, batched=False, min_points=30, max_points=300,
+                 kappa=2.0, quantile=0.5, explore=0.05, refit_every=50, log_output=True, seed=0):
+        """
+        :param function: Función de fitness (vector de parámetros, o matriz si batched es True)
+        :param bounds: Límites de cada parámetro, para normalizar las entradas del modelo
+        :param batched: Si la función evalúa matrices de parámetros
+        :param min_points: Evaluaciones reales antes de empezar a cribar
+        :param max_points: Máximo de puntos de entrenamiento (se conservan los mejores y los más recientes)
+        :param kappa: Peso de la incertidumbre en la cota inferior mu - kappa * sigma
+        :param quantile: Cuantil de los tiempos vistos que debe poder mejorar un candidato
+        :param explore: Fracción de candidatos que se simulan siempre
+        :param refit_every: Nuevas evaluaciones entre reajustes completos del modelo; entre medias
+            los puntos se añaden con una actualización incremental
+        :param log_output: Si es True el modelo aprende log(tiempo): los tiempos de setups malos
+            crecen mucho y en escala logarítmica la respuesta es más suave
+        :param seed: Semilla de la exploración aleatoria
+        """
+        self.function = function
+        self.batched = batched
+        bounds = np.asarray(bounds, dtype=float)
+        self._lo, self._span = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+        self.min_points = min_points
+        self.max_points = max_points
+        self.kappa = kappa
+        self.quantile = quantile
+        self.explore = explore
+        self.refit_every = refit_every
+        self.log_output = log_output
+        self._rng = np.random.default_rng(seed)
+        self.model = GaussianProcess()
+        self._x = np.zeros((0, len(bounds)))
+        self._y = np.zeros(0)
+        self._since_refit = 0
+        self._fitted = False
+        self.simulations = 0
+        self.screened = 0
+        self._errors = []
+
+    def _normalize(self, params_matrix):
+        return (params_matrix - self._lo) / self._span
+
+    def observe(self, params_matrix, values):
+        """
+        Añade al modelo evaluaciones reales hechas por otra vía (p. ej. el tiempo de vuelta
+        del gradiente exacto de gradopt). Los valores no finitos se ignoran.
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        finite = np.isfinite(values) & (values > 0 if self.log_output else True)
+        x_new = self._normalize(params_matrix[finite])
+        y_new = np.log(values[finite]) if self.log_output else values[finite]
+        # Un punto repetido no aporta información y deja singular la matriz del kernel
+        _, first = np.unique(x_new, axis=0, return_index=True)
+        new = np.zeros(len(x_new), dtype=bool)
+        new[first] = True
+        if len(self._x):
+            new &= ~(np.abs(x_new[:, None, :] - self._x[None, :, :]).max(axis=2) < 1e-12).any(axis=1)
+        x_new, y_new = x_new[new], y_new[new]
+        self._x = np.vstack([self._x, x_new])
+        self._y = np.concatenate([self._y, y_new])
+        self._since_refit += len(y_new)
+
+        # Se recorta con holgura para no reajustar el modelo completo en cada evaluación
+        capped = len(self._y) > 1.2 * self.max_points
+        if capped:
+            # La mitad mejor y, del resto, los más recientes
+            best = np.argsort(self._y)[:self.max_points // 2]
+            recent = np.setdiff1d(np.arange(len(self._y)), best)[-(self.max_points - len(best)):]
+            keep = np.sort(np.concatenate([best, recent]))
+            self._x, self._y = self._x[keep], self._y[keep]
+        if len(self._y) < self.min_points or not len(y_new):
+            return
+        if not self._fitted or capped or self._since_refit >= self.refit_every:
+            self.model.fit(self._x, self._y, optimize=not self._fitted or self._since_refit >= self.refit_every)
+            self._fitted = True
+            if self._since_refit >= self.refit_every:
+                self._since_refit = 0
+        else:
+            self.model.add(x_new, y_new)
+
+    def predict(self, params_matrix):
+        """
+        Predicción del modelo (None si aún no tiene suficientes puntos).
+        Con log_output la media y la desviación típica son las de log(tiempo).
+        :param params_matrix: Array (N, n_params)
+        :return: Tupla (media, desviación típica) o None
+        """
+        if not self._fitted:
+            return None
+        return self.model.predict(self._normalize(np.atleast_2d(np.asarray(params_matrix, dtype=float))))
+
+    def _to_output(self, values):
+        return np.exp(values) if self.log_output else values
+
+    def evaluate(self, params_matrix, return_mask=False):
+        """
+        Evalúa un conjunto de candidatos, simulando solo los que superan el cribado.
+        :param params_matrix: Array (N, n_params)
+        :param return_mask: Si es True devuelve también qué candidatos se han simulado
+        :return: Array (N,) con el tiempo simulado o, si se ha cribado, el predicho; o tupla
+            (valores, máscara de simulados)
+        """
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        n = len(params_matrix)
+        prediction = self.predict(params_matrix)
+        if prediction is None:
+            simulate = np.ones(n, dtype=bool)
+            values = np.empty(n)
+        else:
+            mean, std = prediction
+            threshold = np.quantile(self._y, self.quantile)
+            simulate = (mean - self.kappa * std < threshold) | (self._rng.random(n) < self.explore)
+            values = self._to_output(mean)
+
+        rows = np.flatnonzero(simulate)
+        if rows.size:
+            if self.batched:
+                results = np.asarray(self.function(params_matrix[rows]), dtype=float)
+            else:
+                results = np.array([self.function(x) for x in params_matrix[rows]], dtype=float)
+            if prediction is not None:
+                # Error de validación: el modelo aún no ha visto estos puntos
+                finite = np.isfinite(results)
+                self._errors.extend((values[rows] - results)[finite].tolist())
+            values[rows] = results
+            self.observe(params_matrix[rows], results)
+        self.simulations += rows.size
+        self.screened += n - rows.size
+        return (values, simulate) if return_mask else values
+
+    def __call__(self, x):
+        """
+        Evalúa un único candidato (interfaz de función de fitness).
+        """
+        return float(self.evaluate(x)[0])
+
+    def stats(self):
+        """
+        Estadísticas del cribado.
+        :return: Diccionario con simulations, screened (simulaciones ahorradas), saved_ratio,
+            train_points y el error de validación (validation_rmse, validation_mae, validation_points)
+        """
+        errors = np.asarray(self._errors)
+        total = self.simulations + self.screened
+        return {
+            'simulations': self.simulations,
+            'screened': self.screened,
+            'saved_ratio': self.screened / total if total else 0.0,
+            'train_points': len(self._y),
+            'validation_rmse': float(np.sqrt(np.mean(errors**2))) if errors.size else None,
+            'validation_mae': float(np.mean(np.abs(errors))) if errors.size else None,
+            'validation_points': int(errors.size),
+        }
@@ -0,0 +1,246 @@
+"""
+Barridos de parámetros (diseño de experimentos) con checkpoint y reanudación.
+
+Un barrido se describe con una especificación JSON:
+    {
+      "car": "car.json", "aoa": 4,
+      "tracks": ["track.json"],
+      "method": "lhs",              # "grid", "lhs" (hipercubo latino) u "oat" (uno a uno)
+      "samples": 10000,             # lhs: número de muestras
+      "levels": 5,                  # grid / oat: valores por parámetro
+      "seed": 0,
+      "params": {"power": [300000, 650000], "mass": [600, 900]},
+      "delta_s": 1.0, "lap": "standing", "engine": "numpy",
+      "chunk_size": 1000,
+      "traces": false               # guardar también el perfil de velocidad de cada muestra
+    }
+Los parámetros de "params" se muestrean en su rango; el resto de SETUP_PARAMS queda
+en el valor del coche base. Sin "params" se barren los diez con SETUP_BOUNDS (los
+mismos límites que varbound en optheuristica.py). Las rutas son relativas al archivo
+de la especificación.
+
+Las muestras se generan de forma determinista a partir de la especificación y se
+evalúan por bloques de chunk_size filas con un ParallelEvaluator por circuito. Cada
+bloque terminado se añade al ResultsStore del directorio de salida (columnas params,
+lap_time con un tiempo por circuito y, con "traces", v_0, v_1... en float32) y se
+confirma en disco; no se guarda nada más en memoria. Las filas confirmadas son el
+checkpoint: al relanzar el barrido sobre el mismo directorio continúa tras la última, y
+un barrido terminado no vuelve a evaluar nada.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from ..models.car import SETUP_PARAMS, SETUP_BOUNDS
+from ..utils.cache import load_car, load_track, discretize
+from ..utils.results_store import ResultsStore
+from .fitness_cache import context_hash
+from .parallel import ParallelEvaluator
+
+METHODS = ("grid", "lhs", "oat")
+SPEC_DEFAULTS = {
+    'aoa': 4,
+    'method': "lhs",
+    'samples': 1000,
+    'levels': 5,
+    'seed': 0,
+    'params': None,
+    'delta_s': 1.0,
+    'lap': "standing",
+    'engine': "numpy",
+    'chunk_size': 1000,
+    'traces': False,
+}
+
+
+def load_spec(file_path):
+    """
+    Lee una especificación de barrido y la completa con los valores por defecto.
+    Las rutas del coche y de los circuitos se resuelven respecto al archivo.
+    :param file_path: Ruta al archivo JSON de la especificación
+    :return: Diccionario con la especificación completa
+    """
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(file_path))
+    spec = {**SPEC_DEFAULTS, **data}
+    spec['car'] = os.path.join(base, spec['car'])
+    spec['tracks'] = [os.path.join(base, track) for track in spec['tracks']]
+    return spec
+
+
+class Sweep:
+    """
+    Barrido de parámetros descrito por una especificación (ver load_spec).
+
+    Uso:
+        sweep = Sweep(load_spec("sweep.json"))
+        store = sweep.run("resultados_sweep")
+        rows, lap_times = store.best(10)
+    """
+    def __init__(self, spec):
+        """
+        :param spec: Diccionario con la especificación del barrido
+        """
+        self.spec = {**SPEC_DEFAULTS, **spec}
+        if self.spec['method'] not in METHODS:
+            raise ValueError(f"method debe ser uno de {METHODS}")
+        ranges = self.spec['params'] or dict(zip(SETUP_PARAMS, SETUP_BOUNDS))
+        unknown = set(ranges) - set(SETUP_PARAMS)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos: {sorted(unknown)}")
+
+        aoa = self.spec['aoa']
+        self.car = load_car(self.spec['car']).build(aoa_front=aoa, aoa_rear=aoa)
+        self.tracks = [load_track(path) for path in self.spec['tracks']]
+        # Columnas barridas (en el orden de SETUP_PARAMS) y sus rangos
+        self.columns = [SETUP_PARAMS.index(name) for name in SETUP_PARAMS if name in ranges]
+        self.bounds = np.array([ranges[SETUP_PARAMS[j]] for j in self.columns], dtype=float)
+        self.base = self.car.setup_params()
+        self._lhs = None
+
+    @property
+    def size(self):
+        """
+        Número total de muestras del barrido.
+        """
+        k, levels = len(self.columns), self.spec['levels']
+        if self.spec['method'] == "grid":
+            return levels ** k
+        if self.spec['method'] == "oat":
+            return 1 + k * levels
+        return self.spec['samples']
+
+    @property
+    def n_chunks(self):
+        return -(-self.size // self.spec['chunk_size'])
+
+    def samples(self, start, stop):
+        """
+        Devuelve las filas [start, stop) del barrido, sin generar el resto.
+        :return: Array (stop - start, n_params) en el orden de SETUP_PARAMS
+        """
+        index = np.arange(start, stop)
+        lo, hi = self.bounds[:, 0], self.bounds[:, 1]
+        levels = self.spec['levels']
+        rows = np.tile(self.base, (len(index), 1))
+
+        if self.spec['method'] == "grid":
+            # La fila i es el índice i de la rejilla levels^k (el último parámetro varía más rápido)
+            grid = np.linspace(0.0, 1.0, levels)
+            cells = np.array(np.unravel_index(index, (levels,) * len(self.columns))).T
+            rows[:, self.columns] = lo + grid[cells] * (hi - lo)
+        elif self.spec['method'] == "oat":
+            # Fila 0: coche base. Después, cada parámetro recorre sus levels valores con el resto fijo
+            grid = np.linspace(0.0, 1.0, levels)
+            varied = index > 0
+            param, level = np.divmod(index[varied] - 1, levels)
+            rows[np.flatnonzero(varied), np.asarray(self.columns)[param]] = lo[param] + grid[level] * (hi - lo)[param]
+        else:
+            rows[:, self.columns] = lo + self._lhs_unit()[start:stop] * (hi - lo)
+        return rows
+
+    def _lhs_unit(self):
+        # Hipercubo latino en [0, 1]^k: una muestra por estrato en cada dimensión
+        if self._lhs is None:
+            n, k = self.spec['samples'], len(self.columns)
+            rng = np.random.default_rng(self.spec['seed'])
+            strata = np.argsort(rng.random((n, k)), axis=0)
+            self._lhs = (strata + rng.random((n, k))) / n
+        return self._lhs
+
+    def manifest(self):
+        """
+        Especificación más los hashes de contexto de cada circuito. Se guarda junto a los
+        resultados para comprobar al reanudar que el barrido es el mismo.
+        """
+        contexts = [
+            context_hash(self.car, track, delta_s=self.spec['delta_s'], engine=self.spec['engine'], lap=self.spec['lap'])
+            for track in self.tracks
+        ]
+        return {'spec': self.spec, 'size': self.size, 'params': list(SETUP_PARAMS), 'contexts': contexts}
+
+    def store_columns(self):
+        """
+        Columnas del almacén de resultados del barrido.
+        """
+        columns = {
+            'params': ((len(SETUP_PARAMS),), 'float64'),
+            'lap_time': ((len(self.tracks),), 'float64'),
+        }
+        if self.spec['traces']:
+            for k, track in enumerate(self.tracks):
+                columns[f"v_{k}"] = ((len(discretize(track, self.spec['delta_s'])),), 'float32')
+        return columns
+
+    def run(self, output, workers=None, log=print):
+        """
+        Ejecuta el barrido (o lo reanuda) añadiendo cada bloque terminado al almacén de output.
+        :param output: Directorio de resultados
+        :param workers: Número de procesos por circuito, por defecto os.cpu_count()
+        :param log: Función de registro del progreso (None para no registrar)
+        :return: ResultsStore con los resultados
+        """
+        os.makedirs(output, exist_ok=True)
+        manifest = self.manifest()
+        manifest_path = os.path.join(output, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                previous = json.load(f)
+            if previous != json.loads(json.dumps(manifest)):
+                raise ValueError(f"{output} contiene un barrido distinto; usa otro directorio de salida")
+        else:
+            _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+        chunk_size = self.spec['chunk_size']
+        store = ResultsStore(output, self.store_columns(), labels={'params': SETUP_PARAMS}, chunk_rows=chunk_size)
+        # Se reanuda por filas: cada bloque se confirma entero, así que las filas guardadas
+        # acaban en un límite de bloque o en el final del barrido (el último bloque puede ser parcial)
+        done = min(len(store), self.size)
+        if log and done:
+            log(f"Reanudando: {done}/{self.size} muestras ya evaluadas")
+        if done == self.size:
+            return store
+
+        evaluators = [
+            ParallelEvaluator(self.car, track, delta_s=self.spec['delta_s'], engine=self.spec['engine'],
+                              workers=workers, lap=self.spec['lap'])
+            for track in self.tracks
+        ]
+        try:
+            start_time = time.perf_counter()
+            for start in range(done, self.size, chunk_size):
+                c = start // chunk_size
+                stop = min(start + chunk_size, self.size)
+                params = self.samples(start, stop)
+                rows = {'params': params}
+                if self.spec['traces']:
+                    results = [evaluator.evaluate(params, return_speeds=True) for evaluator in evaluators]
+                    rows.update((f"v_{k}", v) for k, (_, v) in enumerate(results))
+                    rows['lap_time'] = np.column_stack([lap_times for lap_times, _ in results])
+                else:
+                    rows['lap_time'] = np.column_stack([evaluator.evaluate(params) for evaluator in evaluators])
+                store.append(**rows)
+                store.flush()
+                if log:
+                    elapsed = time.perf_counter() - start_time
+                    eta = elapsed / (stop - done) * (self.size - stop)
+                    log(f"Bloque {c + 1}/{self.n_chunks}: {stop - start} muestras, "
+                        f"mejor {np.nanmin(rows['lap_time'].sum(axis=1)):.3f} s, {elapsed:.1f} s transcurridos, ETA {eta:.1f} s")
+        finally:
+            for evaluator in evaluators:
+                evaluator.close()
+            store.close()
+        return store
+
+
+def _write_atomic(path, write):
+    # Se escribe en un archivo temporal y se renombra: un archivo a medias nunca parece completo
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
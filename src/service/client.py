@@ -0,0 +1,187 @@
+"""
+Cliente ligero del servicio local de simulación (ver server.py).
+
+Solo depende de numpy y de la biblioteca estándar: no importa el simulador ni
+matplotlib, así que un notebook o un script arranca al instante y las vueltas se
+calculan en el servicio, que ya tiene coches y circuitos cargados.
+
+El sustituto directo de LapSimulator es RemoteLapSimulator: simulate_lap devuelve la
+tupla (tiempo de vuelta, v) y simulate_batch el array de tiempos, igual que en local.
+LapClient es la conexión de bajo nivel: LapClient.simulate siempre devuelve un array
+de N tiempos (o la tupla (tiempos, perfiles)), también para un único setup, y no
+sustituye a LapSimulator.simulate_lap.
+
+Uso:
+    simulator = RemoteLapSimulator("car.json", "track.json", aoa=4)
+    lap_time, v = simulator.simulate_lap()           # igual que LapSimulator.simulate_lap
+    lap_times = simulator.simulate_batch(population)  # igual que LapSimulator.simulate_batch
+    print(LapClient().stats())
+
+Protocolo: líneas JSON (una petición o respuesta por línea) sobre TCP o un socket Unix.
+Cada petición lleva un "id"; el servicio responde con una o varias líneas con ese id
+(los resultados llegan por bloques según se simulan) y termina con {"id": ..., "done": true}.
+"""
+import itertools
+import json
+import os
+import socket
+
+import numpy as np
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ServiceError(RuntimeError):
+    """
+    Error devuelto por el servicio al procesar una petición.
+    """
+
+
+class LapClient:
+    """
+    Conexión síncrona con el servicio. No es segura entre hilos: usa un cliente por hilo.
+    """
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), timeout=None):
+        """
+        :param address: Tupla (host, puerto) o ruta de un socket Unix
+        :param timeout: Tiempo máximo de espera de cada respuesta (s), None sin límite
+        """
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(address)
+        self._file = self._socket.makefile('rb')
+        self._ids = itertools.count()
+
+    def request(self, message):
+        """
+        Envía una petición y devuelve las líneas de respuesta según llegan.
+        :param message: Diccionario con la petición (sin id)
+        :return: Generador de diccionarios de respuesta, hasta la línea "done" (incluida)
+        """
+        request_id = next(self._ids)
+        self._socket.sendall(json.dumps({**message, 'id': request_id}).encode() + b"\n")
+        while True:
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("El servicio ha cerrado la conexión")
+            response = json.loads(line)
+            if response.get('id') != request_id:
+                continue  # Restos de una petición anterior que no se leyó entera
+            if 'error' in response:
+                raise ServiceError(response['error'])
+            yield response
+            if response.get('done'):
+                return
+
+    def simulate(self, car, track, params=None, aoa=None, delta_s=1.0, lap="standing", engine="numpy",
+                 return_speeds=False):
+        """
+        Simula uno o varios setups en el servicio (petición de bajo nivel; para la interfaz
+        de LapSimulator usa RemoteLapSimulator).
+        :param car: Ruta al JSON del coche
+        :param track: Ruta al JSON del circuito
+        :param params: Array (N, n_params) en el orden de SETUP_PARAMS, un vector, o None para
+            el setup del propio coche
+        :param aoa: Ángulo de ataque de los dos alerones (None: el del JSON del coche)
+        :param delta_s: Resolución espacial (m)
+        :param lap: "standing" o "flying"
+        :param engine: Motor de LapSimulator
+        :param return_speeds: Si es True devuelve también los perfiles de velocidad
+        :return: Array (N,) de tiempos de vuelta, o tupla (tiempos, lista de N perfiles).
+            Con un único setup N es 1: no devuelve la tupla (tiempo, v) de simulate_lap
+        """
+        message = {
+            'op': "simulate",
+            # Las rutas se resuelven aquí: el servicio puede ejecutarse en otro directorio
+            'car': os.path.abspath(car),
+            'track': os.path.abspath(track),
+            'params': None if params is None else np.atleast_2d(np.asarray(params, dtype=float)).tolist(),
+            'aoa': aoa,
+            'delta_s': delta_s,
+            'lap': lap,
+            'engine': engine,
+            'return_speeds': return_speeds,
+        }
+        lap_times, speeds = {}, {}
+        for response in self.request(message):
+            for k, index in enumerate(response.get('index', ())):
+                lap_times[index] = response['lap_time'][k]
+                if return_speeds:
+                    speeds[index] = np.asarray(response['v'][k])
+        order = sorted(lap_times)
+        lap_times = np.array([lap_times[i] for i in order], dtype=float)
+        if return_speeds:
+            return lap_times, [speeds[i] for i in order]
+        return lap_times
+
+    def stats(self):
+        """
+        Estadísticas del servicio (ver LapService.stats).
+        """
+        for response in self.request({'op': "stats"}):
+            return response['stats']
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RemoteLapSimulator:
+    """
+    Contrapartida de LapSimulator que simula en el servicio local, con la misma
+    interfaz de simulate_lap y simulate_batch.
+    """
+    def __init__(self, car, track, delta_s=1.0, engine="numpy", lap="standing", params=None, aoa=None,
+                 client=None):
+        """
+        :param car: Ruta al JSON del coche
+        :param track: Ruta al JSON del circuito
+        :param delta_s: Resolución espacial (m)
+        :param engine: Motor de LapSimulator
+        :param lap: "standing" o "flying"
+        :param params: Setup que simula simulate_lap, en el orden de SETUP_PARAMS (None: el del coche)
+        :param aoa: Ángulo de ataque de los dos alerones (None: el del JSON del coche)
+        :param client: LapClient ya conectado (por defecto se conecta al servicio local)
+        """
+        self.car = car
+        self.track = track
+        self.delta_s = delta_s
+        self.engine = engine
+        self.lap = lap
+        self.params = params
+        self.aoa = aoa
+        self.client = client or LapClient()
+
+    def _simulate(self, params, return_speeds):
+        return self.client.simulate(self.car, self.track, params=params, aoa=self.aoa, delta_s=self.delta_s,
+                                    lap=self.lap, engine=self.engine, return_speeds=return_speeds)
+
+    def simulate_lap(self):
+        """
+        Simula la vuelta del setup self.params.
+        :return: Tupla (tiempo de vuelta, v)
+        """
+        lap_times, speeds = self._simulate(self.params, True)
+        return float(lap_times[0]), speeds[0]
+
+    def simulate_batch(self, params_matrix, return_speeds=False):
+        """
+        Simula N setups (ver LapSimulator.simulate_batch).
+        :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS
+        :param return_speeds: Si es True devuelve también los perfiles de velocidad
+        :return: Array (N,) de tiempos de vuelta, o tupla (tiempos, v) con v de forma (N, puntos)
+        """
+        if not return_speeds:
+            return self._simulate(params_matrix, False)
+        lap_times, speeds = self._simulate(params_matrix, True)
+        return lap_times, np.array(speeds)
@@ -0,0 +1,326 @@
+"""
+Servicio local de simulación de vueltas (asyncio).
+
+Un proceso de larga duración mantiene cargados los coches y circuitos (ConfigCache en
+el servicio y en cada trabajador) y atiende peticiones de varios clientes a la vez
+(notebooks, scripts de optimización...), que así no pagan en cada ejecución la
+importación del simulador ni la lectura de los JSON.
+
+Las peticiones con el mismo contexto (coche, ángulo de ataque, circuito, delta_s,
+vuelta y motor) se agrupan: cada setup entra en la cola de su contexto y un
+despachador por contexto junta en un lote lo que llegue en max_wait segundos (hasta
+max_batch setups), lo reparte entre el pool de procesos (simulate_batch con el motor
+"numpy") y devuelve a cada petición sus resultados en cuanto termina el lote. Mientras
+un lote se simula, la cola se sigue llenando con el siguiente.
+
+Protocolo: ver client.py. Operaciones:
+    {"id": 0, "op": "simulate", "car": ..., "track": ..., "params": [[...], ...], "aoa": 4,
+     "delta_s": 1.0, "lap": "standing", "engine": "numpy", "return_speeds": false}
+        -> {"id": 0, "index": [...], "lap_time": [...], "v": [[...], ...]} (uno o varios)
+        -> {"id": 0, "done": true, "n": ...}
+    {"id": 1, "op": "stats"} -> {"id": 1, "done": true, "stats": {...}}
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..models.car import SETUP_PARAMS
+from ..simulator.lap_simulator import LapSimulator
+from ..utils.cache import load_car, load_track, discretize
+from .client import DEFAULT_HOST, DEFAULT_PORT
+
+STREAM_LIMIT = 2**26  # Longitud máxima de una línea de petición (bytes)
+THROUGHPUT_WINDOW = 60.0  # Ventana del cálculo de throughput (s)
+
+# Coches ya construidos en cada proceso trabajador: (ruta, aoa) -> (plantilla, coche)
+_worker_cars = {}
+
+
+def _worker_car(car_path, aoa):
+    # El coche se reconstruye solo si la plantilla ha cambiado (el JSON se ha modificado)
+    template = load_car(car_path)
+    entry = _worker_cars.get((car_path, aoa))
+    if entry is None or entry[0] is not template:
+        car = template.build() if aoa is None else template.build(aoa_front=aoa, aoa_rear=aoa)
+        entry = _worker_cars[(car_path, aoa)] = (template, car)
+    return entry[1]
+
+
+def _init_worker(preload):
+    """
+    Inicializa un proceso trabajador cargando y discretizando los contextos de preload.
+    """
+    for car_path, aoa, track_path, delta_s in preload:
+        _worker_car(car_path, aoa)
+        discretize(load_track(track_path), delta_s)
+
+
+def _simulate_chunk(context, params_chunk, return_speeds):
+    """
+    Simula un bloque de setups de un contexto en el proceso trabajador.
+    :return: Array de tiempos, o tupla (tiempos, v) si return_speeds es True
+    """
+    car_path, aoa, track_path, delta_s, lap, engine = context
+    template = _worker_car(car_path, aoa)
+    simulator = LapSimulator(template, load_track(track_path), delta_s=delta_s, engine=engine, lap=lap)
+    if engine == "numpy":
+        return simulator.simulate_batch(params_chunk, return_speeds=return_speeds)
+    lap_times = np.empty(len(params_chunk))
+    speeds = []
+    for j, x in enumerate(params_chunk):
+        simulator.car = template.with_params(x)
+        lap_times[j], v = simulator.simulate_lap()
+        speeds.append(np.array(v, dtype=float))
+    return (lap_times, np.array(speeds)) if return_speeds else lap_times
+
+
+class _Request:
+    """
+    Petición de simulación en curso: cuántos setups faltan y a quién responder.
+    """
+    __slots__ = ("id", "size", "remaining", "return_speeds", "send", "start", "done", "failed")
+
+    def __init__(self, request_id, size, return_speeds, send):
+        self.id = request_id
+        self.size = size
+        self.remaining = size
+        self.return_speeds = return_speeds
+        self.send = send
+        self.start = time.monotonic()
+        self.done = asyncio.get_running_loop().create_future()
+        self.failed = False
+
+
+class LapService:
+    """
+    Servicio de simulación con agrupación de peticiones en lotes y estadísticas
+    (profundidad de cola, percentiles de latencia y throughput).
+
+    Uso:
+        service = LapService(workers=4)
+        asyncio.run(service.serve(port=8765))
+    """
+    def __init__(self, workers=None, max_batch=256, max_wait=0.002, preload=(), history=10000):
+        """
+        :param workers: Número de procesos trabajadores, por defecto os.cpu_count()
+        :param max_batch: Máximo de setups por lote
+        :param max_wait: Espera máxima para completar un lote desde que llega su primer setup (s)
+        :param preload: Contextos que los trabajadores cargan al arrancar: (coche, aoa, circuito, delta_s)
+        :param history: Número de latencias guardadas para los percentiles
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        preload = [(os.path.abspath(car), aoa, os.path.abspath(track), delta_s) for car, aoa, track, delta_s in preload]
+        for car_path, _, track_path, delta_s in preload:
+            load_car(car_path)
+            discretize(load_track(track_path), delta_s)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(preload,))
+        self._queues = {}
+        self._dispatchers = {}
+        self._latencies = deque(maxlen=history)
+        self._completed = deque()  # (instante, setups) de los lotes terminados
+        self.started = time.monotonic()
+        self.requests = 0
+        self.setups = 0
+        self.batches = 0
+        self.in_flight = 0
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """
+        Atiende conexiones hasta que se cancela la tarea.
+        :param host: Dirección TCP
+        :param port: Puerto TCP
+        :param path: Ruta de un socket Unix (si se da, se usa en lugar de TCP)
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self._handle, path=path, limit=STREAM_LIMIT)
+        else:
+            server = await asyncio.start_server(self._handle, host, port, limit=STREAM_LIMIT)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in self._dispatchers.values():
+                task.cancel()
+            self._executor.shutdown(cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        # Una conexión puede enviar varias peticiones sin esperar: se atienden en paralelo
+        def send(message):
+            if not writer.is_closing():
+                writer.write(json.dumps(message).encode() + b"\n")
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._handle_request(line, send, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, line, send, writer):
+        request_id = None
+        try:
+            message = json.loads(line)
+            request_id = message.get('id')
+            op = message.get('op')
+            if op == "simulate":
+                await self._simulate(message, send)
+            elif op == "stats":
+                send({'id': request_id, 'done': True, 'stats': self.stats()})
+            else:
+                raise ValueError(f"Operación desconocida: {op!r}")
+        except Exception as exc:
+            send({'id': request_id, 'error': f"{type(exc).__name__}: {exc}"})
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _context(self, message):
+        # Clave de agrupación; se valida aquí para que los errores lleguen a la petición
+        lap = message.get('lap', "standing")
+        engine = message.get('engine', "numpy")
+        if lap not in LapSimulator.LAPS:
+            raise ValueError(f"lap debe ser uno de {LapSimulator.LAPS}, no {lap!r}")
+        if engine not in LapSimulator.ENGINES:
+            raise ValueError(f"engine debe ser uno de {LapSimulator.ENGINES}, no {engine!r}")
+        car_path = os.path.abspath(message['car'])
+        track_path = os.path.abspath(message['track'])
+        load_car(car_path)
+        load_track(track_path)
+        aoa = message.get('aoa')
+        return (car_path, None if aoa is None else float(aoa), track_path, float(message.get('delta_s', 1.0)),
+                lap, engine)
+
+    async def _simulate(self, message, send):
+        context = self._context(message)
+        params = message.get('params')
+        if params is None:
+            params = load_car(context[0]).setup_params()
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        if params.ndim != 2 or params.shape[1] != len(SETUP_PARAMS):
+            raise ValueError(f"params debe tener {len(SETUP_PARAMS)} columnas {SETUP_PARAMS}")
+
+        request = _Request(message.get('id'), len(params), bool(message.get('return_speeds')), send)
+        self.requests += 1
+        if not len(params):
+            send({'id': request.id, 'done': True, 'n': 0})
+            return
+        queue = self._queues.get(context)
+        if queue is None:
+            queue = self._queues[context] = asyncio.Queue()
+            self._dispatchers[context] = asyncio.create_task(self._dispatch(context, queue))
+        for i, row in enumerate(params):
+            queue.put_nowait((request, i, row))
+        await request.done
+
+    async def _dispatch(self, context, queue):
+        # Despachador de un contexto: junta lotes y los simula de uno en uno
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                if not queue.empty():
+                    items.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._run_batch(context, items)
+
+    async def _run_batch(self, context, items):
+        loop = asyncio.get_running_loop()
+        params = np.array([row for _, _, row in items])
+        return_speeds = any(request.return_speeds for request, _, _ in items)
+        chunks = np.array_split(params, min(len(items), self.workers))
+        self.in_flight += len(items)
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self._executor, _simulate_chunk, context, chunk, return_speeds)
+                for chunk in chunks
+            ))
+        except Exception as exc:
+            for request in {request for request, _, _ in items}:
+                if not request.failed:
+                    request.failed = True
+                    request.send({'id': request.id, 'error': f"{type(exc).__name__}: {exc}"})
+                    request.done.set_result(None)
+            return
+        finally:
+            self.in_flight -= len(items)
+
+        if return_speeds:
+            lap_times = np.concatenate([lap_times for lap_times, _ in results])
+            speeds = np.concatenate([v for _, v in results])
+        else:
+            lap_times = np.concatenate(results)
+        self.batches += 1
+        self.setups += len(items)
+        self._completed.append((time.monotonic(), len(items)))
+
+        # Resultados de cada petición del lote, en una línea por petición
+        rows = {}
+        for row, (request, index, _) in enumerate(items):
+            rows.setdefault(request, []).append((row, index))
+        for request, entries in rows.items():
+            if request.failed:
+                continue
+            positions = [row for row, _ in entries]
+            response = {'id': request.id, 'index': [index for _, index in entries],
+                        'lap_time': lap_times[positions].tolist()}
+            if request.return_speeds:
+                response['v'] = speeds[positions].tolist()
+            request.send(response)
+            request.remaining -= len(entries)
+            if request.remaining == 0:
+                request.send({'id': request.id, 'done': True, 'n': request.size})
+                self._latencies.append(time.monotonic() - request.start)
+                request.done.set_result(None)
+
+    def stats(self):
+        """
+        Estadísticas del servicio.
+        :return: Diccionario con queue_depth (setups en cola), in_flight (setups simulándose),
+            requests, setups, batches, mean_batch_size, latency_ms (p50, p90, p99 y max por
+            petición completa), throughput (setups/s en la última ventana), contexts, workers y uptime (s)
+        """
+        now = time.monotonic()
+        while self._completed and self._completed[0][0] < now - THROUGHPUT_WINDOW:
+            self._completed.popleft()
+        window = min(THROUGHPUT_WINDOW, now - self.started)
+        latencies = 1000.0 * np.asarray(self._latencies)
+        if latencies.size:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency = {'p50': p50, 'p90': p90, 'p99': p99, 'max': latencies.max()}
+        else:
+            latency = {'p50': None, 'p90': None, 'p99': None, 'max': None}
+        return {
+            'queue_depth': sum(queue.qsize() for queue in self._queues.values()),
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'setups': self.setups,
+            'batches': self.batches,
+            'mean_batch_size': self.setups / self.batches if self.batches else 0.0,
+            'latency_ms': {key: None if value is None else float(value) for key, value in latency.items()},
+            'throughput': sum(n for _, n in self._completed) / window if window > 0 else 0.0,
+            'contexts': len(self._queues),
+            'workers': self.workers,
+            'uptime': now - self.started,
+        }
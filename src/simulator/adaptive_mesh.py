@@ -0,0 +1,100 @@
+"""
+Malla adaptativa no uniforme para LapSimulator (mesh="adaptive").
+
+Se parte de una malla gruesa con nodos en todos los cambios de segmento y se refina
+por duplicación de paso: en cada iteración se resuelve la vuelta en la malla actual y
+en la malla con todos los intervalos partidos por la mitad, y la diferencia de tiempo
+en cada intervalo estima su error local. Se parten los intervalos cuyo error supera
+su parte de la tolerancia, proporcional a su longitud (tol * ds / L), y los que
+contienen un cambio de régimen (aceleración, frenada o límite en curva). Se para
+cuando la diferencia total entre ambas mallas es menor que la tolerancia y se
+devuelve la solución de la malla fina.
+
+Los pasos hacia delante y hacia atrás son de primer orden, así que los puntos crecen
+como 1/tol: en track.json unos 11k con tol=1e-2, 94k con 1e-3 y 1.3M con 1e-4.
+"""
+import numpy as np
+
+MAX_SPACING = 25.0  # Paso máximo de la malla inicial (m)
+MIN_SPACING = 1e-3  # Paso mínimo al refinar (m)
+MAX_ITERATIONS = 40
+
+
+def _node_limits(nodes, starts, limits):
+    # Cornering limit at each node; boundary nodes take the slower of both segments
+    k = np.clip(np.searchsorted(starts, nodes, side='right') - 1, 0, len(starts) - 1)
+    v_max = limits[k]
+    at_boundary = (k > 0) & (nodes == starts[k])
+    v_max[at_boundary] = np.minimum(v_max[at_boundary], limits[k[at_boundary] - 1])
+    return k, v_max
+
+
+def _solve(simulator, nodes, starts, seg_radii, limits):
+    # Run the passes on a given mesh; returns per-interval times and the regime of each node
+    k, v_max = _node_limits(nodes, starts, limits)
+    simulator.radii = seg_radii[k]
+    simulator.ds = np.diff(nodes)
+    simulator.v_max = v_max
+    simulator.v = v_max.copy()
+    simulator.v[0] = 0.0
+    simulator._forward()
+    v_fwd = simulator.v.copy()
+    simulator._backward()
+
+    v = simulator.v
+    v_sum = v[:-1] + v[1:]
+    with np.errstate(divide='ignore'):
+        dt = np.where(v_sum > 0, 2 * simulator.ds / v_sum, 0.0)
+    # 0: límite en curva, 1: aceleración, 2: frenada
+    regime = np.where(v < v_fwd, 2, np.where(v < v_max, 1, 0))
+    return dt, regime
+
+
+def simulate_adaptive(simulator):
+    """
+    Simula la vuelta en una malla adaptativa con control del error en el tiempo de vuelta.
+    Deja en el simulador la malla final (simulator.nodes, simulator.ds), el perfil y
+    la estimación del error (simulator.error_estimate).
+    :param simulator: Instancia de LapSimulator con mesh="adaptive"
+    :return: Tupla (tiempo de vuelta, v)
+    """
+    lengths, seg_radii = np.array(simulator.track.segments, dtype=float).reshape(-1, 2).T
+    limits = simulator.car.max_velocity_array(seg_radii, v_limit=simulator.VEL_MAX_LIMIT)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    length = ends[-1]
+    tol = simulator.tolerance
+
+    # Malla inicial: cambios de segmento más subdivisiones de como mucho MAX_SPACING
+    pieces = [np.linspace(s0, s1, int(np.ceil((s1 - s0) / MAX_SPACING)) + 1)[:-1]
+              for s0, s1 in zip(starts, ends)]
+    nodes = np.unique(np.concatenate(pieces + [ends[-1:]]))
+
+    converged = False
+    for iteration in range(MAX_ITERATIONS):
+        dt_coarse, regime = _solve(simulator, nodes, starts, seg_radii, limits)
+        mid = 0.5 * (nodes[:-1] + nodes[1:])
+        fine = np.empty(2 * len(nodes) - 1)
+        fine[0::2] = nodes
+        fine[1::2] = mid
+        dt_fine, _ = _solve(simulator, fine, starts, seg_radii, limits)
+
+        local_error = np.abs(dt_fine[0::2] + dt_fine[1::2] - dt_coarse)
+        simulator.error_estimate = float(local_error.sum())
+        if simulator.error_estimate < tol:
+            converged = True
+            break
+
+        # Refinar donde el error supera su parte de la tolerancia (proporcional a la longitud
+        # del intervalo) o cambia el régimen
+        refine = (local_error > tol * np.diff(nodes) / length) | (regime[:-1] != regime[1:])
+        refine &= np.diff(nodes) > 2 * MIN_SPACING
+        if not refine.any():
+            break
+        nodes = np.sort(np.concatenate([nodes, mid[refine]]))
+
+    simulator.nodes = fine
+    if simulator.profiler is not None:
+        simulator.profiler.iterations("adaptive_mesh", iteration + 1, converged)
+        simulator._count_lap(len(fine))
+    return float(dt_fine.sum()), simulator.v
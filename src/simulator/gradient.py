@@ -0,0 +1,285 @@
+"""
+Gradiente exacto del tiempo de vuelta respecto a los parámetros de setup (SETUP_PARAMS).
+
+Se usa un barrido adjunto sobre la simulación del motor "numpy":
+1. Se simula la vuelta guardando el perfil tras la pasada hacia delante.
+2. Se calculan, vectorizadas para todos los puntos, las derivadas locales de la
+   aceleración, la deceleración y la velocidad máxima en curva.
+3. Un barrido escalar recorre las pasadas en orden inverso propagando dT/dv.
+   En cada min() (límites de curva, aceleración y frenada) solo contribuye la rama
+   activa, que es un subgradiente válido en los puntos de cambio.
+Con lap="flying" se aplica lo mismo a la vuelta cerrada en el punto de corte, cuya
+velocidad fijada (el límite en curva de ese punto) también depende de los parámetros.
+El coste es del orden de una vuelta más, en lugar de 2 * n_params vueltas.
+"""
+import numpy as np
+
+from ..models.aero import Aero
+from ..models.car import SETUP_PARAMS
+
+G = 9.81
+# Índices en el vector de derivadas: los parámetros de SETUP_PARAMS y, al final, la velocidad
+(_P, _B, _M, _MU, _CLAF, _CLAR, _CDAF, _CDAR, _FW, _RW) = range(len(SETUP_PARAMS))
+_V = len(SETUP_PARAMS)
+
+
+def _aero_partials(car):
+    """
+    Factores de downforce y drag (F = k * v^2) y sus derivadas respecto a SETUP_PARAMS.
+    Los coeficientes de los alerones se toman como pendiente * f(aoa), igual que en Aero.
+    """
+    aero = car.aero
+    half_rho = 0.5 * aero.rho
+    lift_f = float(Aero.lift_coefficient(1.0, aero.aoa_front, aero.polar_front))
+    lift_r = float(Aero.lift_coefficient(1.0, aero.aoa_rear, aero.polar_rear))
+    drag_f = float(Aero.drag_coefficient(1.0, aero.aoa_front, aero.polar_front))
+    drag_r = float(Aero.drag_coefficient(1.0, aero.aoa_rear, aero.polar_rear))
+
+    dk_down = np.zeros(len(SETUP_PARAMS))
+    dk_down[_CLAF] = half_rho * lift_f * aero.fw_area
+    dk_down[_CLAR] = half_rho * lift_r * aero.rw_area
+    dk_down[_FW] = half_rho * aero.cl_front
+    dk_down[_RW] = half_rho * aero.cl_rear
+
+    dk_drag = np.zeros(len(SETUP_PARAMS))
+    dk_drag[_CDAF] = half_rho * drag_f * aero.fw_area
+    dk_drag[_CDAR] = half_rho * drag_r * aero.rw_area
+    dk_drag[_FW] = half_rho * aero.cd_front
+    dk_drag[_RW] = half_rho * aero.cd_rear
+
+    k_drag = half_rho * (aero.cd_front * aero.fw_area + aero.cd_rear * aero.rw_area)
+    return aero.downforce_coefficient(), dk_down, k_drag, dk_drag
+
+
+def _v_max_partials(car, radii, v_max):
+    """
+    Derivadas de la velocidad máxima en curva en forma cerrada (Car.max_velocity_array).
+    Donde no hay límite por agarre (se usa la velocidad límite) la derivada es nula.
+    :return: Array (P, n_params)
+    """
+    k_down, dk_down, _, _ = _aero_partials(car)
+    mu, m = car.tire_grip, car.mass
+    grad = np.zeros((len(radii), len(SETUP_PARAMS)))
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        denom = 1.0 - mu * k_down * radii / m
+        v_sq = mu * G * radii / denom
+        solvable = np.isfinite(radii) & (denom > 0) & np.isfinite(v_sq) & (v_sq >= 0)
+    r = radii[solvable]
+    v = v_max[solvable]
+    denom = denom[solvable]
+    # v = sqrt(mu * g * r / denom)  ->  dv = v / 2 * (dmu / mu - ddenom / denom)
+    d_denom = np.zeros((len(r), len(SETUP_PARAMS)))
+    d_denom[:, _MU] = -k_down * r / m
+    d_denom[:, _M] = mu * k_down * r / m**2
+    d_denom -= np.outer(mu * r / m, dk_down)
+
+    g = -d_denom / denom[:, None]
+    g[:, _MU] += 1.0 / mu
+    grad[solvable] = 0.5 * v[:, None] * g
+    return grad
+
+
+def _acceleration_partials(car, v):
+    """
+    Derivadas de Car.max_acceleration respecto a SETUP_PARAMS y a la velocidad.
+    :param v: Array (P,) de velocidades
+    :return: Array (P, n_params + 1)
+    """
+    _, _, k_drag, dk_drag = _aero_partials(car)
+    m, mu, power = car.mass, car.tire_grip, car.power
+
+    grip_force = mu * m * G
+    with np.errstate(divide='ignore'):
+        power_force = np.where(v > 0, power / np.where(v > 0, v, 1.0), np.inf)
+    grip_limited = grip_force <= power_force
+    F = np.where(grip_limited, grip_force, power_force)
+    acc = (F - k_drag * v**2) / m
+    active = acc > 0
+
+    # Derivadas de la fuerza disponible
+    dF = np.zeros((len(v), len(SETUP_PARAMS) + 1))
+    dF[grip_limited, _MU] = m * G
+    dF[grip_limited, _M] = mu * G
+    pl = ~grip_limited
+    dF[pl, _P] = 1.0 / v[pl]
+    dF[pl, _V] = -power / v[pl]**2
+
+    # acc = (F - k_drag * v^2) / m
+    grad = dF / m
+    grad[:, :_V] -= np.outer(v**2, dk_drag) / m
+    grad[:, _V] -= 2 * k_drag * v / m
+    grad[:, _M] -= acc / m
+    grad[~active] = 0.0
+    return grad
+
+
+def _deceleration_partials(car, v):
+    """
+    Derivadas de |Car.max_deceleration| respecto a SETUP_PARAMS y a la velocidad.
+    Se deriva la propia iteración de transferencia de carga (mismo criterio de parada).
+    :param v: Array (P,) de velocidades
+    :return: Array (P, n_params + 1)
+    """
+    k_down, dk_down, _, _ = _aero_partials(car)
+    m, mu, h_L = car.mass, car.tire_grip, car.h_cg / car.wheelbase
+    n = len(SETUP_PARAMS) + 1
+    bias_f = car.brake_bias if car.brake_bias > 0 else 1e-3
+    bias_r = (1 - car.brake_bias) if (1 - car.brake_bias) > 0 else 1e-3
+
+    W = m * G + k_down * v**2
+    dW = np.zeros((len(v), n))
+    dW[:, _M] = G
+    dW[:, :_V] += np.outer(v**2, dk_down)
+    dW[:, _V] = 2 * k_down * v
+
+    a_sys = car.brake_force / m
+    da_sys = np.zeros(n)
+    da_sys[_B] = 1.0 / m
+    da_sys[_M] = -car.brake_force / m**2
+
+    a = np.full(len(v), a_sys)
+    da = np.tile(da_sys, (len(v), 1))
+    active = np.ones(len(v), dtype=bool)
+    for _ in range(10):
+        delta_w = m * a * h_L
+        d_delta_w = h_L * m * da
+        d_delta_w[:, _M] += h_L * a
+
+        grip_f = mu * (W * 0.5 + delta_w)
+        grip_r = mu * (W * 0.5 - delta_w)
+        d_grip_f = mu * (0.5 * dW + d_delta_w)
+        d_grip_f[:, _MU] += W * 0.5 + delta_w
+        d_grip_r = mu * (0.5 * dW - d_delta_w)
+        d_grip_r[:, _MU] += W * 0.5 - delta_w
+
+        a_f = grip_f / (m * bias_f)
+        a_r = grip_r / (m * bias_r)
+        da_f = d_grip_f / (m * bias_f)
+        da_f[:, _M] -= a_f / m
+        da_r = d_grip_r / (m * bias_r)
+        da_r[:, _M] -= a_r / m
+
+        # min(a_sys, a_f, a_r) con el mismo desempate que min() de Python
+        use_sys = (a_sys <= a_f) & (a_sys <= a_r)
+        use_f = ~use_sys & (a_f <= a_r)
+        a_allowed = np.where(use_sys, a_sys, np.where(use_f, a_f, a_r))
+        da_allowed = np.where(use_sys[:, None], da_sys, np.where(use_f[:, None], da_f, da_r))
+
+        converged = np.abs(a_allowed - a) < 1e-3
+        a = np.where(active, a_allowed, a)
+        da = np.where(active[:, None], da_allowed, da)
+        active &= ~converged
+        if not active.any():
+            break
+    return da
+
+
+def lap_time_gradient(simulator):
+    """
+    Simula una vuelta con el motor "numpy" y devuelve el gradiente exacto del tiempo.
+    :param simulator: Instancia de LapSimulator (su coche necesita los ángulos de ataque definidos)
+    :return: Tupla (tiempo de vuelta, perfil de velocidad, gradiente en el orden de SETUP_PARAMS)
+    """
+    with simulator._profiled_car():
+        return _lap_time_gradient(simulator)
+
+
+def _lap_time_gradient(simulator):
+    car, ds = simulator.car, simulator.delta_s
+
+    # Primal: misma simulación que el motor "numpy", guardando el perfil tras la pasada hacia delante
+    simulator.ds = None
+    with simulator._phase("discretize"):
+        simulator.radii = radii = simulator._discretize_numpy()
+    with simulator._phase("v_max"):
+        simulator.v_max = v_max = simulator._v_max_numpy()
+    flying = simulator.lap == "flying"
+    if flying:
+        # Vuelta lanzada: se trabaja sobre la vuelta cerrada en el punto de corte (LapSimulator._seam)
+        order, simulator.v = simulator._seam()
+        seam_speed = v_max[order[0]]
+        radii, v_max = radii[order], v_max[order]
+    else:
+        simulator.v = simulator.v_max.copy()
+        simulator.v[0] = 0.0
+    v_start = simulator.v.copy()
+    with simulator._phase("forward"):
+        simulator._forward()
+    v_fwd = simulator.v.copy()
+    with simulator._phase("backward"):
+        simulator._backward()
+    v = simulator.v
+    with simulator._phase("lap_time"):
+        lap_time = simulator._calculate_lap_time_numpy()
+    simulator._count_lap(len(v) - 1 if flying else len(v))
+    if flying:
+        simulator.v = np.roll(v[:-1], order[0])
+    n_points = len(v)
+    if n_points < 2:
+        return lap_time, simulator.v, np.zeros(len(SETUP_PARAMS))
+
+    with simulator._phase("adjoint"):
+        # Ramas activas de cada min(): True donde manda la aceleración/frenada y no el límite previo
+        accel_branch = np.zeros(n_points, dtype=bool)
+        accel_branch[1:] = v_fwd[1:] < v_start[1:]
+        brake_branch = np.zeros(n_points, dtype=bool)
+        brake_branch[:-1] = v[:-1] < v_fwd[:-1]
+
+        # Derivadas locales, vectorizadas. u_i = sqrt(v_{i-1}^2 + 2 a ds), w_i = sqrt(v_{i+1}^2 + 2 d ds)
+        dacc = _acceleration_partials(car, v_fwd[:-1])
+        ddec = _deceleration_partials(car, v[1:])
+        u = v_fwd[1:]
+        w = v[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            du = np.where(u[:, None] > 0, ds * dacc / u[:, None], 0.0)
+            du[:, _V] += np.where(u > 0, v_fwd[:-1] / u, 0.0)
+            dw = np.where(w[:, None] > 0, ds * ddec / w[:, None], 0.0)
+            dw[:, _V] += np.where(w > 0, v[1:] / w, 0.0)
+        dv_max = _v_max_partials(car, radii, v_max)
+        if flying and v[0] < seam_speed:
+            # Corte a la velocidad punta: la velocidad fijada no depende del límite en curva.
+            # Su derivada respecto a los parámetros no se propaga (caso degenerado sin curvas limitantes)
+            dv_max[0] = dv_max[-1] = 0.0
+
+        # dT/dv de la regla del trapecio
+        v_sum = v[:-1] + v[1:]
+        with np.errstate(divide='ignore'):
+            dT_ds = np.where(v_sum > 0, -2 * ds / v_sum**2, 0.0)
+        lam_b = np.zeros(n_points)
+        lam_b[:-1] += dT_ds
+        lam_b[1:] += dT_ds
+
+        # Adjunto de la pasada hacia atrás (se recorre en sentido contrario: hacia delante)
+        lam_b = lam_b.tolist()
+        lam_f = [0.0] * n_points
+        coef_brake = [0.0] * n_points
+        dw_dv = dw[:, _V].tolist()
+        branch = brake_branch.tolist()
+        for i in range(n_points - 1):
+            if branch[i]:
+                coef_brake[i] = lam_b[i]
+                lam_b[i+1] += lam_b[i] * dw_dv[i]
+            else:
+                lam_f[i] += lam_b[i]
+        lam_f[-1] += lam_b[-1]
+
+        # Adjunto de la pasada hacia delante (se recorre hacia atrás). v[0] es 0 desde parado
+        # o, en la vuelta lanzada, el límite en curva del punto de corte
+        coef_accel = [0.0] * n_points
+        coef_vmax = [0.0] * n_points
+        du_dv = du[:, _V].tolist()
+        branch = accel_branch.tolist()
+        for i in range(n_points - 1, 0, -1):
+            if branch[i]:
+                coef_accel[i] = lam_f[i]
+                lam_f[i-1] += lam_f[i] * du_dv[i-1]
+            else:
+                coef_vmax[i] = lam_f[i]
+        if flying:
+            coef_vmax[0] = lam_f[0]
+
+        grad = np.asarray(coef_accel[1:]) @ du[:, :_V]
+        grad += np.asarray(coef_brake[:-1]) @ dw[:, :_V]
+        grad += np.asarray(coef_vmax) @ dv_max
+    return lap_time, simulator.v, grad
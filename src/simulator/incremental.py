@@ -0,0 +1,189 @@
+"""
+Re-simulación incremental de la vuelta (LapSimulator.simulate_incremental).
+
+Se guarda el perfil de la última simulación (límites en curva, perfil tras la pasada
+hacia delante y perfil final) y, tras cambiar parámetros o segmentos, solo se vuelve a
+evaluar el modelo donde el resultado puede cambiar:
+- pasada hacia delante: v[i] solo depende de v[i-1], del límite en curva v_max[i] y de
+  la curva de aceleración. Si la curva de aceleración no ha cambiado, en cuanto v[i-1]
+  vuelve a coincidir con el perfil guardado se copia el perfil hasta el siguiente punto
+  donde cambia v_max. Además, mientras v[i-1] >= v_max[i] la aceleración no limita y no
+  hace falta evaluarla: se salta hasta el siguiente punto donde v_max crece;
+- pasada hacia atrás: lo mismo con la frenada, el perfil de la pasada hacia delante y
+  los puntos donde este decrece.
+Así un cambio en brake_force solo recalcula las zonas de frenada, uno en power las de
+aceleración (y las frenadas que cambian con ellas) y la edición de un segmento solo la
+región afectada. El resultado es idéntico al de una simulación completa del motor "numpy".
+"""
+import numpy as np
+
+from ..models.car import SETUP_PARAMS
+from ..models.track import Track
+
+
+def _acceleration_inputs(car):
+    # Everything Car.max_acceleration depends on
+    aero = car.aero
+    return (car.power, car.tire_grip, car.mass,
+            aero.rho, aero.cd_front, aero.cd_rear, aero.fw_area, aero.rw_area)
+
+
+def _deceleration_inputs(car):
+    # Everything Car.max_deceleration depends on
+    aero = car.aero
+    return (car.brake_force, car.mass, car.tire_grip, car.brake_bias, car.h_cg, car.wheelbase,
+            aero.rho, aero.cl_front, aero.cl_rear, aero.fw_area, aero.rw_area)
+
+
+def _align(old, n_points, old_segments, new_segments, delta_s):
+    """
+    Alinea un array del perfil guardado con los puntos del circuito nuevo. Si cambia el
+    número de puntos se conservan los tramos anterior y posterior a los segmentos
+    editados; el resto queda a NaN (se recalcula).
+    """
+    if len(old) == n_points:
+        return old
+    aligned = np.full(n_points, np.nan)
+    if old_segments is None:
+        return aligned
+    prefix = 0
+    while prefix < min(len(old_segments), len(new_segments)) and old_segments[prefix] == new_segments[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(old_segments), len(new_segments)) - prefix
+           and old_segments[-1 - suffix] == new_segments[-1 - suffix]):
+        suffix += 1
+    steps = [int(np.ceil(length / delta_s)) for length, _ in old_segments]
+    head = sum(steps[:prefix])
+    tail = sum(steps[len(steps) - suffix:])
+    aligned[:head] = old[:head]
+    if tail:
+        aligned[-tail:] = old[-tail:]
+    return aligned
+
+
+def _forward(v, v_old, changed, max_acceleration, ds, reuse):
+    # Forward pass over v (initialized with the cornering limits and the start speed)
+    n = len(v)
+    changed_at = np.flatnonzero(changed)
+    rises = np.flatnonzero(v[1:] > v[:-1]) + 1
+    i = 1
+    while i < n:
+        prev = v[i-1]
+        if reuse and prev == v_old[i-1] and not changed[i]:
+            # Rejoined the stored profile: copy it up to the next cornering-limit change
+            j = changed_at[np.searchsorted(changed_at, i)] if changed_at.size and changed_at[-1] >= i else n
+            v[i:j] = v_old[i:j]
+            i = j
+            continue
+        if prev >= v[i]:
+            # On the cornering limit: acceleration cannot bind until v_max rises again
+            k = np.searchsorted(rises, i)
+            i = rises[k] if k < len(rises) else n
+            continue
+        v_allowed = np.sqrt(prev**2 + 2 * max_acceleration(prev) * ds)
+        if v_allowed < v[i]:
+            v[i] = v_allowed
+        i += 1
+    return v
+
+
+def _backward(v, v_old, changed, max_deceleration, ds, reuse):
+    # Backward pass over v (initialized with the forward profile)
+    n = len(v)
+    changed_at = np.flatnonzero(changed)
+    drops = np.flatnonzero(v[:-1] > v[1:])
+    i = n - 2
+    while i >= 0:
+        nxt = v[i+1]
+        if reuse and nxt == v_old[i+1] and not changed[i]:
+            # Rejoined the stored profile: copy it back to the previous forward-profile change
+            k = np.searchsorted(changed_at, i, side='right') - 1
+            j = changed_at[k] if k >= 0 else -1
+            v[j+1:i+1] = v_old[j+1:i+1]
+            i = j
+            continue
+        if nxt >= v[i]:
+            # Braking cannot bind until the forward profile drops
+            k = np.searchsorted(drops, i, side='right') - 1
+            i = drops[k] if k >= 0 else -1
+            continue
+        v_allowed = np.sqrt(nxt**2 + 2 * abs(max_deceleration(nxt)) * ds)
+        if v_allowed < v[i]:
+            v[i] = v_allowed
+        i -= 1
+    return v
+
+
+def simulate_incremental(simulator, params=None, names=SETUP_PARAMS, segments=None):
+    """
+    Aplica un cambio de parámetros o de segmentos y re-simula la vuelta reutilizando el
+    perfil de la llamada anterior. La primera llamada simula la vuelta completa.
+    :param simulator: Instancia de LapSimulator con engine="numpy"
+    :param params: Valores de los parámetros que cambian (ver Car.with_params)
+    :param names: Nombres de esos parámetros, por defecto SETUP_PARAMS
+    :param segments: Diccionario {índice: (longitud, radio)} con los segmentos que cambian
+    :return: Tupla (tiempo de vuelta, v)
+    """
+    if simulator.engine != "numpy" or simulator.mesh != "uniform" or simulator.envelope:
+        raise ValueError('simulate_incremental requiere engine="numpy", mesh="uniform" y sin envelope')
+    if params is not None:
+        simulator.car = simulator.car.with_params(params, names=names)
+    if segments:
+        new_segments = list(simulator.track.segments)
+        for index, segment in segments.items():
+            new_segments[index] = tuple(segment)
+        simulator.track = Track(new_segments, simulator.track.directions)
+
+    with simulator._profiled_car():
+        return _resimulate(simulator)
+
+
+def _resimulate(simulator):
+    # Incremental forward/backward passes over the profile of the previous call
+    car = simulator.car
+    state = getattr(simulator, '_incremental_state', None)
+    if state is not None and (state['delta_s'] != simulator.delta_s or state['lap'] != simulator.lap):
+        state = None
+    segments_now = tuple(simulator.track.segments) if simulator.track is not None else None
+
+    simulator.ds = None
+    with simulator._phase("discretize"):
+        simulator.radii = simulator._discretize_numpy()
+    with simulator._phase("v_max"):
+        simulator.v_max = simulator._v_max_numpy()
+        if simulator.lap == "flying":
+            order, v_start = simulator._seam()
+        else:
+            order, v_start = None, simulator.v_max.copy()
+            v_start[0] = 0.0
+    n = len(v_start)
+
+    if state is None or (order is not None and (state['order'] is None or state['order'][0] != order[0])):
+        old_start = old_fwd = old_v = np.full(n, np.nan)
+        same_acc = same_dec = False
+    else:
+        align = lambda a: _align(a, n, state['segments'], segments_now, simulator.delta_s)
+        old_start, old_fwd, old_v = align(state['v_start']), align(state['v_fwd']), align(state['v'])
+        same_acc = state['acc'] == _acceleration_inputs(car)
+        same_dec = state['dec'] == _deceleration_inputs(car)
+
+    with simulator._phase("forward"):
+        v_fwd = _forward(v_start.copy(), old_fwd, ~(v_start == old_start), car.max_acceleration,
+                         simulator.delta_s, same_acc)
+    with simulator._phase("backward"):
+        v = _backward(v_fwd.copy(), old_v, ~(v_fwd == old_fwd), car.max_deceleration,
+                      simulator.delta_s, same_dec)
+
+    simulator._incremental_state = {
+        'delta_s': simulator.delta_s, 'lap': simulator.lap, 'segments': segments_now, 'order': order,
+        'v_start': v_start, 'v_fwd': v_fwd, 'v': v,
+        'acc': _acceleration_inputs(car), 'dec': _deceleration_inputs(car),
+    }
+    simulator.v = v
+    with simulator._phase("lap_time"):
+        lap_time = simulator._calculate_lap_time_numpy()
+    simulator._count_lap(n)
+    if order is not None:
+        simulator.v = np.roll(v[:-1], order[0])
+    return lap_time, simulator.v
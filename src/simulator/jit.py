@@ -0,0 +1,122 @@
+"""
+Backend compilado (numba) de las pasadas hacia delante y hacia atrás.
+
+_forward y _backward son recurrencias secuenciales: cada punto depende de la velocidad
+del anterior a través de Car.max_acceleration / max_deceleration, y la vectorización
+por arrays no elimina el bucle. Aquí el modelo del coche se reduce a una tupla de
+floats (car_model) y las dos pasadas se escriben como funciones sobre arrays planos
+que numba compila a código máquina.
+
+Las operaciones siguen exactamente el orden de Car y Aero (misma aritmética IEEE, sin
+fastmath), así que el resultado coincide bit a bit con el de las pasadas de referencia.
+
+numba es opcional: si no está instalado HAVE_NUMBA es False y LapSimulator con
+backend="jit" usa las pasadas de Python de siempre.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+
+
+def _jit(function):
+    # Sin numba los kernels quedan como funciones de Python (útiles para comprobarlos)
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+def car_model(car):
+    """
+    Parámetros del coche que usan las pasadas, como tupla de floats.
+    :param car: Instancia de Car con los ángulos de ataque definidos
+    :return: Tupla (mass, tire_grip, power, brake_force, brake_bias, wheelbase, h_cg,
+        half_rho, downforce_area, drag_area), con F = half_rho * v^2 * area
+    """
+    aero = car.aero
+    return (
+        float(car.mass), float(car.tire_grip), float(car.power), float(car.brake_force),
+        float(car.brake_bias), float(car.wheelbase), float(car.h_cg),
+        0.5 * aero.rho,
+        float(aero.cl_front * aero.fw_area + aero.cl_rear * aero.rw_area),
+        float(aero.cd_front * aero.fw_area + aero.cd_rear * aero.rw_area),
+    )
+
+
+@_jit
+def max_acceleration(v, model):
+    """
+    Car.max_acceleration sobre la tupla de car_model.
+    """
+    mass, tire_grip, power = model[0], model[1], model[2]
+    drag_force = model[7] * v**2 * model[9]
+    grip_force = tire_grip * mass * 9.81
+    power_force = power / v if v > 0 else np.inf
+    F_available = power_force if power_force < grip_force else grip_force
+    acc = (F_available - drag_force) / mass
+    return 0.0 if 0.0 > acc else acc
+
+
+@_jit
+def max_deceleration(v, model):
+    """
+    Car.max_deceleration sobre la tupla de car_model (valor negativo).
+    """
+    mass, tire_grip, brake_force, brake_bias, wheelbase, h_cg = model[0], model[1], model[3], model[4], model[5], model[6]
+    g = 9.81
+    total_weight = mass * g + model[7] * v**2 * model[8]
+    a_system = brake_force / mass
+    a = a_system
+    bias_f = brake_bias if brake_bias > 0 else 1e-3
+    bias_r = (1 - brake_bias) if (1 - brake_bias) > 0 else 1e-3
+    for _ in range(10):
+        delta_w = mass * a * h_cg / wheelbase
+        grip_front = tire_grip * (total_weight * 0.5 + delta_w)
+        grip_rear = tire_grip * (total_weight * 0.5 - delta_w)
+        a_front_limit = grip_front / (mass * bias_f)
+        a_rear_limit = grip_rear / (mass * bias_r)
+        # min(a_system, a_front_limit, a_rear_limit) de Python: el primero de los menores
+        a_allowed = a_system
+        if a_front_limit < a_allowed:
+            a_allowed = a_front_limit
+        if a_rear_limit < a_allowed:
+            a_allowed = a_rear_limit
+        if abs(a_allowed - a) < 1e-3:
+            a = a_allowed
+            break
+        a = a_allowed
+    return -a
+
+
+@_jit
+def forward_pass(v, ds, model):
+    """
+    Pasada hacia delante (LapSimulator._forward) sobre v, en el sitio.
+    :param v: Array de velocidades, inicializado con los límites en curva
+    :param ds: Array con la longitud de cada intervalo (len(v) - 1)
+    :param model: Tupla de car_model
+    """
+    for i in range(1, len(v)):
+        a_max = max_acceleration(v[i-1], model)
+        v_allowed = np.sqrt(v[i-1]**2 + 2 * a_max * ds[i-1])
+        if v_allowed < v[i]:
+            v[i] = v_allowed
+
+
+@_jit
+def backward_pass(v, ds, model):
+    """
+    Pasada hacia atrás (LapSimulator._backward) sobre v, en el sitio.
+    :param v: Array de velocidades tras la pasada hacia delante
+    :param ds: Array con la longitud de cada intervalo (len(v) - 1)
+    :param model: Tupla de car_model
+    """
+    for i in range(len(v) - 2, -1, -1):
+        decel = abs(max_deceleration(v[i+1], model))
+        v_allowed = np.sqrt(v[i+1]**2 + 2 * decel * ds[i])
+        if v_allowed < v[i]:
+            v[i] = v_allowed
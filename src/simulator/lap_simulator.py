@@ -1,44 +1,274 @@
+from contextlib import contextmanager, nullcontext
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from ..models.car import Car, SETUP_PARAMS
+from ..models.car_batch import CarBatch
+from ..utils.cache import discretize
+from .gradient import lap_time_gradient
+from .segment_solver import SegmentSolver
+from .adaptive_mesh import simulate_adaptive
+from .incremental import simulate_incremental
+from . import jit
+
+_NO_PHASE = nullcontext()  # Fase sin medir cuando el perfilador está desactivado
+
+
+@contextmanager
+def _lend_profiler(car, profiler):
+    # The car counts its model calls during one simulation only: the caller's car is
+    # left as it was (usually without profiler), even if the simulation raises
+    had_own = 'profiler' in car.__dict__
+    previous = car.profiler
+    car.profiler = profiler
+    try:
+        yield
+    finally:
+        if had_own:
+            car.profiler = previous
+        else:
+            del car.profiler
+
+def _cap_top_speed(max_acceleration, v, iterations=60):
+    """
+    Limita v a la velocidad punta del coche (donde la aceleración máxima se anula),
+    que se busca por bisección solo si el coche no puede acelerar a la velocidad v.
+    :param max_acceleration: Función escalar de aceleración máxima (m/s^2)
+    :param v: Velocidad (m/s)
+    :return: min(v, velocidad punta) (m/s)
+    """
+    v = float(v)
+    if max_acceleration(v) > 0:
+        return v
+    lo, hi = 0.0, v
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        if max_acceleration(mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
 
 class LapSimulator:
     """
     Clase principal para simular una vuelta en un circuito dado un coche y un circuito.
+
+    Motores disponibles (parámetro engine):
+    - "python": implementación de referencia, punto a punto.
+    - "numpy": discretización, velocidad máxima en curva y tiempo de vuelta vectorizados.
+      La velocidad máxima se obtiene en forma cerrada (Car.max_velocity_array) en lugar
+      de la iteración de punto fijo, por lo que el resultado difiere del motor "python"
+      solo en la tolerancia de esa iteración (1e-3 m/s). En la práctica el tiempo de
+      vuelta coincide con una tolerancia relativa de 1e-4 (NUMPY_RTOL).
+      Con downforce negativo (ángulos de ataque negativos) la iteración de referencia
+      no converge y ambos motores no son comparables; "numpy" da la solución exacta.
+    - "segment": resolución analítica por segmentos (ver segment_solver.py). El tiempo
+      de vuelta no depende de delta_s, que solo se usa para muestrear el perfil devuelto;
+      los motores discretos convergen a él al reducir delta_s.
+
+    Tipos de vuelta (parámetro lap):
+    - "standing": vuelta desde parado (v = 0 en la salida).
+    - "flying": vuelta lanzada periódica, con la velocidad de salida igual a la de llegada.
+      En lugar de simular vueltas de calentamiento, la vuelta se corta por su punto más
+      lento: ahí la solución periódica va siempre a su límite en curva (o a la velocidad
+      punta si el coche no llega a él), así que basta una pasada hacia delante y otra
+      hacia atrás sobre la vuelta rotada y cerrada en ese punto.
+    simulate_lap devuelve la vuelta elegida en lap, que es la que usan los optimizadores
+    como fitness; simulate_laps devuelve los tiempos de ambas en una sola llamada.
+
+    Backends de las pasadas hacia delante y hacia atrás (parámetro backend), con los
+    motores "python" y "numpy":
+    - "python": bucle de Python llamando a Car.max_acceleration / max_deceleration.
+    - "jit": kernels compilados con numba (ver jit.py), idénticos bit a bit. Si numba no
+      está instalado se usa "python" (self.backend indica el que se usa de verdad).
+      Con envelope las pasadas consultan la envolvente y siguen en Python.
     """
-    def __init__(self, car, track, delta_s=1.0):
+    ENGINES = ("python", "numpy", "segment")
+    MESHES = ("uniform", "adaptive")
+    LAPS = ("standing", "flying")
+    SEGMENT_RESOLUTION = 0.01  # Paso de las tablas en velocidad del motor "segment" (m/s)
+    VEL_MAX_LIMIT = 200.0  # Límite superior para velocidad máxima (evitar NaN o inf)
+    NUMPY_RTOL = 1e-4  # Tolerancia relativa declarada del motor "numpy" frente a "python"
+    BACKENDS = ("python", "jit")
+
+    def __init__(self, car, track, delta_s=1.0, engine="python", radii=None, envelope=None,
+                 mesh="uniform", tolerance=1e-3, lap="standing", profiler=None, backend="python"):
         """
         Inicializa el simulador de vueltas.
         :param car: Instancia de Car
         :param track: Instancia de Track
         :param delta_s: Resolución espacial (m)
+        :param engine: Motor de cálculo ("python" o "numpy")
+        :param radii: Radios ya discretizados con delta_s (opcional). Si se dan, no se
+            vuelve a discretizar el circuito (p. ej. arrays compartidos entre procesos)
+        :param envelope: Si es True o una resolución (m/s), las pasadas consultan la envolvente
+            precalculada del coche (Car.envelope) en lugar de evaluar el modelo en cada punto.
+            Es opcional (por defecto None) porque la interpolación lineal no respeta los
+            codos del modelo (mínimos entre potencia y agarre, convergencia de la frenada):
+            en track.json la vuelta sale unos 0.034 s más rápida con 0.5 m/s (2.9e-4 relativo,
+            por encima de NUMPY_RTOL) y 0.002 s con 0.05 m/s, cuya tabla ya cuesta construirla
+            casi lo mismo que una vuelta. Activarla por defecto cambiaría los tiempos de los
+            optimizadores, de la caché de fitness y del gradiente
+        :param mesh: "uniform" (paso delta_s) o "adaptive" (malla no uniforme con control de error)
+        :param tolerance: Error admitido en el tiempo de vuelta con mesh="adaptive" (s)
+        :param lap: Vuelta que devuelve simulate_lap: "standing" (desde parado) o "flying" (lanzada)
+        :param profiler: Profiler opcional (src/utils/profiling.py) que acumula tiempos por fase,
+            puntos simulados e iteraciones. Se asigna también al coche simulado para contar
+            sus llamadas al modelo. Con None (por defecto) no se mide nada
+        :param backend: Implementación de las pasadas: "python" o "jit" (numba, si está instalado).
+            Con "jit" el perfilador mide las fases pero no cuenta las llamadas al modelo
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine debe ser uno de {self.ENGINES}, no {engine!r}")
+        if mesh not in self.MESHES:
+            raise ValueError(f"mesh debe ser uno de {self.MESHES}, no {mesh!r}")
+        if lap not in self.LAPS:
+            raise ValueError(f"lap debe ser uno de {self.LAPS}, no {lap!r}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend debe ser uno de {self.BACKENDS}, no {backend!r}")
+        if lap == "flying" and mesh == "adaptive":
+            raise ValueError('lap="flying" no está disponible con mesh="adaptive"')
         self.car = car
         self.track = track
         self.delta_s = delta_s  # Resolución espacial (m)
+        self.engine = engine
+        self._fixed_radii = radii
+        self.envelope = envelope
+        self.mesh = mesh
+        self.tolerance = tolerance
+        self.lap = lap
+        self.profiler = profiler
+        self.backend = backend if backend != "jit" or jit.HAVE_NUMBA else "python"
+        self.ds = None  # Espaciado de cada intervalo si la malla no es uniforme
 
 
     def simulate_lap(self):
-        # Discretize track into curvature radii per step
-        self.radii = self._discretize()
-        # Compute max speed due to lateral grip at each point
-        radii_arr = np.array(self.radii, dtype=float)
-        self.v_max = self._v_max()
-        # Initialize speed profile with curvature limits
-        self.v = self.v_max.copy()
-        # Start from standstill
-        self.v[0] = 0.0
-        # Forward pass: acceleration limits
-        self._forward()
-        # Backward pass: braking limits
-        self._backward()
-        # Calculate lap time using trapezoidal integration
-        return self._calculate_lap_time(), self.v
+        with self._profiled_car():
+            if self.engine == "segment":
+                return self._simulate_segments()
+            if self.mesh == "adaptive":
+                with self._phase("adaptive_mesh"):
+                    return simulate_adaptive(self)
+            self._cornering_limits()
+            return self._run_passes(self.lap)
+
+    def simulate_laps(self):
+        """
+        Simula en una sola llamada la vuelta desde parado y la vuelta lanzada.
+        La discretización y los límites en curva se calculan una sola vez; el perfil
+        que queda en el simulador (self.v) es el de la vuelta elegida en self.lap.
+        :return: Diccionario {"standing": tiempo, "flying": tiempo} (s), también en self.lap_times
+        """
+        if self.mesh == "adaptive":
+            raise ValueError('simulate_laps no está disponible con mesh="adaptive"')
+        # The selected lap goes last so that its profile is the one left behind
+        laps = sorted(self.LAPS, key=lambda lap: lap == self.lap)
+        with self._profiled_car():
+            if self.engine == "segment":
+                with self._phase("segment_tables"):
+                    solver = self._segment_solver()
+                self.lap_times = {lap: self._simulate_segments(lap, solver)[0] for lap in laps}
+            else:
+                self._cornering_limits()
+                self.lap_times = {lap: self._run_passes(lap)[0] for lap in laps}
+        return {lap: self.lap_times[lap] for lap in self.LAPS}
     
 
+    def simulate_incremental(self, params=None, names=SETUP_PARAMS, segments=None):
+        """
+        Aplica un cambio de parámetros del coche o de segmentos del circuito y re-simula
+        la vuelta recalculando solo las zonas afectadas (ver src/simulator/incremental.py).
+        El resultado es idéntico al de simulate_lap con el motor "numpy".
+        :param params: Valores de los parámetros que cambian (se aplica Car.with_params)
+        :param names: Nombres de esos parámetros, por defecto SETUP_PARAMS
+        :param segments: Diccionario {índice: (longitud, radio)} con los segmentos que cambian
+        :return: Tupla (tiempo de vuelta, v)
+        """
+        return simulate_incremental(self, params, names, segments)
+
+    def simulate_lap_with_gradient(self):
+        """
+        Simula la vuelta con el motor "numpy" y devuelve además el gradiente exacto
+        del tiempo de vuelta respecto a los parámetros de setup, con un barrido adjunto
+        (ver src/simulator/gradient.py). Cuesta del orden de dos vueltas.
+        :return: Tupla (tiempo de vuelta, v, gradiente en el orden de SETUP_PARAMS)
+        """
+        return lap_time_gradient(self)
+
+    def simulate_batch(self, params_matrix, return_speeds=False):
+        """
+        Simula N setups del coche en el circuito en una sola llamada.
+        Las pasadas hacia delante y hacia atrás recorren el circuito una vez,
+        operando en cada punto sobre los N coches a la vez (ver CarBatch).
+        Los resultados coinciden con el motor "numpy" de simulate_lap.
+        :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS (el mismo que varbound/params)
+        :param return_speeds: Si es True devuelve también los perfiles de velocidad
+            (tipo de vuelta según self.lap)
+        :return: Array (N,) de tiempos de vuelta, o tupla (tiempos, v) con v de forma (N, puntos)
+        """
+        batch = CarBatch(self.car, params_matrix)
+        with self._phase("discretize"):
+            self.radii = self._discretize_numpy()
+        # Speed arrays are (points, cars) so each track point is a contiguous row
+        with self._phase("v_max"):
+            v_max = batch.max_velocity_array(self.radii, v_limit=self.VEL_MAX_LIMIT)
+        if self.lap == "flying":
+            # The cornering limit grows with the radius, so every car shares the slowest point
+            seam = int(np.argmin(self.radii))
+            v = v_max[np.r_[seam:len(v_max), 0:seam + 1]]
+            v[0] = v[-1] = self._cap_top_speed_batch(batch, v[0])
+        else:
+            v = v_max.copy()
+            v[0] = 0.0
+
+        # Forward pass: acceleration limits for all cars at once
+        with self._phase("forward"):
+            for i in range(1, len(v)):
+                a_max = batch.max_acceleration(v[i-1])
+                np.minimum(v[i], np.sqrt(v[i-1]**2 + 2 * a_max * self.delta_s), out=v[i])
+
+        # Backward pass: braking limits for all cars at once
+        with self._phase("backward"):
+            for i in range(len(v) - 2, -1, -1):
+                decel = np.abs(batch.max_deceleration(v[i+1]))
+                np.minimum(v[i], np.sqrt(v[i+1]**2 + 2 * decel * self.delta_s), out=v[i])
+
+        # Trapezoidal lap time per car, skipping zero-speed intervals
+        with self._phase("lap_time"):
+            v_sum = v[:-1] + v[1:]
+            with np.errstate(divide='ignore'):
+                dt = np.where(v_sum > 0, 2 * self.delta_s / v_sum, 0.0)
+            lap_times = dt.sum(axis=0)
+        self._count_lap(v.size, laps=batch.size)
+
+        if return_speeds:
+            if self.lap == "flying":
+                v = np.roll(v[:-1], seam, axis=0)
+            return lap_times, v.T
+        return lap_times
+
+    @staticmethod
+    def _cap_top_speed_batch(batch, v, iterations=60):
+        # Vectorized _cap_top_speed: bisect the top speed only for cars that cannot accelerate at v
+        stuck = batch.max_acceleration(v) <= 0
+        if not stuck.any():
+            return v
+        lo, hi = np.zeros_like(v), v.copy()
+        for _ in range(iterations):
+            mid = 0.5 * (lo + hi)
+            faster = batch.max_acceleration(mid) > 0
+            lo = np.where(faster, mid, lo)
+            hi = np.where(faster, hi, mid)
+        return np.where(stuck, hi, v)
+
+
     def plot_lap(self, label : str | None = None):
         """
         Plots the speed profile of the lap.
         """
+        import matplotlib.pyplot as plt  # Solo al dibujar: importar matplotlib cuesta más que una vuelta
+
         _, v = self.simulate_lap()
 
         if label is None:
@@ -53,22 +283,114 @@ class LapSimulator:
 
     
 
+    def _phase(self, name):
+        # Timed block when profiling, shared no-op context otherwise
+        if self.profiler is None:
+            return _NO_PHASE
+        return self.profiler.phase(name)
+
+    def _profiled_car(self):
+        # Share the profiler with the simulated car for the duration of one simulation
+        if self.profiler is None or not isinstance(self.car, Car):
+            return _NO_PHASE
+        return _lend_profiler(self.car, self.profiler)
+
+    def _count_lap(self, points, laps=1):
+        if self.profiler is not None:
+            self.profiler.add("laps", laps)
+            self.profiler.add("points", points)
+
+    def _cornering_limits(self):
+        # Discretize the track and compute the cornering limit at every point
+        self.ds = None
+        if self.engine == "numpy":
+            # Discretize and solve cornering limits for all points at once
+            with self._phase("discretize"):
+                self.radii = self._discretize_numpy()
+            with self._phase("v_max"):
+                self.v_max = self._v_max_numpy()
+        else:
+            # Discretize track into curvature radii per step
+            with self._phase("discretize"):
+                self.radii = self._discretize()
+            # Compute max speed due to lateral grip at each point
+            with self._phase("v_max"):
+                self.v_max = self._v_max()
+
+    def _run_passes(self, lap):
+        # Forward/backward passes over self.v_max for a standing or a flying lap
+        if lap == "flying":
+            # Closed lap starting and ending at the seam (see _seam)
+            order, self.v = self._seam()
+        else:
+            # Initialize speed profile with curvature limits and start from standstill
+            self.v = self.v_max.copy()
+            self.v[0] = 0.0
+        # Forward pass: acceleration limits
+        with self._phase("forward"):
+            self._forward()
+        # Backward pass: braking limits
+        with self._phase("backward"):
+            self._backward()
+        # Calculate lap time using trapezoidal integration
+        with self._phase("lap_time"):
+            if self.engine == "numpy":
+                lap_time = self._calculate_lap_time_numpy()
+            else:
+                lap_time = self._calculate_lap_time()
+        self._count_lap(len(self.v))
+        if lap == "flying":
+            # Back to track order, dropping the repeated seam point
+            self.v = np.roll(self.v[:-1], order[0])
+        return lap_time, self.v
+
+    def _seam(self):
+        """
+        Corta la vuelta periódica por su punto más lento. Ahí la vuelta lanzada va a su
+        límite en curva (o a la velocidad punta), de modo que la vuelta rotada empieza y
+        acaba a esa velocidad y se resuelve con una sola pasada en cada sentido.
+        :return: Tupla (índices de la vuelta rotada, con el punto de corte repetido al final;
+            límites en curva en ese orden, con la velocidad fijada en el punto de corte)
+        """
+        v_max = np.asarray(self.v_max, dtype=float)
+        seam = int(np.argmin(v_max))
+        order = np.r_[seam:len(v_max), 0:seam + 1]
+        v_closed = v_max[order]
+        model = self._car_model()
+        max_acceleration = model.max_acceleration if model is self.car else model.acceleration_at
+        v_closed[0] = v_closed[-1] = _cap_top_speed(max_acceleration, v_closed[0])
+        return order, v_closed
+
+    def _car_model(self):
+        # Model used by the passes: the car itself or its precomputed envelope
+        if not self.envelope:
+            return self.car
+        if self.envelope is True:
+            return self.car.envelope()
+        return self.car.envelope(resolution=self.envelope)
+
     def _v_max(self):
         # Compute max speed at each point considering downforce (aero)
         v_max = np.zeros(len(self.radii))
         v_guess = 0.0  # Initial guess for the first point
-        VEL_MAX_LIMIT = 200.0  # Límite superior  para velocidad máxima (evitar NaN o inf)
+        VEL_MAX_LIMIT = self.VEL_MAX_LIMIT
+        model = self._car_model()
+        profiler = self.profiler
         for i, radius in enumerate(self.radii):
             # Use previous step's v_max as initial guess for smoother convergence
             if i > 0:
                 v_guess = v_max[i-1]
-            for _ in range(10):
-                v_new = self.car.max_velocity(radius, v_guess)
+            converged = False
+            for iteration in range(10):
+                v_new = model.max_velocity(radius, v_guess)
                 if not np.isfinite(v_new):
                     v_new = VEL_MAX_LIMIT
                 if abs(v_new - v_guess) < 1e-3:
+                    converged = True
                     break
                 v_guess = v_new
+            if profiler is not None:
+                profiler.iterations("v_max", iteration + 1, converged)
             # Si la velocidad sigue siendo infinita o NaN, la limitamos
             if not np.isfinite(v_guess):
                 v_guess = VEL_MAX_LIMIT
@@ -77,35 +399,99 @@ class LapSimulator:
 
     def _forward(self):
         # Ensure acceleration does not exceed engine and grip limits
+        model = self._car_model()
+        if self.backend == "jit" and model is self.car:
+            jit.forward_pass(self.v, np.asarray(self._steps(), dtype=float), jit.car_model(self.car))
+            return
+        max_acceleration = model.max_acceleration if model is self.car else model.acceleration_at
+        ds = self._steps()
         for i in range(1, len(self.v)):
-            a_max = self.car.max_acceleration(self.v[i-1])
-            v_allowed = np.sqrt(self.v[i-1]**2 + 2 * a_max * self.delta_s)
+            a_max = max_acceleration(self.v[i-1])
+            v_allowed = np.sqrt(self.v[i-1]**2 + 2 * a_max * ds[i-1])
             if v_allowed < self.v[i]:
                 self.v[i] = v_allowed
 
     def _backward(self):
         # Ensure deceleration does not exceed braking and grip limits
+        model = self._car_model()
+        if self.backend == "jit" and model is self.car:
+            jit.backward_pass(self.v, np.asarray(self._steps(), dtype=float), jit.car_model(self.car))
+            return
+        max_deceleration = model.max_deceleration if model is self.car else model.deceleration_at
+        ds = self._steps()
         for i in range(len(self.v) - 2, -1, -1):
-            decel = abs(self.car.max_deceleration(self.v[i+1]))
-            v_allowed = np.sqrt(self.v[i+1]**2 + 2 * decel * self.delta_s)
+            decel = abs(max_deceleration(self.v[i+1]))
+            v_allowed = np.sqrt(self.v[i+1]**2 + 2 * decel * ds[i])
             if v_allowed < self.v[i]:
                 self.v[i] = v_allowed
 
     def _calculate_lap_time(self):
         # Compute total lap time via trapezoidal rule
         time = 0.0
+        ds = self._steps()
         for i in range(len(self.v) - 1):
             v1, v2 = self.v[i], self.v[i+1]
             if v1 + v2 > 0:
-                time += 2 * self.delta_s / (v1 + v2)
+                time += 2 * ds[i] / (v1 + v2)
         return time
 
+    def _steps(self):
+        # Length of each interval: delta_s, or the spacing of a non-uniform mesh
+        if self.ds is not None:
+            return self.ds
+        return [self.delta_s] * (len(self.v) - 1)
+
     def _discretize(self):
-        # Create list of curvature radii for each spatial step
-        radii = []
-        for length, radius in self.track.segments:
-            # Number of steps in this segment
-            steps = int(np.ceil(length / self.delta_s))
-            radii.extend([radius] * steps)
-        return radii
+        # Curvature radius of each spatial step as Python floats, from the same memoized
+        # discretization as _discretize_numpy (ceil(length / delta_s) steps per segment)
+        if self._fixed_radii is not None:
+            return self._fixed_radii
+        return discretize(self.track, self.delta_s, as_list=True)
+
+    def _discretize_numpy(self):
+        # Discretization built with np.repeat and memoized per (track, delta_s)
+        if self._fixed_radii is not None:
+            return np.asarray(self._fixed_radii, dtype=float)
+        return discretize(self.track, self.delta_s)
+
+    def _v_max_numpy(self):
+        # Closed-form cornering limit for every point (see Car.max_velocity_array)
+        return self.car.max_velocity_array(self.radii, v_limit=self.VEL_MAX_LIMIT)
+
+    def _calculate_lap_time_numpy(self):
+        # Trapezoidal rule as a single reduction, skipping zero-speed intervals
+        v_sum = self.v[:-1] + self.v[1:]
+        ds = self.delta_s if self.ds is None else self.ds[v_sum > 0]
+        v_sum = v_sum[v_sum > 0]
+        return float(np.sum(2 * ds / v_sum))
+
+    def _segment_solver(self):
+        # Speed-space tables of the car up to the fastest cornering limit (see SegmentSolver)
+        lengths, seg_radii = np.array(self.track.segments, dtype=float).reshape(-1, 2).T
+        limits = self.car.max_velocity_array(seg_radii, v_limit=self.VEL_MAX_LIMIT)
+        v_top = max(self.VEL_MAX_LIMIT, float(np.max(limits, initial=0.0)))
+        return SegmentSolver(self.car, v_top, resolution=self.SEGMENT_RESOLUTION)
+
+    def _simulate_segments(self, lap=None, solver=None):
+        # Event-based solution per constant-radius segment (see SegmentSolver)
+        lengths, seg_radii = np.array(self.track.segments, dtype=float).reshape(-1, 2).T
+        limits = self.car.max_velocity_array(seg_radii, v_limit=self.VEL_MAX_LIMIT)
+        if solver is None:
+            with self._phase("segment_tables"):
+                solver = self._segment_solver()
+        periodic = (lap or self.lap) == "flying"
+        with self._phase("segment_solve"):
+            lap_time, v_in, v_out = solver.solve(lengths, limits, periodic=periodic)
+        self.segment_speeds = (v_in, v_out)
 
+        # Sample the profile at the same points as the discrete engines
+        with self._phase("segment_profile"):
+            self.radii = self._discretize_numpy()
+            steps = np.ceil(lengths / self.delta_s).astype(int)
+            starts = np.cumsum(lengths) - lengths
+            local = np.arange(len(self.radii)) - np.repeat(np.cumsum(steps) - steps, steps)
+            s = np.repeat(starts, steps) + local * self.delta_s
+            self.v_max = self._v_max_numpy()
+            self.v = solver.profile(lengths, limits, v_in, v_out, s)
+        self._count_lap(len(self.v))
+        return lap_time, self.v
@@ -0,0 +1,87 @@
+"""
+Simulación de un lote de setups en varios circuitos a la vez.
+
+simulate_batch recorre cada circuito con un bucle de Python por punto que opera sobre
+los N coches. Con T circuitos ese bucle se repetiría T veces, pero las pasadas de los
+circuitos son independientes: aquí se apilan en columnas (T * N) y se recorren todas
+en un solo bucle de max(P_k) puntos. Los circuitos más cortos se rellenan al final con
+velocidad infinita, que no limita ni la pasada hacia delante (está después de la meta)
+ni la pasada hacia atrás (sqrt(inf) = inf), así que cada columna da exactamente el
+mismo resultado que simulate_batch sobre su circuito.
+
+La parte que depende solo del coche (coeficientes aerodinámicos de CarBatch y límites
+en curva de todos los circuitos, concatenados) se calcula una sola vez por lote.
+"""
+import numpy as np
+
+from ..models.car_batch import CarBatch
+from .lap_simulator import LapSimulator
+
+
+def simulate_tracks(car, radii_list, params_matrix, delta_s=1.0, lap="standing", v_limit=200.0,
+                    return_speeds=False):
+    """
+    Simula N setups del coche en T circuitos ya discretizados.
+    :param car: Coche plantilla (Instancia de Car con los ángulos de ataque definidos)
+    :param radii_list: Lista de T arrays de radios discretizados con delta_s
+    :param params_matrix: Array (N, n_params) en el orden de SETUP_PARAMS
+    :param delta_s: Resolución espacial (m)
+    :param lap: "standing" (desde parado) o "flying" (lanzada)
+    :param v_limit: Velocidad usada donde no existe límite por agarre (LapSimulator.VEL_MAX_LIMIT)
+    :param return_speeds: Si es True devuelve también el perfil de velocidad de cada circuito
+    :return: Array (N, T) de tiempos de vuelta, o tupla (tiempos, lista de T arrays (N, P_k))
+    """
+    params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+    radii_list = [np.asarray(radii, dtype=float) for radii in radii_list]
+    n_cars, n_tracks = len(params_matrix), len(radii_list)
+
+    # Límites en curva de todos los circuitos con un solo CarBatch
+    batch = CarBatch(car, params_matrix)
+    v_max_all = batch.max_velocity_array(np.concatenate(radii_list), v_limit=v_limit)
+    bounds = np.cumsum([0] + [len(radii) for radii in radii_list])
+
+    # Vuelta de cada circuito: desde parado, o rotada y cerrada por su punto más lento
+    seams = [int(np.argmin(radii)) for radii in radii_list]
+    lengths = [len(radii) + (lap == "flying") for radii in radii_list]
+    v = np.full((max(lengths), n_tracks, n_cars), np.inf)
+    for k, radii in enumerate(radii_list):
+        v_max = v_max_all[bounds[k]:bounds[k + 1]]
+        if lap == "flying":
+            v_max = v_max[np.r_[seams[k]:len(radii), 0:seams[k] + 1]]
+        v[:lengths[k], k] = v_max
+    v = v.reshape(len(v), n_tracks * n_cars)  # Columna k * N + n: circuito k, coche n
+
+    # Mismos coches repetidos para cada circuito
+    tiled = CarBatch(car, np.tile(params_matrix, (n_tracks, 1)))
+    if lap == "flying":
+        v[0] = LapSimulator._cap_top_speed_batch(tiled, v[0])
+        for k in range(n_tracks):
+            v[lengths[k] - 1, k * n_cars:(k + 1) * n_cars] = v[0, k * n_cars:(k + 1) * n_cars]
+    else:
+        v[0] = 0.0
+    padding = np.arange(len(v))[:, None] >= np.repeat(lengths, n_cars)[None, :]
+
+    # Forward pass: todos los circuitos y coches a la vez
+    for i in range(1, len(v)):
+        a_max = tiled.max_acceleration(v[i-1])
+        np.minimum(v[i], np.sqrt(v[i-1]**2 + 2 * a_max * delta_s), out=v[i])
+
+    # Backward pass: el relleno vuelve a infinito para no frenar el final de los circuitos cortos
+    v[padding] = np.inf
+    for i in range(len(v) - 2, -1, -1):
+        decel = np.abs(tiled.max_deceleration(v[i+1]))
+        np.minimum(v[i], np.sqrt(v[i+1]**2 + 2 * decel * delta_s), out=v[i])
+
+    lap_times = np.empty((n_cars, n_tracks))
+    speeds = []
+    for k in range(n_tracks):
+        v_k = v[:lengths[k], k * n_cars:(k + 1) * n_cars]
+        v_sum = v_k[:-1] + v_k[1:]
+        with np.errstate(divide='ignore'):
+            dt = np.where(v_sum > 0, 2 * delta_s / v_sum, 0.0)
+        lap_times[:, k] = dt.sum(axis=0)
+        if return_speeds:
+            if lap == "flying":
+                v_k = np.roll(v_k[:-1], seams[k], axis=0)
+            speeds.append(v_k.T.copy())
+    return (lap_times, speeds) if return_speeds else lap_times
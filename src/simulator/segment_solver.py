@@ -0,0 +1,187 @@
+"""
+Resolución analítica de la vuelta por segmentos (motor "segment" de LapSimulator).
+
+En cada segmento de radio constante el límite en curva es constante y las curvas de
+aceleración y frenada solo dependen de la velocidad. Se integran una vez, en el espacio
+de velocidades (con a(u) lineal por celdas), las distancias y tiempos necesarios para acelerar/frenar entre 0 y v:
+    S_acc(v) = int_0^v u / a(u) du       T_acc(v) = int_0^v 1 / a(u) du
+    S_brk(v) = int_0^v u / d(u) du       T_brk(v) = int_0^v 1 / d(u) du
+y la vuelta se resuelve segmento a segmento:
+- pasada hacia delante: velocidad de salida de cada segmento acelerando desde la de entrada;
+- pasada hacia atrás: velocidad de entrada máxima para poder frenar hasta la del siguiente;
+- en cada segmento el perfil es acelerar, mantener el límite y frenar; si no se llega al
+  límite, el punto de frenada se obtiene resolviendo S_acc(v) + S_brk(v) = cte.
+El coste depende del número de segmentos y de la resolución de las tablas en velocidad,
+no de la longitud del circuito ni de delta_s.
+"""
+import numpy as np
+
+from ..models.car_batch import CarBatch
+
+
+class SegmentSolver:
+    """
+    Tablas en el espacio de velocidades de un coche y resolución de la vuelta por segmentos.
+    """
+    def __init__(self, car, v_top, resolution=0.01):
+        """
+        Integra las curvas de aceleración y frenada del coche.
+        :param car: Instancia de Car (con los ángulos de ataque definidos)
+        :param v_top: Velocidad máxima de las tablas (m/s)
+        :param resolution: Paso de la rejilla de velocidades (m/s)
+        """
+        n = int(np.ceil(v_top / resolution)) + 1
+        params = car.setup_params()
+        self.u = self._refine_top_speed(car, params, np.linspace(0.0, v_top, n))
+        # Un "lote" de coches idénticos evalúa el modelo en toda la rejilla de una vez
+        batch = CarBatch(car, np.tile(params, (len(self.u), 1)))
+        acc = batch.max_acceleration(self.u)
+        dec = np.abs(batch.max_deceleration(self.u))
+
+        self.S_acc, self.T_acc = self._integrate(acc)
+        self.S_brk, self.T_brk = self._integrate(dec)
+        # Por encima de la velocidad punta (a = 0) las tablas de aceleración son infinitas
+        self._reach = np.isfinite(self.S_acc)
+
+    @staticmethod
+    def _refine_top_speed(car, params, u):
+        """
+        Añade a la rejilla puntos que se acercan geométricamente a la velocidad punta
+        (donde la aceleración se anula). Sin ellos, en rectas largas cerca de la velocidad
+        punta se circularía al último punto de la rejilla, con un error del orden de la
+        resolución en la velocidad.
+        """
+        acc = CarBatch(car, np.tile(params, (len(u), 1))).max_acceleration(u)
+        stop = np.flatnonzero(acc <= 0)
+        if len(stop) == 0 or stop[0] == 0:
+            return u
+        j = stop[0]
+        # Bisección de la velocidad punta dentro de la celda [u[j-1], u[j]]
+        single = CarBatch(car, params[None, :])
+        lo, hi = u[j-1], u[j]
+        for _ in range(60):
+            mid = 0.5 * (lo + hi)
+            if single.max_acceleration(np.array([mid]))[0] > 0:
+                lo = mid
+            else:
+                hi = mid
+        tail = hi - (hi - u[j-1]) * 2.0 ** -np.arange(1, 31)
+        tail = tail[(tail > u[j-1]) & (tail < hi)]
+        return np.concatenate([u[:j], np.unique(tail), u[j:]])
+
+    def _integrate(self, a):
+        """
+        Integrales acumuladas S(v) = int u / a(u) du y T(v) = int 1 / a(u) du.
+        En cada celda a(u) se toma lineal y se integra de forma exacta, de modo que la
+        singularidad en la velocidad punta (a -> 0) se integra bien (término logarítmico).
+        Las celdas donde a deja de ser positiva dan S = T = inf.
+        """
+        u0, h = self.u[:-1], np.diff(self.u)
+        a0, a1 = a[:-1], a[1:]
+        valid = (a0 > 0) & (a1 > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(valid, (a1 - a0) / a0, 0.0)
+            small = np.abs(r) < 1e-4
+            log_r = np.log1p(np.where(small, 0.0, r))
+            # int_0^h dx / a  e  int_0^h x / a dx con a = a0 * (1 + r x / h)
+            I0 = np.where(small, h / a0 * (1 - r / 2 + r**2 / 3), h * log_r / (a1 - a0))
+            I1 = np.where(small, h**2 / (2 * a0) * (1 - 2 * r / 3 + r**2 / 2), h * (h - a0 * I0) / (a1 - a0))
+        T_cells = np.where(valid, I0, np.inf)
+        S_cells = np.where(valid, u0 * I0 + I1, np.inf)
+
+        S = np.zeros(len(self.u))
+        T = np.zeros(len(self.u))
+        S[1:] = np.cumsum(S_cells)
+        T[1:] = np.cumsum(T_cells)
+        return S, T
+
+    def _interp(self, x, table):
+        return np.interp(x, self.u, table)
+
+    def _accelerate(self, v0, distance):
+        # Velocidad tras acelerar distance metros desde v0
+        target = self._interp(v0, self.S_acc) + distance
+        return np.interp(target, self.S_acc[self._reach], self.u[self._reach])
+
+    def _brake_back(self, v1, distance):
+        # Velocidad máxima distance metros antes de un punto donde se debe ir a v1
+        return np.interp(self._interp(v1, self.S_brk) + distance, self.S_brk, self.u)
+
+    def solve(self, lengths, limits, periodic=False):
+        """
+        Resuelve la vuelta desde parado o, con periodic=True, la vuelta lanzada.
+        :param lengths: Array (K,) con la longitud de cada segmento (m)
+        :param limits: Array (K,) con la velocidad máxima en curva de cada segmento (m/s)
+        :param periodic: Si es True la velocidad de salida es igual a la de llegada. La vuelta
+            se corta a la entrada del segmento más lento, por donde la solución periódica
+            pasa a su límite (o a la velocidad punta), y se resuelve con una pasada en cada sentido
+        :return: Tupla (tiempo de vuelta, velocidades de entrada (K,), velocidades de salida (K,))
+        """
+        K = len(lengths)
+        lengths = np.asarray(lengths, dtype=float)
+        limits = np.asarray(limits, dtype=float)
+        seam = int(np.argmin(limits)) if periodic and K else 0
+        order = np.roll(np.arange(K), -seam)
+        v_start = min(float(limits[seam]), float(self.u[self._reach][-1])) if periodic and K else 0.0
+        v_in, v_out = self._passes(lengths[order].tolist(), limits[order].tolist(), v_start, periodic)
+
+        v_in = np.roll(np.array(v_in), seam)
+        v_out = np.roll(np.array(v_out), seam)
+        return self._segment_times(lengths, limits, v_in, v_out), v_in, v_out
+
+    def _passes(self, lengths, limits, v_start, periodic):
+        K = len(lengths)
+        # Pasada hacia delante: velocidad de entrada y salida acelerando
+        v_in = [0.0] * K
+        v_out = [0.0] * K
+        v = v_start
+        for k in range(K):
+            v = min(v, limits[k])
+            v_in[k] = v
+            v = min(float(self._accelerate(v, lengths[k])), limits[k])
+            v_out[k] = v
+
+        # Pasada hacia atrás: limitar por la frenada hasta la entrada del segmento siguiente
+        # (en la vuelta lanzada, el siguiente al último es el punto de corte)
+        b = v_start if periodic else (v_out[-1] if K else 0.0)
+        for k in range(K - 1, -1, -1):
+            v_out[k] = min(v_out[k], b)
+            v_in[k] = min(v_in[k], float(self._brake_back(v_out[k], lengths[k])))
+            b = v_in[k]
+        return v_in, v_out
+
+    def _segment_times(self, lengths, limits, v_in, v_out):
+        # Por encima de la última velocidad alcanzable se circula a velocidad punta
+        limits = np.minimum(limits, self.u[self._reach][-1])
+        # Distancias para llegar al límite acelerando desde la entrada y frenando hasta la salida
+        S_acc_in = self._interp(v_in, self.S_acc)
+        S_brk_out = self._interp(v_out, self.S_brk)
+        d_acc = self._interp(limits, self.S_acc) - S_acc_in
+        d_brk = self._interp(limits, self.S_brk) - S_brk_out
+        reaches_limit = d_acc + d_brk <= lengths
+
+        # Velocidad de pico: el límite, o el cruce de las curvas de aceleración y frenada
+        crossing = S_acc_in + S_brk_out + lengths
+        total = self.S_acc + self.S_brk
+        finite = self._reach
+        v_peak = np.where(reaches_limit, limits, np.interp(crossing, total[finite], self.u[finite]))
+        v_peak = np.maximum(v_peak, np.maximum(v_in, v_out))
+
+        t_acc = self._interp(v_peak, self.T_acc) - self._interp(v_in, self.T_acc)
+        t_brk = self._interp(v_peak, self.T_brk) - self._interp(v_out, self.T_brk)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_const = np.where(reaches_limit, (lengths - d_acc - d_brk) / limits, 0.0)
+        return float(np.sum(t_acc + t_brk + t_const))
+
+    def profile(self, lengths, limits, v_in, v_out, s):
+        """
+        Evalúa el perfil de velocidad en las posiciones s (vectorizado).
+        :param s: Array de distancias desde la salida (m)
+        :return: Array de velocidades (m/s)
+        """
+        ends = np.cumsum(lengths)
+        k = np.minimum(np.searchsorted(ends, s, side='right'), len(lengths) - 1)
+        s_local = s - (ends[k] - lengths[k])
+        v_acc = self._accelerate(v_in[k], s_local)
+        v_brk = self._brake_back(v_out[k], lengths[k] - s_local)
+        return np.minimum(np.minimum(v_acc, v_brk), limits[k])
@@ -0,0 +1,185 @@
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from ..models.car import Car, SETUP_PARAMS
+from ..models.track import Track
+
+
+class CarTemplate:
+    """
+    Plantilla inmutable de un coche ya parseado.
+    No se puede modificar; para simular se crean copias baratas con build/with_params.
+    Los atributos del coche se pueden leer directamente (template.mass, template.aero...).
+    """
+    __slots__ = ("_car",)
+
+    def __init__(self, car):
+        """
+        :param car: Instancia de Car que se congela (se guarda una copia)
+        """
+        object.__setattr__(self, "_car", car.copy())
+
+    def build(self, **overrides):
+        """
+        Crea un coche nuevo a partir de la plantilla.
+        :param overrides: Parámetros a sustituir (del coche o de car.aero, p. ej. power=5e5, aoa_front=4)
+        :return: Nueva instancia de Car
+        """
+        return self._car.with_params(overrides.values(), names=overrides.keys())
+
+    def with_params(self, values, names=SETUP_PARAMS):
+        """
+        Crea un coche nuevo con los parámetros de setup sustituidos (ver Car.with_params).
+        :param values: Valores de los parámetros
+        :param names: Nombres de los parámetros, por defecto SETUP_PARAMS
+        :return: Nueva instancia de Car
+        """
+        return self._car.with_params(values, names=names)
+
+    def __getattr__(self, name):
+        if name == "_car":
+            raise AttributeError(name)
+        if name == "aero":
+            # Copia del modelo aerodinámico para que la plantilla no se pueda mutar
+            return copy.copy(self._car.aero)
+        return getattr(self._car, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CarTemplate es inmutable; usa build() o with_params()")
+
+    def __reduce__(self):
+        return (CarTemplate, (self._car,))
+
+
+class ConfigCache:
+    """
+    Caché de configuraciones parseadas y de circuitos discretizados.
+
+    - Coches y circuitos se indexan por ruta absoluta y se validan con mtime/tamaño del
+      archivo; si cambian se vuelve a leer y solo se re-parsea si cambia el hash del contenido.
+    - Los radios discretizados se memorizan por (segmentos del circuito, delta_s) con
+      expulsión LRU acotada a max_radii entradas. Los arrays devueltos son de solo lectura
+      (o tuplas de floats con as_list, para el motor "python").
+    """
+    def __init__(self, max_radii=32):
+        """
+        :param max_radii: Número máximo de discretizaciones guardadas
+        """
+        self.max_radii = max_radii
+        self._files = {}  # ruta -> (mtime_ns, tamaño, hash, objeto)
+        self._radii = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, file_path, parse):
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        entry = self._files.get(path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            self.hits += 1
+            return entry[3]
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if entry is not None and entry[2] == digest:
+            # El archivo se ha tocado pero el contenido es el mismo
+            self.hits += 1
+            obj = entry[3]
+        else:
+            self.misses += 1
+            obj = parse(json.loads(content))
+        self._files[path] = (stat.st_mtime_ns, stat.st_size, digest, obj)
+        return obj
+
+    def car(self, file_path):
+        """
+        Devuelve la plantilla inmutable del coche de un archivo JSON.
+        :param file_path: Ruta al archivo JSON del coche
+        :return: Instancia de CarTemplate
+        """
+        return self._load(file_path, lambda data: CarTemplate(Car.from_dict(data)))
+
+    def track(self, file_path):
+        """
+        Devuelve el circuito de un archivo JSON. Los segmentos de Track ya son inmutables
+        y los sentidos de giro se guardan en una tupla, para que el objeto compartido no se
+        pueda modificar.
+        :param file_path: Ruta al archivo JSON del circuito
+        :return: Instancia de Track
+        """
+        def parse(data):
+            track = Track.from_dict(data)
+            return Track(track.segments, track.directions and tuple(track.directions))
+        return self._load(file_path, parse)
+
+    def radii(self, track, delta_s, as_list=False):
+        """
+        Devuelve los radios discretizados de un circuito (ceil(longitud / delta_s) pasos por segmento).
+        :param track: Instancia de Track
+        :param delta_s: Resolución espacial (m)
+        :param as_list: Si es True devuelve una tupla de floats de Python (para los bucles del
+            motor "python", que iteran más rápido sobre floats que sobre un array)
+        :return: Array de solo lectura con el radio en cada punto, o tupla con as_list
+        """
+        key = (track.segments, float(delta_s), as_list)  # Segments guarda su hash: la clave no se reconstruye
+        radii = self._radii.get(key)
+        if radii is not None:
+            self.hits += 1
+            self._radii.move_to_end(key)
+            return radii
+
+        if as_list:
+            radii = tuple(self.radii(track, delta_s).tolist())
+        elif track.segments:
+            self.misses += 1
+            lengths, seg_radii = np.array(track.segments, dtype=float).T
+            steps = np.ceil(lengths / delta_s).astype(int)
+            radii = np.repeat(seg_radii, steps)
+        else:
+            self.misses += 1
+            radii = np.zeros(0)
+        if not as_list:
+            radii.flags.writeable = False
+
+        self._radii[key] = radii
+        while len(self._radii) > self.max_radii:
+            self._radii.popitem(last=False)
+        return radii
+
+    def clear(self):
+        """
+        Vacía la caché.
+        """
+        self._files.clear()
+        self._radii.clear()
+
+
+# Caché compartida por defecto del proceso
+default_cache = ConfigCache()
+
+
+def load_car(file_path):
+    """
+    Devuelve la plantilla de coche de la caché por defecto (ver ConfigCache.car).
+    """
+    return default_cache.car(file_path)
+
+
+def load_track(file_path):
+    """
+    Devuelve el circuito de la caché por defecto (ver ConfigCache.track).
+    """
+    return default_cache.track(file_path)
+
+
+def discretize(track, delta_s, as_list=False):
+    """
+    Devuelve los radios discretizados de la caché por defecto (ver ConfigCache.radii).
+    """
+    return default_cache.radii(track, delta_s, as_list)
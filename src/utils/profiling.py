@@ -0,0 +1,159 @@
+"""
+Instrumentación opcional de LapSimulator y Car.
+
+Un Profiler acumula, a lo largo de muchas vueltas:
+- tiempo de reloj y número de llamadas de cada fase (discretize, v_max, forward...);
+- contadores (vueltas, puntos simulados, llamadas al modelo del coche, puntos sin converger);
+- histogramas del número de iteraciones de las iteraciones de punto fijo.
+Desactivado (profiler=None, el valor por defecto) no se registra nada: cada punto de
+instrumentación es una sola comprobación de None fuera de los bucles internos.
+
+Los perfiladores de varios procesos se combinan con merge (o +=) a partir de
+to_dict/from_dict, y se exportan con to_json/to_csv.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Acumulador de tiempos por fase, contadores e histogramas de iteraciones.
+    """
+    def __init__(self):
+        self.phases = {}  # fase -> [segundos, llamadas]
+        self.counters = {}  # nombre -> valor
+        self.histograms = {}  # nombre -> {iteraciones: número de casos}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Mide el tiempo de reloj de un bloque y lo acumula en la fase name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+
+    def add(self, name, value=1):
+        """
+        Suma value al contador name.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def iterations(self, name, count, converged=True):
+        """
+        Registra una llamada a una iteración de punto fijo: cuenta la llamada
+        ("calls.<name>"), el número de iteraciones ("iterations.<name>") y, si no ha
+        convergido, el punto sin converger ("nonconverged.<name>").
+        :param name: Nombre de la iteración (p. ej. "max_deceleration")
+        :param count: Iteraciones realizadas
+        :param converged: Si se alcanzó el criterio de parada
+        """
+        self.add("calls." + name)
+        histogram = self.histograms.setdefault("iterations." + name, {})
+        histogram[count] = histogram.get(count, 0) + 1
+        if not converged:
+            self.add("nonconverged." + name)
+
+    def merge(self, other):
+        """
+        Acumula en este perfilador los datos de otro (o de su diccionario to_dict).
+        :return: self
+        """
+        if isinstance(other, dict):
+            other = Profiler.from_dict(other)
+        for name, (seconds, calls) in other.phases.items():
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+        for name, value in other.counters.items():
+            self.add(name, value)
+        for name, histogram in other.histograms.items():
+            target = self.histograms.setdefault(name, {})
+            for count, cases in histogram.items():
+                target[count] = target.get(count, 0) + cases
+        return self
+
+    __iadd__ = merge
+
+    def reset(self):
+        """
+        Borra todos los datos acumulados.
+        """
+        self.phases.clear()
+        self.counters.clear()
+        self.histograms.clear()
+
+    def to_dict(self):
+        """
+        Datos acumulados en un diccionario serializable (JSON o pickle).
+        """
+        return {
+            'phases': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+            'counters': dict(self.counters),
+            'histograms': {name: {str(k): v for k, v in sorted(h.items())} for name, h in self.histograms.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crea un perfilador a partir de un diccionario de to_dict.
+        """
+        profiler = cls()
+        for name, entry in data.get('phases', {}).items():
+            profiler.phases[name] = [entry['seconds'], entry['calls']]
+        profiler.counters.update(data.get('counters', {}))
+        for name, histogram in data.get('histograms', {}).items():
+            profiler.histograms[name] = {int(k): v for k, v in histogram.items()}
+        return profiler
+
+    def to_json(self, file_path):
+        """
+        Exporta los datos acumulados a un archivo JSON.
+        """
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def rows(self):
+        """
+        Datos acumulados en formato tabular: tuplas (tipo, nombre, clave, valor).
+        """
+        rows = []
+        for name, (seconds, calls) in self.phases.items():
+            rows.append(("phase", name, "seconds", seconds))
+            rows.append(("phase", name, "calls", calls))
+        for name, value in self.counters.items():
+            rows.append(("counter", name, "value", value))
+        for name, histogram in self.histograms.items():
+            for count, cases in sorted(histogram.items()):
+                rows.append(("histogram", name, count, cases))
+        return rows
+
+    def to_csv(self, file_path):
+        """
+        Exporta los datos acumulados a un CSV con columnas kind, name, key, value.
+        """
+        with open(file_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("kind", "name", "key", "value"))
+            writer.writerows(self.rows())
+
+    def report(self):
+        """
+        Resumen legible de los datos acumulados.
+        """
+        lines = []
+        total = sum(seconds for seconds, _ in self.phases.values()) or 1.0
+        for name, (seconds, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<20} {seconds * 1e3:10.2f} ms {seconds / total:7.1%} {calls:8d} llamadas")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<32} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            bins = ", ".join(f"{count}: {cases}" for count, cases in sorted(histogram.items()))
+            lines.append(f"{name:<32} {{{bins}}}")
+        return "\n".join(lines)
@@ -0,0 +1,248 @@
+"""
+Almacén columnar de resultados en disco (parámetros, tiempos de vuelta, perfiles de velocidad).
+
+Cada columna se guarda por bloques de chunk_rows filas en archivos .npy independientes
+(<columna>.<bloque>.npy), de forma que:
+- añadir filas escribe directamente en los archivos mapeados en memoria, sin acumular
+  listas de resultados en RAM;
+- la lectura se hace con np.load(mmap_mode='r'): los bloques se recorren sin copiarlos y
+  una consulta solo lee las columnas que necesita (p. ej. los tiempos de vuelta, no los
+  perfiles de velocidad).
+El número de filas válidas se guarda en meta.json, que se reescribe de forma atómica en
+cada flush: las filas añadidas después del último flush se descartan si el proceso muere.
+
+Uso:
+    store = ResultsStore("resultados", columns={
+        'params': ((10,), 'float64'), 'lap_time': ((), 'float64'), 'v': ((5250,), 'float32'),
+    }, labels={'params': SETUP_PARAMS})
+    store.append(params=population, lap_time=lap_times, v=speeds)
+    store.flush()
+    rows, values = store.best(10)
+    rows = store.filter(power=(4e5, 5e5), lap_time=(None, 100))
+    data = store.get(rows, ['params', 'v'])
+"""
+import json
+import os
+
+import numpy as np
+
+
+class ResultsStore:
+    """
+    Almacén de resultados por columnas y bloques, con lectura mapeada en memoria.
+    """
+    def __init__(self, path, columns=None, labels=None, chunk_rows=4096):
+        """
+        Abre el almacén de path, o lo crea si no existe.
+        :param path: Directorio del almacén
+        :param columns: Diccionario nombre -> (forma de cada fila, dtype). Obligatorio al crear;
+            si el almacén ya existe debe coincidir con el guardado (o ser None)
+        :param labels: Nombres de las componentes de columnas vectoriales, para filtrar por
+            ellas (p. ej. {'params': SETUP_PARAMS})
+        :param chunk_rows: Filas por bloque
+        """
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if columns is not None and _normalize(columns) != meta['columns']:
+                raise ValueError(f"{path} ya contiene un almacén con otras columnas")
+        else:
+            if columns is None:
+                raise ValueError(f"{path} no contiene un almacén y no se han dado columnas")
+            os.makedirs(path, exist_ok=True)
+            meta = {'columns': _normalize(columns), 'labels': {}, 'chunk_rows': chunk_rows, 'rows': 0}
+        if labels:
+            meta['labels'].update({name: list(values) for name, values in labels.items()})
+        self._meta = meta
+        self.columns = {name: (tuple(spec['shape']), np.dtype(spec['dtype'])) for name, spec in meta['columns'].items()}
+        self.labels = meta['labels']
+        self.chunk_rows = meta['chunk_rows']
+        self._rows = meta['rows']
+        self._writers = {}  # columna -> (bloque, memmap escribible)
+        if not os.path.exists(meta_path):
+            self.flush()
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, **values):
+        """
+        Añade filas al final del almacén. Hay que dar todas las columnas, con el mismo
+        número de filas. Los datos son visibles para la lectura en el acto, pero solo
+        quedan confirmados en disco tras flush() (o close()).
+        :param values: Arrays (N, *forma de la columna) por columna
+        """
+        if set(values) != set(self.columns):
+            raise ValueError(f"append necesita las columnas {sorted(self.columns)}")
+        arrays = {}
+        for name, (shape, dtype) in self.columns.items():
+            array = np.asarray(values[name], dtype=dtype)
+            arrays[name] = array.reshape((-1,) + shape)
+        n = {len(array) for array in arrays.values()}
+        if len(n) != 1:
+            raise ValueError("Todas las columnas deben tener el mismo número de filas")
+        n = n.pop()
+
+        written = 0
+        while written < n:
+            chunk, offset = divmod(self._rows + written, self.chunk_rows)
+            count = min(n - written, self.chunk_rows - offset)
+            for name, array in arrays.items():
+                self._writer(name, chunk)[offset:offset + count] = array[written:written + count]
+            written += count
+        self._rows += n
+
+    def flush(self):
+        """
+        Vuelca los bloques abiertos a disco y confirma las filas añadidas en meta.json.
+        """
+        for _, memmap in self._writers.values():
+            memmap.flush()
+        self._meta['rows'] = self._rows
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", 'w') as f:
+            json.dump(self._meta, f, indent=2)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def close(self):
+        """
+        Confirma las filas añadidas y libera los bloques abiertos para escritura.
+        """
+        self.flush()
+        self._writers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _file(self, name, chunk):
+        return os.path.join(self.path, f"{name}.{chunk:06d}.npy")
+
+    def _writer(self, name, chunk):
+        current = self._writers.get(name)
+        if current is not None and current[0] == chunk:
+            return current[1]
+        if current is not None:
+            current[1].flush()
+        shape, dtype = self.columns[name]
+        file_path = self._file(name, chunk)
+        if os.path.exists(file_path):
+            memmap = np.load(file_path, mmap_mode='r+')
+        else:
+            memmap = np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=(self.chunk_rows,) + shape)
+        self._writers[name] = (chunk, memmap)
+        return memmap
+
+    def chunks(self, name):
+        """
+        Recorre una columna bloque a bloque sin copiarla.
+        :return: Generador de tuplas (primera fila del bloque, vista de solo lectura del bloque)
+        """
+        for chunk in range(-(-self._rows // self.chunk_rows)):
+            start = chunk * self.chunk_rows
+            data = np.load(self._file(name, chunk), mmap_mode='r')
+            yield start, data[:min(self.chunk_rows, self._rows - start)]
+
+    def column(self, name, rows=None):
+        """
+        Lee una columna entera (en memoria) o solo algunas filas.
+        Para columnas grandes (perfiles de velocidad) es preferible chunks() o get() con filas.
+        :param name: Nombre de la columna
+        :param rows: Índices de fila (None: todas)
+        :return: Array (N, *forma de la columna)
+        """
+        shape, dtype = self.columns[name]
+        if rows is None:
+            parts = [data for _, data in self.chunks(name)]
+            return np.concatenate(parts) if parts else np.zeros((0,) + shape, dtype=dtype)
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size and (rows.min() < 0 or rows.max() >= self._rows):
+            raise IndexError("Fila fuera del almacén")
+        out = np.empty((len(rows),) + shape, dtype=dtype)
+        chunk_of = rows // self.chunk_rows
+        for chunk in np.unique(chunk_of):
+            data = np.load(self._file(name, chunk), mmap_mode='r')
+            selected = np.flatnonzero(chunk_of == chunk)
+            out[selected] = data[rows[selected] - chunk * self.chunk_rows]
+        return out
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def get(self, rows, columns=None):
+        """
+        Lee algunas filas de varias columnas.
+        :param rows: Índices de fila
+        :param columns: Nombres de las columnas (None: todas)
+        :return: Diccionario columna -> array
+        """
+        return {name: self.column(name, rows) for name in (columns or self.columns)}
+
+    def _values(self, name, data):
+        # Valores escalares por fila de una columna o de una componente etiquetada
+        if name in self.columns:
+            return data.reshape(len(data), -1).sum(axis=1) if data.ndim > 1 else data
+        return data[:, self.labels[self._source(name)].index(name)]
+
+    def _source(self, name):
+        if name in self.columns:
+            return name
+        for column, labels in self.labels.items():
+            if name in labels:
+                return column
+        raise KeyError(f"No hay ninguna columna ni componente llamada {name}")
+
+    def best(self, n=10, by="lap_time"):
+        """
+        Las n filas con menor valor de by, leyendo solo esa columna bloque a bloque.
+        Si la columna es vectorial (p. ej. tiempos en varios circuitos) se usa la suma.
+        Las filas con NaN se ignoran.
+        :param n: Número de filas
+        :param by: Columna o componente etiquetada por la que se ordena
+        :return: Tupla (índices de fila, valores), de menor a mayor
+        """
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_values = np.zeros(0)
+        for start, data in self.chunks(self._source(by)):
+            values = self._values(by, data)
+            valid = np.flatnonzero(~np.isnan(values))
+            rows = np.concatenate([best_rows, start + valid])
+            values = np.concatenate([best_values, values[valid]])
+            if len(values) > n:
+                keep = np.argpartition(values, n)[:n]
+                rows, values = rows[keep], values[keep]
+            best_rows, best_values = rows, values
+        order = np.argsort(best_values, kind='stable')
+        return best_rows[order], best_values[order]
+
+    def filter(self, **ranges):
+        """
+        Filas cuyos valores caen en los rangos dados, leyendo solo las columnas implicadas.
+        :param ranges: nombre=(mínimo, máximo) por columna o componente etiquetada
+            (p. ej. power=(4e5, 5e5), lap_time=(None, 100)); None deja el extremo abierto
+        :return: Array de índices de fila
+        """
+        sources = {name: self._source(name) for name in ranges}
+        readers = {column: self.chunks(column) for column in set(sources.values())}
+        matches = []
+        for chunk in range(-(-self._rows // self.chunk_rows)):
+            data = {column: next(reader)[1] for column, reader in readers.items()}
+            mask = np.ones(min(self.chunk_rows, self._rows - chunk * self.chunk_rows), dtype=bool)
+            for name, (lo, hi) in ranges.items():
+                values = self._values(name, data[sources[name]])
+                if lo is not None:
+                    mask &= values >= lo
+                if hi is not None:
+                    mask &= values <= hi
+            matches.append(chunk * self.chunk_rows + np.flatnonzero(mask))
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+
+
+def _normalize(columns):
+    # Formato serializable de la definición de columnas
+    return {name: {'shape': [int(n) for n in np.atleast_1d(shape)] if shape != () else [], 'dtype': np.dtype(dtype).str}
+            for name, (shape, dtype) in columns.items()}
@@ -0,0 +1,42 @@
+"""
+Ejecuta un barrido de parámetros descrito en un archivo JSON (ver src/optimization/sweep.py).
+
+Uso:
+    python sweep.py sweep.json                          # resultados en sweep_results/
+    python sweep.py sweep.json --output estudio_masa --workers 4
+Si el barrido se interrumpe, al relanzar el mismo comando continúa donde se quedó.
+"""
+import argparse
+import os
+import sys
+
+from src.models.car import SETUP_PARAMS
+from src.optimization.sweep import Sweep, load_spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de parámetros del coche con checkpoint")
+    parser.add_argument("spec", help="archivo JSON con la especificación del barrido")
+    parser.add_argument("--output", help="directorio de resultados (por defecto <spec>_results)")
+    parser.add_argument("--workers", type=int, help="procesos por circuito (por defecto todos los núcleos)")
+    parser.add_argument("--best", type=int, default=5, help="número de mejores setups que se muestran al terminar")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.spec)[0] + "_results"
+    sweep = Sweep(load_spec(args.spec))
+    print(f"Barrido {sweep.spec['method']}: {sweep.size} muestras en {sweep.n_chunks} bloques "
+          f"sobre {len(sweep.tracks)} circuito(s) -> {output}")
+    store = sweep.run(output, workers=args.workers)
+
+    # Consulta sobre el almacén en disco: solo se leen los tiempos y las filas elegidas
+    rows, totals = store.best(args.best)
+    params = store.column('params', rows)
+    print(f"\nMejores {args.best} setups (tiempo total en todos los circuitos):")
+    for total, x in zip(totals, params):
+        values = ", ".join(f"{name}={value:.4g}" for name, value in zip(SETUP_PARAMS, x))
+        print(f"{total:.3f} s  {values}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
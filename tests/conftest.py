@@ -0,0 +1,38 @@
+"""
+Datos comunes de los tests: el coche de car.json (con ángulo de ataque, que el json no
+define), el circuito de track.json y setups aleatorios dentro de SETUP_BOUNDS.
+
+Ejecutar desde la raíz del repositorio:
+    python -m pytest -q
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # Los tests importan src igual que los scripts de la raíz
+
+from src.models.car import SETUP_BOUNDS  # noqa: E402
+from src.utils.cache import load_car, load_track  # noqa: E402
+
+AOA = 4  # Mismo ángulo de ataque que benchmarks/run_benchmarks.py
+
+
+@pytest.fixture(scope="session")
+def car():
+    return load_car(os.path.join(ROOT, "car.json")).build(aoa_front=AOA, aoa_rear=AOA)
+
+
+@pytest.fixture(scope="session")
+def track():
+    return load_track(os.path.join(ROOT, "track.json"))
+
+
+@pytest.fixture(scope="session")
+def setups():
+    # Cuatro setups aleatorios (deterministas) en el orden de SETUP_PARAMS
+    bounds = np.array(SETUP_BOUNDS, dtype=float)
+    rng = np.random.default_rng(1)
+    return bounds[:, 0] + rng.random((4, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
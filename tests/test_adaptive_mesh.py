@@ -0,0 +1,36 @@
+"""
+mesh="adaptive": error frente al motor "segment" y número de puntos de la malla.
+"""
+import pytest
+
+from src.simulator.lap_simulator import LapSimulator
+
+# Los pasos hacia delante y hacia atrás son de primer orden: con el presupuesto de error
+# proporcional a la longitud de cada intervalo los puntos crecen como 1/tolerancia
+# (en track.json, puntos * tolerancia ~ 95-135 entre 2e-2 y 1e-4)
+POINTS_TIMES_TOLERANCE = 150
+
+
+@pytest.fixture(scope="module")
+def reference(car, track):
+    return LapSimulator(car, track, engine="segment").simulate_lap()[0]
+
+
+@pytest.mark.parametrize("tolerance", (2e-2, 5e-3))
+def test_adaptive_mesh_bounds_error_and_points(car, track, reference, tolerance):
+    simulator = LapSimulator(car, track, engine="numpy", mesh="adaptive", tolerance=tolerance)
+    lap_time, v = simulator.simulate_lap()
+    assert abs(lap_time - reference) < tolerance
+    assert simulator.error_estimate < tolerance
+    assert len(v) == len(simulator.nodes)
+    assert len(simulator.nodes) * tolerance < POINTS_TIMES_TOLERANCE
+
+
+def test_adaptive_mesh_beats_uniform_mesh(car, track, reference):
+    # Con un número de puntos parecido al de la malla uniforme de 1 m, un error mucho menor
+    uniform = LapSimulator(car, track, engine="numpy")
+    uniform_error = abs(uniform.simulate_lap()[0] - reference)
+    adaptive = LapSimulator(car, track, engine="numpy", mesh="adaptive", tolerance=2e-2)
+    adaptive_error = abs(adaptive.simulate_lap()[0] - reference)
+    assert len(adaptive.nodes) < 1.2 * len(uniform.v)
+    assert adaptive_error < uniform_error / 10
@@ -0,0 +1,75 @@
+"""
+Polares tabuladas de Aero: interpolación, evaluación vectorizada y vueltas con polares.
+"""
+import numpy as np
+import pytest
+
+from src.models.aero import Aero, Polar
+from src.models.car import Car
+from src.simulator.lap_simulator import LapSimulator
+
+# Ángulos tabulados, con el codo de la entrada en pérdida (15) y el ángulo de conftest (4)
+AOA_TABLE = np.arange(-5.0, 26.0)
+
+
+def _analytic_polar():
+    # Polar por unidad de pendiente muestreada del modelo analítico
+    return Polar(AOA_TABLE, Aero.lift_coefficient(1.0, AOA_TABLE), Aero.drag_coefficient(1.0, AOA_TABLE))
+
+
+def test_polar_validation():
+    with pytest.raises(ValueError):
+        Polar([0.0, 1.0], [0.0, 1.0], [0.0])
+    with pytest.raises(ValueError):
+        Polar([0.0, 0.0], [0.0, 1.0], [0.0, 1.0])
+    polar = _analytic_polar()
+    with pytest.raises(ValueError):
+        polar.cl[0] = 1.0
+
+
+def test_polar_interpolation():
+    polar = _analytic_polar()
+    # Exacta en los puntos tabulados y en el tramo lineal del cl; constante fuera de la tabla
+    assert polar.lift(4.0) == Aero.lift_coefficient(1.0, 4.0)
+    assert polar.lift(7.25) == pytest.approx(7.25)
+    assert polar.drag(4.5) == pytest.approx(0.5 * (Aero.drag_coefficient(1.0, 4.0) + Aero.drag_coefficient(1.0, 5.0)))
+    assert polar.lift(40.0) == polar.cl[-1] and polar.drag(-10.0) == polar.cd[0]
+    assert Polar.from_dict(polar.to_dict()).cd.tolist() == polar.cd.tolist()
+
+
+@pytest.mark.parametrize("polar", (None, _analytic_polar()))
+def test_vectorized_coefficients_match_scalar(polar):
+    aoa = np.linspace(-3.0, 22.0, 41)
+    lift = Aero.lift_coefficient(0.7, aoa, polar)
+    drag = Aero.drag_coefficient(0.2, aoa, polar)
+    np.testing.assert_allclose(lift, [Aero.lift_coefficient(0.7, a, polar) for a in aoa], rtol=1e-14)
+    np.testing.assert_allclose(drag, [Aero.drag_coefficient(0.2, a, polar) for a in aoa], rtol=1e-14)
+    assert type(Aero.lift_coefficient(0.7, 4.0, polar)) is float
+
+    # Barrido de reglajes de alerón de una vez (broadcasting) frente a uno a uno
+    aero = Aero(0.7, 0.6, 0.2, 0.3, 1.0, 1.0, polar_front=polar, polar_rear=polar)
+    front, rear = np.meshgrid(aoa[::8], aoa[::5])
+    k_downforce, k_drag = aero.coefficients(front, rear)
+    for i, j in np.ndindex(front.shape):
+        aero.set_aoa(front[i, j], rear[i, j])
+        assert k_downforce[i, j] == pytest.approx(aero.downforce_coefficient(), rel=1e-14)
+        assert k_drag[i, j] == pytest.approx(aero.drag(1.0), rel=1e-14)
+
+
+def test_car_with_polars_laps(car, track, setups):
+    data = car.to_dict()
+    data['polars'] = {'front': _analytic_polar().to_dict(), 'rear': _analytic_polar().to_dict()}
+    polar_car = Car.from_dict(data)
+    assert Car.from_dict(polar_car.to_dict()).to_dict() == polar_car.to_dict()
+
+    # En un ángulo tabulado la polar da los mismos coeficientes que el modelo analítico
+    # (salvo el redondeo de multiplicar por la pendiente después de tabular)
+    for x in setups[:2]:
+        reference = LapSimulator(car.with_params(x), track, engine="numpy").simulate_lap()[0]
+        lap_time = LapSimulator(polar_car.with_params(x), track, engine="numpy").simulate_lap()[0]
+        assert lap_time == pytest.approx(reference, rel=1e-12)
+    # Y el lote (CarBatch) evalúa las polares igual que cada coche por separado
+    lap_times = LapSimulator(polar_car, track, engine="numpy").simulate_batch(setups)
+    for x, lap_time in zip(setups, lap_times):
+        single = LapSimulator(polar_car.with_params(x), track, engine="numpy").simulate_lap()[0]
+        assert lap_time == pytest.approx(single, rel=1e-12)
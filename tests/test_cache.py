@@ -0,0 +1,60 @@
+"""
+ConfigCache: invalidación de coches y circuitos por archivo y clave de los radios discretizados.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.models.track import Track
+from src.utils.cache import ConfigCache
+
+
+def _write_track(path, segments):
+    with open(path, 'w') as f:
+        json.dump({'segments': [{'length': length, 'radius': radius} for length, radius in segments]}, f)
+
+
+def test_track_reloaded_only_when_content_changes(tmp_path):
+    cache = ConfigCache()
+    path = str(tmp_path / "track.json")
+    _write_track(path, [(100.0, 50.0), (200.0, 80.0)])
+    track = cache.track(path)
+    assert cache.track(path) is track
+    assert cache.misses == 1 and cache.hits == 1
+
+    # Mismo contenido con otra fecha de modificación: se relee pero no se re-parsea
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.track(path) is track
+    assert cache.misses == 1
+
+    _write_track(path, [(100.0, 50.0), (300.0, 80.0)])
+    changed = cache.track(path)
+    assert changed is not track
+    assert changed.segments == ((100.0, 50.0), (300.0, 80.0))
+    assert cache.misses == 2
+
+
+def test_shared_track_is_immutable(tmp_path):
+    path = str(tmp_path / "track.json")
+    _write_track(path, [(100.0, 50.0)])
+    track = ConfigCache().track(path)
+    with pytest.raises(TypeError):
+        track.segments[0] = (1.0, 1.0)
+
+
+def test_radii_keyed_by_segments(tmp_path):
+    cache = ConfigCache(max_radii=2)
+    track = Track([(2.5, 50.0), (1.0, 80.0)])
+    radii = cache.radii(track, 1.0)
+    np.testing.assert_array_equal(radii, [50.0, 50.0, 50.0, 80.0])
+    assert not radii.flags.writeable
+
+    # Otro circuito con los mismos segmentos comparte la entrada; con segmentos nuevos no
+    assert cache.radii(Track([(2.5, 50.0), (1.0, 80.0)]), 1.0) is radii
+    track.segments = [(2.0, 50.0)]
+    np.testing.assert_array_equal(cache.radii(track, 1.0), [50.0, 50.0])
+    assert cache.radii(track, 1.0, as_list=True) == (50.0, 50.0)
+    assert len(cache._radii) == 2
@@ -0,0 +1,44 @@
+"""
+Equivalencia entre los motores de LapSimulator y entre simulate_lap y simulate_batch.
+"""
+import numpy as np
+import pytest
+
+from src.models.aero import Aero
+from src.simulator.lap_simulator import LapSimulator
+from src.utils.profiling import Profiler
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_numpy_engine_matches_python_engine(car, track, setups, lap):
+    for x in setups:
+        setup_car = car.with_params(x)
+        reference, v_reference = LapSimulator(setup_car, track, engine="python", lap=lap).simulate_lap()
+        lap_time, v = LapSimulator(setup_car, track, engine="numpy", lap=lap).simulate_lap()
+        assert lap_time == pytest.approx(reference, rel=LapSimulator.NUMPY_RTOL)
+        assert len(v) == len(v_reference)
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_simulate_batch_matches_single_laps(car, track, setups, lap):
+    lap_times, speeds = LapSimulator(car, track, engine="numpy", lap=lap).simulate_batch(setups, return_speeds=True)
+    for x, lap_time, v in zip(setups, lap_times, speeds):
+        reference, v_reference = LapSimulator(car.with_params(x), track, engine="numpy", lap=lap).simulate_lap()
+        # Mismas operaciones sobre columnas: solo difieren en el redondeo de la última cifra
+        assert lap_time == pytest.approx(reference, rel=1e-12)
+        np.testing.assert_allclose(v, v_reference, rtol=1e-12)
+
+
+def test_scalar_aero_coefficients_are_floats(car):
+    # La aritmética escalar del modelo (motor "python", kernels sin numba) va sobre floats
+    aero = car.with_params(car.setup_params()).aero
+    assert all(type(value) is float for value in (aero.cl_front, aero.cl_rear, aero.cd_front, aero.cd_rear))
+    assert Aero.lift_coefficient(np.array([1.0, 2.0]), 4).shape == (2,)
+
+
+def test_profiler_is_not_left_on_the_car(car, track):
+    setup_car = car.with_params(car.setup_params())
+    profiler = Profiler()
+    LapSimulator(setup_car, track, engine="python", delta_s=5.0, profiler=profiler).simulate_lap()
+    assert setup_car.profiler is None
+    assert profiler.to_dict()['counters']['calls.max_acceleration'] > 0
@@ -0,0 +1,45 @@
+"""
+Car.envelope: reutilización, invalidación al cambiar el coche y precisión de la vuelta.
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from src.simulator.lap_simulator import LapSimulator
+
+
+def test_envelope_is_reused_until_the_car_changes(car):
+    setup_car = car.with_params(car.setup_params())
+    envelope = setup_car.envelope()
+    assert setup_car.envelope() is envelope
+    assert setup_car.envelope(resolution=1.0) is not envelope
+
+    setup_car.mass = setup_car.mass + 50.0
+    heavier = setup_car.envelope()
+    assert heavier is not envelope
+    assert heavier.acceleration_at(10.0) == pytest.approx(setup_car.max_acceleration(10.0))
+
+    # Los cambios en el modelo aerodinámico también invalidan la tabla
+    setup_car.aero.cl_alpha_front = setup_car.aero.cl_alpha_front * 2
+    assert setup_car.envelope() is not heavier
+    changed = setup_car.envelope()
+    setup_car.aero = copy.copy(car.aero)
+    assert setup_car.envelope() is not changed
+
+
+def test_envelope_matches_car_model(car):
+    envelope = car.with_params(car.setup_params()).envelope()
+    v = np.linspace(1.0, 150.0, 50)
+    np.testing.assert_allclose(envelope.deceleration(v), [car.max_deceleration(x) for x in v], rtol=1e-2)
+    assert envelope.max_error['acceleration'] < 0.5
+    # El agarre crece con v^2: la interpolación lineal solo comete el error de la curvatura
+    assert envelope.max_error['grip'] < 1e-5 * envelope.grip_force.max()
+
+
+@pytest.mark.parametrize("resolution, rtol", ((True, 5e-4), (0.05, 5e-5)))
+def test_envelope_lap_time(car, track, resolution, rtol):
+    setup_car = car.with_params(car.setup_params())
+    reference = LapSimulator(setup_car, track, engine="python").simulate_lap()[0]
+    lap_time = LapSimulator(setup_car, track, engine="python", envelope=resolution).simulate_lap()[0]
+    assert lap_time == pytest.approx(reference, rel=rtol)
@@ -0,0 +1,112 @@
+"""
+FitnessCache: ida y vuelta por la base de datos SQLite, también entre hilos, cuantización
+y hash de contexto.
+
+Los hilos de cada test están vivos a la vez (barreras): si uno terminara antes de que
+empiece el siguiente, este podría heredar su identificador y el test no distinguiría
+una conexión compartida de una conexión por hilo.
+"""
+import threading
+
+import numpy as np
+
+from src.optimization import fitness_cache
+from src.optimization.fitness_cache import FitnessCache, context_hash
+
+N_THREADS = 4
+
+
+def _lap_time(x):
+    return float(np.sum(x))
+
+
+def _run_threads(target, n_threads):
+    # Ejecuta target(k, barrier) en n_threads hilos simultáneos y devuelve sus excepciones
+    barrier = threading.Barrier(n_threads)
+    errors = []
+
+    def run(k):
+        try:
+            target(k, barrier)
+        except Exception as error:  # noqa: BLE001 - se comprueba en el hilo principal
+            errors.append(error)
+            barrier.abort()
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_round_trip_across_threads(tmp_path):
+    path = str(tmp_path / "fitness.sqlite")
+    cache = FitnessCache(_lap_time, "context", path=path)
+    params = np.arange(30.0).reshape(10, 3)
+    expected = params.sum(axis=1)
+
+    # Un hilo escribe y, mientras sigue vivo, otro lee del disco (como func_timeout en geneticalgorithm)
+    written = threading.Event()
+
+    def step(k, barrier):
+        if k == 0:
+            cache.evaluate(params)
+            cache.clear()
+            written.set()
+        else:
+            written.wait()
+            np.testing.assert_array_equal(cache.evaluate(params), expected)
+        barrier.wait()
+
+    assert _run_threads(step, 2) == []
+    assert cache.misses == len(params)
+    assert cache.disk_hits == len(params)
+    cache.close()
+
+    # Otra instancia (otra ejecución) sobre el mismo archivo y contexto no vuelve a evaluar
+    reopened = FitnessCache(_lap_time, "context", path=path)
+    np.testing.assert_array_equal(reopened.evaluate(params), expected)
+    assert reopened.misses == 0
+    reopened.close()
+
+
+def test_concurrent_threads(tmp_path):
+    cache = FitnessCache(_lap_time, "context", path=str(tmp_path / "fitness.sqlite"))
+
+    def step(k, barrier):
+        for i in range(25):
+            barrier.wait()  # Todos los hilos evalúan a la vez en cada paso
+            assert cache(np.array([k, i, 0.5])) == k + i + 0.5
+
+    assert _run_threads(step, N_THREADS) == []
+    assert cache.stats()['memory_size'] == N_THREADS * 25
+    cache.close()
+
+
+def test_quantized_cell_returns_first_evaluated_point():
+    cache = FitnessCache(_lap_time, "context", resolution=0.5)
+    assert cache(np.array([1.0, 2.0])) == 3.0
+    # Misma celda (1.1 / 0.5 y 2.1 / 0.5 redondean igual): no se evalúa, devuelve el primero
+    assert cache(np.array([1.1, 2.1])) == 3.0
+    assert cache.misses == 1 and cache.memory_hits == 1
+    assert cache(np.array([1.3, 2.0])) == 3.3
+
+
+def test_context_hash_changes_with_model_version(car, track, monkeypatch):
+    context = context_hash(car, track, delta_s=1.0, engine="numpy")
+    assert context == context_hash(car, track, delta_s=1.0, engine="numpy")
+    assert context != context_hash(car, track, delta_s=0.5, engine="numpy")
+    monkeypatch.setattr(fitness_cache, "MODEL_VERSION", fitness_cache.MODEL_VERSION + 1)
+    assert context != context_hash(car, track, delta_s=1.0, engine="numpy")
+
+
+def test_model_version_invalidates_disk_cache(car, track, tmp_path, monkeypatch):
+    path = str(tmp_path / "fitness.sqlite")
+    params = np.arange(6.0).reshape(2, 3)
+    with FitnessCache(_lap_time, context_hash(car, track), path=path) as cache:
+        cache.evaluate(params)
+    monkeypatch.setattr(fitness_cache, "MODEL_VERSION", fitness_cache.MODEL_VERSION + 1)
+    with FitnessCache(_lap_time, context_hash(car, track), path=path) as cache:
+        cache.evaluate(params)
+        assert cache.disk_hits == 0 and cache.misses == len(params)
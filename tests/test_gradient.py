@@ -0,0 +1,25 @@
+"""
+Gradiente adjunto (simulate_lap_with_gradient) frente a diferencias finitas centrales.
+"""
+import numpy as np
+import pytest
+
+from src.simulator.lap_simulator import LapSimulator
+
+RELATIVE_STEP = 1e-5  # Paso de las diferencias finitas, relativo a cada parámetro
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_adjoint_gradient_matches_central_differences(car, track, setups, lap):
+    for x in np.vstack([car.setup_params(), setups]):
+        lap_time, v, grad = LapSimulator(car.with_params(x), track, engine="numpy", lap=lap).simulate_lap_with_gradient()
+        reference, v_reference = LapSimulator(car.with_params(x), track, engine="numpy", lap=lap).simulate_lap()
+        assert lap_time == pytest.approx(reference, rel=1e-12)
+
+        n = len(x)
+        h = RELATIVE_STEP * np.abs(x)
+        perturbations = np.vstack([x + np.diag(h), x - np.diag(h)])
+        f = LapSimulator(car, track, engine="numpy", lap=lap).simulate_batch(perturbations)
+        central = (f[:n] - f[n:]) / (2 * h)
+        # Elasticidades d(ln t)/d(ln x): comparables entre parámetros de escalas muy distintas
+        np.testing.assert_allclose(grad * x / lap_time, central * x / lap_time, rtol=0, atol=1e-6)
@@ -0,0 +1,38 @@
+"""
+simulate_incremental frente a una vuelta completa con el motor "numpy".
+"""
+import numpy as np
+import pytest
+
+from src.models.track import Track
+from src.simulator.lap_simulator import LapSimulator
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_parameter_changes_match_full_lap(car, track, setups, lap):
+    simulator = LapSimulator(car, track, engine="numpy", lap=lap)
+    simulator.simulate_incremental()
+    for x in setups:
+        lap_time, v = simulator.simulate_incremental(x)
+        reference, v_reference = LapSimulator(car.with_params(x), track, engine="numpy", lap=lap).simulate_lap()
+        assert lap_time == reference
+        np.testing.assert_array_equal(v, v_reference)
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_single_parameter_and_segment_changes_match_full_lap(car, track, lap):
+    simulator = LapSimulator(car, track, engine="numpy", lap=lap)
+    simulator.simulate_incremental()
+
+    lap_time, v = simulator.simulate_incremental([car.brake_force * 0.9], names=["brake_force"])
+    reference, v_reference = LapSimulator(simulator.car, track, engine="numpy", lap=lap).simulate_lap()
+    assert lap_time == reference
+    np.testing.assert_array_equal(v, v_reference)
+
+    segments = list(track.segments)
+    segments[3] = (120.0, 80.0)
+    lap_time, v = simulator.simulate_incremental(segments={3: segments[3]})
+    reference, v_reference = LapSimulator(simulator.car, Track(segments, track.directions), engine="numpy",
+                                          lap=lap).simulate_lap()
+    assert lap_time == reference
+    np.testing.assert_array_equal(v, v_reference)
@@ -0,0 +1,57 @@
+"""
+Kernels de src/simulator/jit.py frente al modelo de Car y a las pasadas de LapSimulator.
+
+Sin numba los kernels son funciones de Python y se comprueban igual; con numba se
+comprueban compilados. En los dos casos deben coincidir bit a bit.
+"""
+import numpy as np
+import pytest
+
+from src.simulator import jit
+from src.simulator.lap_simulator import LapSimulator
+
+SPEEDS = np.linspace(0.0, 120.0, 241).tolist()
+
+
+def test_max_acceleration_kernel_matches_car(car, setups):
+    for x in setups:
+        setup_car = car.with_params(x)
+        model = jit.car_model(setup_car)
+        assert [jit.max_acceleration(v, model) for v in SPEEDS] == [setup_car.max_acceleration(v) for v in SPEEDS]
+
+
+def test_max_deceleration_kernel_matches_car(car, setups):
+    for x in setups:
+        setup_car = car.with_params(x)
+        model = jit.car_model(setup_car)
+        assert [jit.max_deceleration(v, model) for v in SPEEDS] == [setup_car.max_deceleration(v) for v in SPEEDS]
+
+
+def test_pass_kernels_match_python_passes(car, track, setups):
+    for x in setups:
+        simulator = LapSimulator(car.with_params(x), track, engine="numpy")
+        simulator.simulate_lap()
+        start = simulator.v_max.copy()
+        start[0] = 0.0
+        model = jit.car_model(simulator.car)
+        ds = np.full(len(start) - 1, simulator.delta_s)
+
+        simulator.v = start.copy()
+        simulator._forward()
+        v_forward = start.copy()
+        jit.forward_pass(v_forward, ds, model)
+        np.testing.assert_array_equal(v_forward, simulator.v)
+
+        simulator._backward()
+        jit.backward_pass(v_forward, ds, model)
+        np.testing.assert_array_equal(v_forward, simulator.v)
+
+
+@pytest.mark.parametrize("engine", ("python", "numpy"))
+def test_jit_backend_matches_python_backend(car, track, setups, engine):
+    for x in setups[:2]:
+        setup_car = car.with_params(x)
+        reference, v_reference = LapSimulator(setup_car, track, engine=engine, delta_s=2.0).simulate_lap()
+        lap_time, v = LapSimulator(setup_car, track, engine=engine, delta_s=2.0, backend="jit").simulate_lap()
+        assert lap_time == reference
+        np.testing.assert_array_equal(v, v_reference)
@@ -0,0 +1,38 @@
+"""
+simulate_tracks y SeasonEvaluator frente a un simulate_batch por circuito.
+"""
+import numpy as np
+import pytest
+
+from src.models.track import Track
+from src.optimization.season import SeasonEvaluator
+from src.simulator.lap_simulator import LapSimulator
+from src.simulator.multi_track import simulate_tracks
+from src.utils.cache import discretize
+
+
+@pytest.fixture(scope="module")
+def tracks(track):
+    return [track, Track.synthetic(3000.0, seed=3), Track.synthetic(5000.0, seed=5)]
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_simulate_tracks_matches_per_track_batches(car, tracks, setups, lap):
+    radii_list = [discretize(track, 1.0) for track in tracks]
+    lap_times, speeds = simulate_tracks(car, radii_list, setups, lap=lap, return_speeds=True)
+    assert lap_times.shape == (len(setups), len(tracks))
+    for k, track in enumerate(tracks):
+        reference, v_reference = LapSimulator(car, track, engine="numpy", lap=lap).simulate_batch(
+            setups, return_speeds=True)
+        # Las columnas apiladas siguen las mismas operaciones: resultado idéntico bit a bit
+        np.testing.assert_array_equal(lap_times[:, k], reference)
+        np.testing.assert_array_equal(speeds[k], v_reference)
+
+
+def test_season_evaluator_weighted_total(car, tracks, setups):
+    weights = [1.0, 2.0, 0.5]
+    with SeasonEvaluator(car, tracks, weights=weights, workers=1) as season:
+        total, per_track = season.evaluate(setups, per_track=True)
+    reference = np.stack([LapSimulator(car, track, engine="numpy").simulate_batch(setups) for track in tracks], axis=1)
+    np.testing.assert_array_equal(per_track, reference)
+    np.testing.assert_allclose(total, reference @ np.array(weights), rtol=1e-12)
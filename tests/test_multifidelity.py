@@ -0,0 +1,60 @@
+"""
+MultiFidelity frente a simular toda la población a resolución completa.
+"""
+import numpy as np
+import pytest
+
+from src.models.car import SETUP_BOUNDS
+from src.optimization.multifidelity import MultiFidelity
+from src.simulator.lap_simulator import LapSimulator
+
+
+@pytest.fixture(scope="module")
+def population():
+    bounds = np.array(SETUP_BOUNDS, dtype=float)
+    rng = np.random.default_rng(2)
+    return bounds[:, 0] + rng.random((80, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
+
+
+@pytest.fixture(scope="module")
+def exact(car, track, population):
+    return LapSimulator(car, track, engine="numpy").simulate_batch(population)
+
+
+def test_estimates_and_winners(car, track, population, exact):
+    full_batches = []
+
+    def full_resolution(params_matrix):
+        full_batches.append(len(params_matrix))
+        return LapSimulator(car, track, engine="numpy").simulate_batch(params_matrix)
+
+    fidelity = MultiFidelity(car, track, full_resolution=full_resolution)
+    estimates = np.concatenate([fidelity.evaluate(population[i:i + 40]) for i in (0, 40)])
+    levels = np.concatenate(fidelity._levels)
+
+    # Los que llegan al último nivel tienen el tiempo exacto; el resto, el grueso corregido
+    last = levels == len(fidelity.fidelities) - 1
+    assert last.any() and not last.all()
+    np.testing.assert_allclose(estimates[last], exact[last], rtol=1e-12)
+    assert np.median(np.abs(estimates[~last] / exact[~last] - 1)) < 1e-2
+
+    stats = fidelity.stats()
+    assert stats['evaluations'][0] == len(population)
+    assert stats['evaluations'] == sorted(stats['evaluations'], reverse=True)
+    assert stats['reduction'] > 3
+    # Solo la resolución completa pasa por full_resolution
+    assert sum(full_batches) == stats['evaluations'][-1]
+
+    params, lap_times = fidelity.winners(3)
+    np.testing.assert_allclose(lap_times, np.sort(exact)[:3], rtol=1e-12)
+    np.testing.assert_array_equal(params, population[np.argsort(exact)[:3]])
+
+
+def test_single_candidates(car, track, population, exact):
+    fidelity = MultiFidelity(car, track)
+    # El primer candidato no tiene con quién compararse: sube hasta la resolución completa
+    assert fidelity(population[0]) == pytest.approx(exact[0], rel=1e-12)
+    assert fidelity.stats()['evaluations'] == [1] * len(fidelity.fidelities)
+    for x in population[1:6]:
+        fidelity(x)
+    assert fidelity.stats()['evaluations'][-1] < 6
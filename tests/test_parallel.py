@@ -0,0 +1,31 @@
+"""
+ParallelEvaluator frente a simulate_batch en un solo proceso.
+"""
+import numpy as np
+import pytest
+
+from src.optimization.parallel import ParallelEvaluator
+from src.simulator.lap_simulator import LapSimulator
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+def test_parallel_matches_simulate_batch(car, track, setups, lap):
+    reference, v_reference = LapSimulator(car, track, engine="numpy", lap=lap).simulate_batch(
+        setups, return_speeds=True)
+    with ParallelEvaluator(car, track, workers=2, lap=lap) as evaluator:
+        # Los bloques se reparten entre procesos pero el orden de las filas se conserva
+        lap_times, speeds = evaluator.evaluate(setups, return_speeds=True)
+        np.testing.assert_allclose(lap_times, reference, rtol=1e-12)
+        np.testing.assert_allclose(speeds, v_reference, rtol=1e-12)
+        assert evaluator(setups[2]) == pytest.approx(reference[2], rel=1e-12)
+        assert evaluator.evaluate(np.zeros((0, setups.shape[1]))).shape == (0,)
+
+
+def test_parallel_python_engine_and_profile(car, track, setups):
+    with ParallelEvaluator(car, track, delta_s=5.0, engine="python", workers=2, profile=True) as evaluator:
+        lap_times = evaluator.evaluate(setups[:2])
+        counters = evaluator.profiler.to_dict()['counters']
+    for x, lap_time in zip(setups[:2], lap_times):
+        reference = LapSimulator(car.with_params(x), track, delta_s=5.0, engine="python").simulate_lap()[0]
+        assert lap_time == reference
+    assert counters['calls.max_acceleration'] > 0
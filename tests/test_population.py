@@ -0,0 +1,86 @@
+"""
+CMA-ES y evolución diferencial: convergencia en funciones conocidas, límites,
+reproducibilidad y una optimización corta sobre el simulador.
+"""
+import numpy as np
+import pytest
+
+from src.models.car import SETUP_BOUNDS
+from src.optimization.population import CMAES, DifferentialEvolution
+from src.simulator.lap_simulator import LapSimulator
+
+BOUNDS = np.array([[-5.0, 5.0], [0.0, 10.0], [100.0, 200.0], [-1.0, 1.0]])
+OPTIMUM = np.array([1.0, 7.0, 130.0, -0.5])
+OPTIMIZERS = {
+    "cmaes": lambda function, **kwargs: CMAES(function, BOUNDS, **kwargs),
+    "de": lambda function, **kwargs: DifferentialEvolution(function, BOUNDS, population_size=30, **kwargs),
+    "de_best": lambda function, **kwargs: DifferentialEvolution(function, BOUNDS, population_size=30,
+                                                                strategy="best1bin", **kwargs),
+}
+
+
+def _ellipsoid(params_matrix, optimum=OPTIMUM):
+    # Cuadrática mal condicionada en el espacio normalizado (escalas 1 a 1000)
+    unit = (np.atleast_2d(params_matrix) - BOUNDS[:, 0]) / (BOUNDS[:, 1] - BOUNDS[:, 0])
+    unit_optimum = (optimum - BOUNDS[:, 0]) / (BOUNDS[:, 1] - BOUNDS[:, 0])
+    return np.sum(10.0 ** np.arange(4) * (unit - unit_optimum) ** 2, axis=1)
+
+
+@pytest.mark.parametrize("name", OPTIMIZERS)
+def test_converges_on_ellipsoid(name):
+    calls = []
+
+    def function(params_matrix):
+        calls.append(len(params_matrix))
+        return _ellipsoid(params_matrix)
+
+    optimizer = OPTIMIZERS[name](function, seed=0, max_generations=400, patience=400, target=1e-8, log=None)
+    output = optimizer.run()
+    assert output['stop'] == "target"
+    np.testing.assert_allclose(output['variable'], OPTIMUM, atol=1e-3 * np.ptp(BOUNDS, axis=1).max())
+    # Una llamada por generación con toda la población
+    assert len(calls) == output['generations'] and sum(calls) == output['evaluations']
+    assert optimizer.report == sorted(optimizer.report, reverse=True)
+
+
+@pytest.mark.parametrize("name", OPTIMIZERS)
+def test_optimum_outside_bounds_ends_on_the_bound(name):
+    outside = OPTIMUM.copy()
+    outside[0] = 8.0  # Fuera de [-5, 5]
+    optimizer = OPTIMIZERS[name](lambda x: _ellipsoid(x, outside), seed=1, max_generations=300, patience=50, log=None)
+    best = optimizer.run()['variable']
+    assert np.all((best >= BOUNDS[:, 0]) & (best <= BOUNDS[:, 1]))
+    assert best[0] == pytest.approx(5.0, abs=1e-2)
+    np.testing.assert_allclose(best[1:], OPTIMUM[1:], rtol=2e-2, atol=2e-2)
+
+
+@pytest.mark.parametrize("name", OPTIMIZERS)
+def test_same_seed_repeats_and_scalar_function_matches(name):
+    runs = [OPTIMIZERS[name](_ellipsoid, seed=3, max_generations=15, log=None).run() for _ in range(2)]
+    scalar = OPTIMIZERS[name](lambda x: float(_ellipsoid(x)[0]), seed=3, batched=False, max_generations=15,
+                              log=None).run()
+    for output in (runs[1], scalar):
+        np.testing.assert_array_equal(output['variable'], runs[0]['variable'])
+        assert output['function'] == runs[0]['function']
+
+
+def test_nan_values_rank_last():
+    def function(params_matrix):
+        values = _ellipsoid(params_matrix)
+        values[params_matrix[:, 0] > 3.0] = np.nan
+        return values
+
+    output = CMAES(function, BOUNDS, seed=0, max_generations=100, log=None).run()
+    assert np.isfinite(output['function'])
+    assert output['variable'][0] <= 3.0
+
+
+@pytest.mark.parametrize("optimizer_class", (CMAES, DifferentialEvolution))
+def test_short_optimization_on_the_simulator(car, track, optimizer_class):
+    simulator = LapSimulator(car, track, delta_s=10.0, engine="numpy")
+    optimizer = optimizer_class(simulator.simulate_batch, SETUP_BOUNDS, seed=0, max_generations=8,
+                                population_size=12, log=None)
+    output = optimizer.run()
+    assert output['generations'] == 8
+    assert output['function'] < optimizer.history[0]['generation_best']
+    assert output['function'] == pytest.approx(simulator.simulate_batch(output['variable'][None, :])[0])
@@ -0,0 +1,77 @@
+"""
+ResultsStore: consultas por bloques frente a los mismos datos en memoria y confirmación en disco.
+"""
+import numpy as np
+import pytest
+
+from src.utils.results_store import ResultsStore
+
+LABELS = ("power", "mass")
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 23
+    lap_time = rng.uniform(60.0, 80.0, (n, 2))
+    lap_time[5, 1] = np.nan  # Las filas con NaN no cuentan en best
+    return {
+        'params': np.column_stack([rng.uniform(3e5, 6e5, n), rng.uniform(600, 900, n)]),
+        'lap_time': lap_time,
+        'v': rng.random((n, 6)).astype(np.float32),
+    }
+
+
+@pytest.fixture
+def store(tmp_path, data):
+    columns = {'params': ((2,), 'float64'), 'lap_time': ((2,), 'float64'), 'v': ((6,), 'float32')}
+    store = ResultsStore(str(tmp_path / "store"), columns, labels={'params': LABELS}, chunk_rows=5)
+    # Appends de tamaños que no coinciden con los bloques
+    for start, stop in ((0, 3), (3, 14), (14, 23)):
+        store.append(**{name: values[start:stop] for name, values in data.items()})
+    store.close()
+    return ResultsStore(str(tmp_path / "store"))
+
+
+def test_columns_round_trip(store, data):
+    assert len(store) == len(data['lap_time'])
+    for name, values in data.items():
+        np.testing.assert_array_equal(store[name], values)
+        assert store[name].dtype == values.dtype
+    rows = [22, 0, 7, 7]
+    selected = store.get(rows, ['params', 'v'])
+    assert set(selected) == {'params', 'v'}
+    np.testing.assert_array_equal(selected['v'], data['v'][rows])
+    with pytest.raises(IndexError):
+        store.column('v', [len(store)])
+
+
+def test_best_matches_sort(store, data):
+    total = data['lap_time'].sum(axis=1)
+    rows, values = store.best(4)
+    expected = np.argsort(np.where(np.isnan(total), np.inf, total))[:4]
+    np.testing.assert_array_equal(rows, expected)
+    np.testing.assert_array_equal(values, total[expected])
+
+    # Por una componente etiquetada, y pidiendo más filas de las que hay
+    rows, values = store.best(100, by="mass")
+    np.testing.assert_array_equal(rows, np.argsort(data['params'][:, 1]))
+
+
+def test_filter_matches_mask(store, data):
+    power, mass = data['params'].T
+    rows = store.filter(power=(4e5, 5.5e5), mass=(None, 800))
+    np.testing.assert_array_equal(rows, np.flatnonzero((power >= 4e5) & (power <= 5.5e5) & (mass <= 800)))
+    total = data['lap_time'].sum(axis=1)
+    np.testing.assert_array_equal(store.filter(lap_time=(None, 140)), np.flatnonzero(total <= 140))
+    with pytest.raises(KeyError):
+        store.filter(tire_grip=(0, 1))
+
+
+def test_unflushed_rows_are_discarded(store, data):
+    store.append(**{name: values[:2] for name, values in data.items()})
+    assert len(store) == len(data['lap_time']) + 2
+    # Sin flush: otra apertura (p. ej. tras matar el proceso) solo ve las filas confirmadas
+    assert len(ResultsStore(store.path)) == len(data['lap_time'])
+    with pytest.raises(ValueError):
+        ResultsStore(store.path, {'lap_time': ((), 'float64')})
@@ -0,0 +1,33 @@
+"""
+Motor "segment" frente a los motores discretos con mallas cada vez más finas.
+"""
+import numpy as np
+import pytest
+
+from src.models.track import Track
+from src.simulator.lap_simulator import LapSimulator
+
+
+@pytest.mark.parametrize("lap", LapSimulator.LAPS)
+@pytest.mark.parametrize("synthetic", (False, True))
+def test_uniform_mesh_converges_to_segment_engine(car, track, lap, synthetic):
+    if synthetic:
+        track = Track.synthetic(3000.0, seed=3)
+    reference = LapSimulator(car, track, engine="segment", lap=lap).simulate_lap()[0]
+    errors = [abs(LapSimulator(car, track, engine="numpy", lap=lap, delta_s=delta_s).simulate_lap()[0] - reference)
+              for delta_s in (1.0, 0.1)]
+    # Las pasadas discretas son de primer orden: el error baja con delta_s
+    assert errors[0] < 2e-3 * reference
+    assert errors[1] < 2e-4 * reference
+    assert errors[1] < errors[0] / 3
+
+
+def test_segment_lap_time_does_not_depend_on_delta_s(car, track):
+    lap_time, v = LapSimulator(car, track, engine="segment", delta_s=1.0).simulate_lap()
+    fine_time, v_fine = LapSimulator(car, track, engine="segment", delta_s=0.5).simulate_lap()
+    assert fine_time == lap_time
+    assert len(v_fine) == 2 * len(v)
+
+    # El perfil muestreado sigue al de una malla fina del motor "numpy"
+    v_numpy = LapSimulator(car, track, engine="numpy", delta_s=0.1).simulate_lap()[1]
+    np.testing.assert_allclose(v, v_numpy[::10][:len(v)], atol=0.1)
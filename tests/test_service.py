@@ -0,0 +1,102 @@
+"""
+Servicio local de simulación: ida y vuelta cliente/servidor sobre un socket Unix frente
+al simulador local, agrupación de peticiones concurrentes y errores.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from conftest import AOA, ROOT
+from src.service.client import LapClient, RemoteLapSimulator, ServiceError
+from src.service.server import LapService
+from src.simulator.lap_simulator import LapSimulator
+
+CAR_PATH = os.path.join(ROOT, "car.json")
+TRACK_PATH = os.path.join(ROOT, "track.json")
+
+
+@pytest.fixture(scope="module")
+def address(tmp_path_factory):
+    # El servicio corre en su propio bucle de eventos en un hilo, como en lap_service.py
+    path = str(tmp_path_factory.mktemp("service") / "lap.sock")
+    service = LapService(workers=2, max_wait=0.05, preload=[(CAR_PATH, AOA, TRACK_PATH, 1.0)])
+    running = {}
+
+    async def serve():
+        running['loop'], running['task'] = asyncio.get_running_loop(), asyncio.current_task()
+        try:
+            await service.serve(path=path)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),))
+    thread.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    yield path
+    running['loop'].call_soon_threadsafe(running['task'].cancel)
+    thread.join()
+
+
+def test_remote_simulator_matches_local(address, car, track, setups):
+    with LapClient(address) as client:
+        remote = RemoteLapSimulator(CAR_PATH, TRACK_PATH, aoa=AOA, client=client)
+        lap_times, speeds = remote.simulate_batch(setups, return_speeds=True)
+        reference, v_reference = LapSimulator(car, track, engine="numpy").simulate_batch(setups, return_speeds=True)
+        # Los lotes se reparten entre los trabajadores: solo cambia el redondeo de la última cifra
+        np.testing.assert_allclose(lap_times, reference, rtol=1e-12)
+        np.testing.assert_allclose(speeds, v_reference, rtol=1e-12)
+
+        # Sin params se simula el setup del propio coche (en el servicio, como un lote de uno)
+        lap_time, v = remote.simulate_lap()
+        local_time, local_v = LapSimulator(car, track, engine="numpy").simulate_lap()
+        assert lap_time == pytest.approx(local_time, rel=1e-12)
+        np.testing.assert_allclose(v, local_v, rtol=1e-12)
+
+        flying = RemoteLapSimulator(CAR_PATH, TRACK_PATH, aoa=AOA, lap="flying", client=client)
+        np.testing.assert_allclose(flying.simulate_batch(setups[:2]),
+                                   LapSimulator(car, track, engine="numpy", lap="flying").simulate_batch(setups[:2]),
+                                   rtol=1e-12)
+
+
+def test_concurrent_requests_are_batched(address, car, track, setups):
+    reference = LapSimulator(car, track, engine="numpy").simulate_batch(setups)
+    with LapClient(address) as client:
+        before = client.stats()
+
+    results = {}
+
+    def run(k):
+        with LapClient(address) as client:
+            results[k] = client.simulate(CAR_PATH, TRACK_PATH, params=setups[k], aoa=AOA)
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(len(setups))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for k, lap_times in results.items():
+        np.testing.assert_allclose(lap_times, reference[k:k + 1], rtol=1e-12)
+
+    with LapClient(address) as client:
+        stats = client.stats()
+    assert stats['requests'] - before['requests'] == len(setups)
+    assert stats['setups'] - before['setups'] == len(setups)
+    # Las peticiones que llegan dentro de max_wait comparten lote
+    assert stats['batches'] - before['batches'] < len(setups)
+    assert stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+
+def test_errors_do_not_close_the_connection(address, setups):
+    with LapClient(address) as client:
+        with pytest.raises(ServiceError, match="lap"):
+            client.simulate(CAR_PATH, TRACK_PATH, params=setups, aoa=AOA, lap="qualifying")
+        with pytest.raises(ServiceError, match="params"):
+            client.simulate(CAR_PATH, TRACK_PATH, params=setups[:, :3], aoa=AOA)
+        with pytest.raises(ServiceError, match="FileNotFoundError"):
+            client.simulate(CAR_PATH, os.path.join(ROOT, "no_existe.json"), aoa=AOA)
+        assert len(client.simulate(CAR_PATH, TRACK_PATH, params=setups, aoa=AOA)) == len(setups)
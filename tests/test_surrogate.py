@@ -0,0 +1,80 @@
+"""
+GaussianProcess y SurrogateScreen sobre una función barata con la forma de un tiempo de vuelta.
+"""
+import numpy as np
+import pytest
+
+from src.optimization.surrogate import GaussianProcess, SurrogateScreen
+
+BOUNDS = np.array([[0.0, 10.0], [-5.0, 5.0], [100.0, 200.0]])
+
+
+def _lap_time(params_matrix):
+    # Cuenco suave con mínimo 60 en (3, 1, 150), evaluado por lotes
+    x = (np.atleast_2d(params_matrix) - BOUNDS[:, 0]) / (BOUNDS[:, 1] - BOUNDS[:, 0])
+    return 60.0 + 40.0 * np.sum((x - [0.3, 0.6, 0.5])**2, axis=1)
+
+
+def _uniform(rng, n):
+    return BOUNDS[:, 0] + rng.random((n, len(BOUNDS))) * (BOUNDS[:, 1] - BOUNDS[:, 0])
+
+
+def test_gaussian_process_interpolates_and_adds_incrementally():
+    rng = np.random.default_rng(0)
+    x = rng.random((60, 2))
+    y = np.sin(3 * x[:, 0]) + x[:, 1]**2
+    gp = GaussianProcess()
+    gp.fit(x[:50], y[:50])
+    x_test = rng.random((20, 2))
+    mean, std = gp.predict(x_test)
+    np.testing.assert_allclose(mean, np.sin(3 * x_test[:, 0]) + x_test[:, 1]**2, atol=1e-2)
+    assert np.all(std < 0.05)
+
+    # Añadir puntos por bloques equivale a reentrenar con las mismas longitudes de escala
+    gp.add(x[50:], y[50:])
+    refit = GaussianProcess()
+    refit.length_scales = gp.length_scales.copy()
+    refit.fit(x, y, optimize=False)
+    # La media y la escala de salida son las del primer ajuste: se comparan las predicciones
+    np.testing.assert_allclose(gp.predict(x_test)[0], refit.predict(x_test)[0], atol=1e-3)
+    np.testing.assert_allclose(gp.predict(x[50:])[0], y[50:], atol=1e-3)
+
+
+def test_screen_skips_poor_candidates_and_keeps_good_ones():
+    rng = np.random.default_rng(1)
+    screen = SurrogateScreen(_lap_time, bounds=BOUNDS, batched=True, min_points=30, seed=0)
+    first, simulated = screen.evaluate(_uniform(rng, 40), return_mask=True)
+    assert simulated.all()  # Sin modelo todavía se simula todo
+
+    best = first.min()
+    for _ in range(5):
+        candidates = _uniform(rng, 40)
+        values, simulated = screen.evaluate(candidates, return_mask=True)
+        exact = _lap_time(candidates)
+        np.testing.assert_array_equal(values[simulated], exact[simulated])
+        # Ningún candidato cribado habría mejorado el mejor tiempo, y su predicción es cercana
+        assert np.all(exact[~simulated] > best)
+        np.testing.assert_allclose(values[~simulated], exact[~simulated], rtol=0.05)
+        best = min(best, exact.min())
+
+    stats = screen.stats()
+    assert stats['simulations'] + stats['screened'] == 240
+    assert stats['saved_ratio'] > 0.3
+    assert stats['validation_points'] > 0 and stats['validation_mae'] < 1.0
+
+
+def test_screen_single_candidates_and_repeated_points():
+    calls = []
+
+    def function(x):
+        calls.append(x)
+        return float(_lap_time(x)[0])
+
+    screen = SurrogateScreen(function, bounds=BOUNDS, min_points=5)
+    x = np.array([3.0, 1.0, 150.0])
+    for _ in range(8):
+        assert screen(x) == pytest.approx(60.0)
+    # Los puntos repetidos no entran dos veces en el modelo (dejarían singular el kernel)
+    assert screen.stats()['train_points'] == 1
+    assert screen.predict(x[None, :]) is None
+    assert len(calls) == 8
@@ -0,0 +1,95 @@
+"""
+Sweep: muestreo y reanudación sobre el ResultsStore del directorio de salida.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from src.models.track import Track
+from src.optimization.sweep import Sweep
+from src.utils.results_store import ResultsStore
+
+
+@pytest.fixture
+def spec(tmp_path):
+    # OAT de 3 parámetros y 3 niveles: 10 muestras, con un último bloque parcial de 3
+    track_path = str(tmp_path / "oval.json")
+    Track.oval(800.0).to_json(track_path)
+    return {
+        'car': os.path.join(ROOT, "car.json"), 'tracks': [track_path],
+        'method': "oat", 'levels': 3, 'chunk_size': 7,
+        'params': {'power': [300000, 650000], 'mass': [600, 900], 'tire_grip': [1.0, 2.0]},
+    }
+
+
+def test_rerun_of_finished_sweep_with_partial_last_chunk(spec, tmp_path):
+    output = str(tmp_path / "sweep")
+    sweep = Sweep(spec)
+    assert sweep.size == 10
+    sweep.run(output, workers=1, log=None)
+    first = ResultsStore(output)
+    assert len(first) == sweep.size
+    np.testing.assert_array_equal(first['params'], sweep.samples(0, sweep.size))
+
+    messages = []
+    for _ in range(2):
+        store = Sweep(spec).run(output, workers=1, log=messages.append)
+        assert len(store) == sweep.size
+    assert messages == [f"Reanudando: {sweep.size}/{sweep.size} muestras ya evaluadas"] * 2
+    assert len(ResultsStore(output)) == sweep.size
+    rows, _ = ResultsStore(output).best(3)
+    assert len(np.unique(ResultsStore(output).column('params', rows), axis=0)) == 3
+
+
+class _Interrupt(Exception):
+    pass
+
+
+def _stop_after_first_chunk(message):
+    # El registro se llama después de confirmar cada bloque: se corta el barrido ahí
+    if message.startswith("Bloque 1/"):
+        raise _Interrupt
+
+
+def test_interrupted_sweep_resumes_after_last_chunk(spec, tmp_path):
+    output = str(tmp_path / "sweep")
+    with pytest.raises(_Interrupt):
+        Sweep(spec).run(output, workers=1, log=_stop_after_first_chunk)
+    assert len(ResultsStore(output)) == spec['chunk_size']
+
+    messages = []
+    store = Sweep(spec).run(output, workers=1, log=messages.append)
+    assert messages[0] == f"Reanudando: {spec['chunk_size']}/10 muestras ya evaluadas"
+    assert messages[1].startswith("Bloque 2/2: 3 muestras")
+    assert len(messages) == 2
+
+    # Mismos resultados que un barrido de una sola vez
+    reference = Sweep(spec).run(str(tmp_path / "reference"), workers=1, log=None)
+    np.testing.assert_array_equal(ResultsStore(output)['params'], reference['params'])
+    np.testing.assert_array_equal(ResultsStore(output)['lap_time'], reference['lap_time'])
+    assert len(store) == 10
+
+
+def test_resume_with_different_spec_is_rejected(spec, tmp_path):
+    output = str(tmp_path / "sweep")
+    Sweep(spec).run(output, workers=1, log=None)
+    with pytest.raises(ValueError):
+        Sweep({**spec, 'levels': 4}).run(output, workers=1, log=None)
+
+
+@pytest.mark.parametrize("method", ("grid", "lhs"))
+def test_samples_cover_the_ranges(spec, method):
+    sweep = Sweep({**spec, 'method': method, 'samples': 12})
+    samples = sweep.samples(0, sweep.size)
+    assert len(samples) == (27 if method == "grid" else 12)
+    np.testing.assert_array_equal(sweep.samples(4, 9), samples[4:9])
+    swept = samples[:, sweep.columns]
+    assert np.all((swept >= sweep.bounds[:, 0]) & (swept <= sweep.bounds[:, 1]))
+    if method == "grid":
+        assert len(np.unique(swept, axis=0)) == sweep.size
+    else:
+        # Hipercubo latino: una muestra en cada uno de los 12 estratos de cada parámetro
+        strata = np.floor((swept - sweep.bounds[:, 0]) / (sweep.bounds[:, 1] - sweep.bounds[:, 0]) * 12)
+        assert all(sorted(column) == list(range(12)) for column in strata.T)
@@ -0,0 +1,64 @@
+"""
+Geometría del trazado (Track.geometry) e importación de la línea central (from_csv).
+"""
+import numpy as np
+import pytest
+
+from src.models.track import Track
+from src.simulator.lap_simulator import LapSimulator
+from src.utils.cache import discretize
+
+
+def test_oval_geometry_closes():
+    track = Track.oval(1000.0, radius=80.0)
+    geometry = track.geometry(0.5)
+    # Un punto por paso de la discretización del simulador más el punto final
+    assert len(geometry.x) == len(discretize(track, 0.5)) + 1
+    assert geometry.x[-1] == pytest.approx(geometry.x[0], abs=1e-9)
+    assert geometry.y[-1] == pytest.approx(geometry.y[0], abs=1e-9)
+    assert geometry.heading[-1] == pytest.approx(2 * np.pi)
+    assert geometry.distance[-1] == pytest.approx(1000.0)
+    assert track.geometry(0.5) is geometry
+
+
+def test_geometry_follows_segment_changes():
+    track = Track.oval(1000.0)
+    before = track.geometry(1.0)
+    track.segments = [(200.0, np.inf), (np.pi * 100.0, 100.0)] * 2 + [(100.0, np.inf)]
+    after = track.geometry(1.0)
+    assert after is not before
+    assert after.distance[-1] == pytest.approx(sum(length for length, _ in track.segments))
+
+
+def _write_centerline(path, track, spacing, noise, seed=0):
+    geometry = track.geometry(spacing)
+    rng = np.random.default_rng(seed)
+    x = geometry.x[:-1] + rng.normal(0.0, noise, len(geometry.x) - 1)
+    y = geometry.y[:-1] + rng.normal(0.0, noise, len(geometry.y) - 1)
+    np.savetxt(path, np.column_stack([x, y]), delimiter=',', header="x,y", comments='', fmt='%.4f')
+
+
+@pytest.mark.parametrize("spacing, noise", [(0.5, 0.0), (0.5, 0.05), (0.05, 0.05)])
+def test_imported_oval_closes(tmp_path, spacing, noise):
+    path = str(tmp_path / "oval.csv")
+    _write_centerline(path, Track.oval(1000.0, radius=80.0), spacing, noise)
+    geometry = Track.from_csv(path).geometry(1.0)
+    # Cada segmento tiene un error de orientación menor que la tolerancia (0.02 rad por defecto)
+    assert geometry.heading[-1] == pytest.approx(2 * np.pi, abs=0.02)
+    assert geometry.distance[-1] == pytest.approx(1000.0, rel=2e-3)
+    assert np.hypot(geometry.x[-1] - geometry.x[0], geometry.y[-1] - geometry.y[0]) < 10.0
+
+
+@pytest.mark.parametrize("spacing, noise, rtol", [(0.5, 0.0, 2e-3), (0.05, 0.05, 1.5e-2), (0.5, 0.05, 1.5e-2)])
+def test_csv_round_trip_lap_time(car, tmp_path, spacing, noise, rtol):
+    track = Track.synthetic(5000.0, seed=1)
+    path = str(tmp_path / "centerline.csv")
+    _write_centerline(path, track, spacing, noise)
+    imported = Track.from_csv(path)
+
+    # Misma longitud y un número de segmentos parecido al original (el ruido no añade curvas)
+    assert sum(length for length, _ in imported.segments) == pytest.approx(5000.0, rel=2e-3)
+    assert len(imported.segments) < 2 * len(track.segments)
+    lap_time = LapSimulator(car, track, engine="numpy").simulate_lap()[0]
+    imported_time = LapSimulator(car, imported, engine="numpy").simulate_lap()[0]
+    assert imported_time == pytest.approx(lap_time, rel=rtol)